@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Sin conexiones persistentes a la base (ver DATABASES en config/settings.py).
+os.environ.setdefault('DJANGO_SERVIDOR', 'asgi')
 
 application = get_asgi_application()
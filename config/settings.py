@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'customers.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -51,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'customers.perfiles.PerfilMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -76,10 +80,79 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfiles de SQLite (customers.sqlite): 'pragmas' se ejecuta en cada
+# conexión nueva, 'journal_mode' se guarda en el archivo de la base al
+# correr migrate y 'conexion' se agrega a DATABASES.
+# - rendimiento: WAL (las lecturas no esperan a las escrituras ni al
+#   revés), synchronous=NORMAL (fsync solo en los checkpoints: un corte
+#   de energía puede perder los últimos commits, no corromper la base),
+#   mmap y caché de páginas por conexión, conexiones persistentes que se
+#   verifican antes de reutilizarse y transacciones BEGIN IMMEDIATE, que
+#   esperan busy_timeout por el lock de escritura en vez de fallar con
+#   'database is locked' al pasar de lectura a escritura.
+# - predeterminado: los valores de SQLite y de Django; migrate vuelve a
+#   poner la base en modo DELETE.
+SQLITE_PERFILES = {
+    'rendimiento': {
+        'journal_mode': 'WAL',
+        'pragmas': {
+            'busy_timeout': 5000,
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            # Negativo: KiB.
+            'cache_size': -64 * 1024,
+        },
+        'conexion': {
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        },
+    },
+    'predeterminado': {
+        'journal_mode': 'DELETE',
+        'pragmas': {
+            'busy_timeout': 5000,
+            'synchronous': 'FULL',
+            'mmap_size': 0,
+            'cache_size': -2000,
+        },
+        'conexion': {
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'OPTIONS': {},
+        },
+    },
+}
+# Con None las conexiones quedan como las abre Django.
+SQLITE_PERFIL = 'rendimiento'
+
+# config/asgi.py define DJANGO_SERVIDOR=asgi. Django desaconseja las
+# conexiones persistentes bajo ASGI: el código sync de cada request corre
+# en hilos de sync_to_async y la conexión quedaría abierta en cada uno.
+SERVIDOR_ASGI = os.environ.get('DJANGO_SERVIDOR') == 'asgi'
+
+CONEXION_DB = dict(SQLITE_PERFILES[SQLITE_PERFIL]['conexion']) if SQLITE_PERFIL else {}
+if SERVIDOR_ASGI:
+    CONEXION_DB.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **CONEXION_DB,
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Compartido por todos los workers del servidor; guarda, entre otros, la
+# versión del caché de catálogos (customers.catalogos).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
     }
 }
 
@@ -128,3 +201,53 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
+
+# Renderers según el header Accept (customers.renderers): JSON con orjson
+# (o el de DRF si no está instalado) y MessagePack si msgpack lo está.
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'customers.renderers.OrjsonRenderer',
+        *(['customers.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Reportes generados en segundo plano (customers.reportes)
+REPORTES_DIR = BASE_DIR / 'reportes'
+# Segundos que un reporte generado permanece disponible para descarga.
+REPORTES_TTL = 60 * 60
+# Segundos sin actualizar su progreso tras los que un job en proceso (o
+# pendiente, desde su creación) se da por abandonado, p. ej. si el
+# proceso que lo generaba terminó.
+REPORTES_JOB_TIMEOUT = 30 * 60
+# Hilos del pool local de generación. Con 0 se generan en el mismo request.
+REPORTES_MAX_WORKERS = 2
+# Caché en disco de reportes descargados (customers.cache_reportes)
+REPORTES_CACHE_DIR = REPORTES_DIR / 'cache'
+REPORTES_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Instrumentación por request (customers.instrumentacion)
+INSTRUMENTACION_SERVER_TIMING = True
+INSTRUMENTACION_CONSULTAS_LENTAS = 3
+
+# Perfilado bajo demanda para staff (customers.perfiles)
+PERFILES_HABILITADOS = True
+PERFILES_DIR = BASE_DIR / 'perfiles'
+PERFILES_MAX_ARCHIVOS = 50
+# Segundos entre muestras del perfilador por muestreo.
+PERFILES_INTERVALO_MUESTREO = 0.005
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'customers.instrumentacion': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -8,7 +8,8 @@ from .models import (
     CategoriaProducto,
     Producto,
     Compra,
-    DetalleCompra
+    DetalleCompra,
+    ReporteJob
 )
 
 admin.site.register(TipoDocumento)
@@ -19,4 +20,5 @@ admin.site.register(Telefono)
 admin.site.register(CategoriaProducto)
 admin.site.register(Producto)
 admin.site.register(Compra)
-admin.site.register(DetalleCompra)
\ No newline at end of file
+admin.site.register(DetalleCompra)
+admin.site.register(ReporteJob)
\ No newline at end of file
@@ -4,3 +4,38 @@ from django.apps import AppConfig
 class CustomersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customers'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from . import instrumentacion, signals, sqlite  # noqa: F401
+        from .busqueda import reinstalar_triggers
+        from .catalogos import revisar
+
+        # Django desaconseja consultar la DB dentro de ready(): la copia
+        # de los catálogos se carga con el primer request de cada proceso
+        # y se revisa al empezar cada uno.
+        request_started.connect(
+            revisar, dispatch_uid='customers.catalogos.revisar'
+        )
+        # Los cambios de esquema que reconstruyen customers_cliente en
+        # SQLite eliminan los triggers del índice de búsqueda.
+        post_migrate.connect(
+            reinstalar_triggers, sender=self,
+            dispatch_uid='customers.busqueda.reinstalar_triggers'
+        )
+        # Cada conexión, también las de los hilos de sync_to_async, mide
+        # sus consultas cuando hay un request instrumentado activo.
+        connection_created.connect(
+            instrumentacion.instalar,
+            dispatch_uid='customers.instrumentacion.instalar'
+        )
+        connection_created.connect(
+            sqlite.aplicar_perfil, dispatch_uid='customers.sqlite.aplicar_perfil'
+        )
+        # journal_mode se guarda en el archivo: se aplica una vez por migrate.
+        post_migrate.connect(
+            sqlite.aplicar_journal_mode, sender=self,
+            dispatch_uid='customers.sqlite.aplicar_journal_mode'
+        )
@@ -0,0 +1,217 @@
+"""
+Variantes async del listado de clientes, el catálogo de tipos de
+documento y la descarga del reporte, para el despliegue ASGI
+(config/asgi.py).
+
+DRF no tiene vistas async: estas son vistas async de Django que toman
+de las vistas DRF los filtros, '?fields=', la paginación y el formato
+del reporte, y responden con los mismos renderers según el header
+Accept. Las consultas usan el ORM async (aiterator, afirst) y el CSV
+del reporte y los archivos del caché se envían con iteradores async,
+así un worker ASGI atiende muchas descargas lentas sin ocupar un hilo
+por cada una.
+
+El trabajo de CPU por fila (serializar, renderizar, escribir el CSV) y
+lo que sigue siendo sync (páginas por cursor de DRF, XLSX / TXT) corre
+en un hilo con sync_to_async, por bloques: hecho en el event loop, unas
+pocas descargas grandes demoran todos los demás requests del worker.
+
+'manage.py benchmark_concurrencia' compara estas vistas bajo ASGI con
+las vistas sync bajo WSGI.
+"""
+import os
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header
+from django.views import View
+from rest_framework.exceptions import APIException, NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import cache_reportes, catalogos, conditional, lectura, versiones
+from .exports import REPORTE_COLUMNAS, iter_csv
+from .instrumentacion import fase, medir_iteracion
+from .serializers import TipoDocumentoSerializer
+from .views import ClienteDownloadReportView, ClienteListView
+
+# Bytes por lectura al enviar un archivo.
+BLOQUE_ARCHIVO = 256 * 1024
+
+
+async def _aiter_bloques(lineas, tamano=lectura.CHUNK_SIZE):
+    """
+    Las líneas de un iterador sync, unidas de a 'tamano'. Cada bloque se
+    genera en el mismo hilo, que conserva la conexión y el cursor.
+    """
+    siguiente = sync_to_async(lambda: ''.join(islice(lineas, tamano)))
+    while bloque := await siguiente():
+        yield bloque
+
+
+async def _aiter_archivo(archivo):
+    leer = sync_to_async(archivo.read, thread_sensitive=False)
+    try:
+        while bloque := await leer(BLOQUE_ARCHIVO):
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def respuesta_archivo(archivo, filename, content_type):
+    """
+    Descarga de un archivo abierto, como FileResponse, pero leído por
+    bloques en un hilo: bajo ASGI, FileResponse carga el archivo completo
+    en memoria antes de enviarlo.
+    """
+    response = StreamingHttpResponse(_aiter_archivo(archivo), content_type=content_type)
+    response['Content-Length'] = os.fstat(archivo.fileno()).st_size
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+class AsyncAPIView(View):
+    """
+    Base de las vistas async. 'vista_sync' es la vista DRF de la que se
+    toman filtros y campos; los errores de DRF (validación, negociación)
+    se responden como lo haría la vista DRF.
+    """
+    vista_sync = None
+    # La API navegable necesita una vista DRF.
+    renderer_classes = [
+        renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if renderer.format != 'api'
+    ]
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.drf_request = Request(request)
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as error:
+            data = error.detail
+            if not isinstance(data, (list, dict)):
+                data = {'detail': data}
+            return self.responder(data, status=error.status_code)
+
+    def vista(self):
+        """Instancia de 'vista_sync' para el request actual."""
+        return self.vista_sync(
+            request=self.drf_request, args=self.args, kwargs=self.kwargs,
+            format_kwarg=None
+        )
+
+    def responder(self, data, status=200):
+        """Respuesta con 'data' renderizado según el header Accept."""
+        renderers = [renderer() for renderer in self.renderer_classes]
+        try:
+            renderer, media_type = DefaultContentNegotiation().select_renderer(
+                self.drf_request, renderers
+            )
+        except NotAcceptable as error:
+            renderer, media_type = renderers[0], renderers[0].media_type
+            data, status = {'detail': error.detail}, error.status_code
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = HttpResponse(
+            renderer.render(data, media_type, {}), status=status,
+            content_type=content_type
+        )
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class ClienteListAsyncView(AsyncAPIView):
+    """
+    ClienteListView async: mismos filtros, '?fields=', paginación por
+    cursor y validadores (ETag / Last-Modified).
+    """
+    vista_sync = ClienteListView
+
+    async def get(self, request, *args, **kwargs):
+        vista = self.vista()
+        campos = vista.get_campos() or vista.get_serializer_class().Meta.fields
+        queryset = vista.get_queryset()
+        if vista.paginator.solicitada(self.drf_request):
+            return self.responder(await sync_to_async(self.pagina)(vista, queryset, campos))
+
+        validadores = vista.validadores_de(
+            await versiones.aobtener_varias(vista.VERSIONES_VALIDADORES)
+        )
+        etag, timestamp, response = conditional.evaluar(request, validadores)
+        if response is not None:
+            return response
+
+        filas = [
+            fila async for fila in lectura.valores(queryset, campos).aiterator(
+                chunk_size=lectura.CHUNK_SIZE
+            )
+        ]
+        response = await sync_to_async(self.responder_filas)(filas, campos)
+        return conditional.agregar(response, etag, timestamp)
+
+    def responder_filas(self, filas, campos):
+        return self.responder(lectura.serializar(filas, campos))
+
+    @staticmethod
+    def pagina(vista, queryset, campos):
+        """Página por cursor de la vista DRF, ya serializada."""
+        page = vista.paginate_queryset(lectura.valores(queryset, campos))
+        return vista.get_paginated_response(lectura.serializar(page, campos)).data
+
+
+class TipoDocumentoListAsyncView(AsyncAPIView):
+    """TipoDocumentoListView async, desde el caché de catálogos."""
+
+    async def get(self, request, *args, **kwargs):
+        validadores = str(await catalogos.aversion_actual()), None
+        etag, timestamp, response = conditional.evaluar(request, validadores)
+        if response is not None:
+            return response
+        tipos = await catalogos.atipos_documento_activos()
+        data = TipoDocumentoSerializer(tipos, many=True).data
+        return conditional.agregar(self.responder(data), etag, timestamp)
+
+
+class ClienteDownloadReportAsyncView(AsyncAPIView):
+    """
+    ClienteDownloadReportView async, con el mismo caché en disco. El CSV
+    se envía en streaming async por bloques de filas generados en un
+    hilo; XLSX y TXT se escriben en un hilo.
+    """
+    vista_sync = ClienteDownloadReportView
+
+    async def get(self, request, *args, **kwargs):
+        vista = self.vista()
+        export_format, filename, content_type = vista.get_formato()
+        filtros = vista.get_filtros()
+        columnas = vista.get_campos() or REPORTE_COLUMNAS
+        with fase('cache'):
+            clave = await cache_reportes.acalcular_clave(export_format, filtros, columnas)
+            archivo = cache_reportes.buscar(clave, export_format)
+        if archivo:
+            try:
+                return respuesta_archivo(open(archivo, 'rb'), filename, content_type)
+            except FileNotFoundError:
+                pass
+
+        filas = medir_iteracion(
+            'serializacion', lectura.iter_filas(vista.get_queryset(), columnas)
+        )
+        if export_format == 'csv':
+            bloques = _aiter_bloques(iter_csv(filas, columnas))
+            response = StreamingHttpResponse(
+                cache_reportes.aiter_guardando(bloques, clave, 'csv'),
+                content_type=content_type
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        contenido = await sync_to_async(vista.generar_archivo)(
+            filas, export_format, columnas, clave
+        )
+        return respuesta_archivo(contenido, filename, content_type)
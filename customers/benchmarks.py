@@ -0,0 +1,182 @@
+"""
+Medición de los endpoints de customers para 'manage.py benchmark_endpoints'.
+
+Cada caso es una URL que se pide con el cliente de pruebas de Django
+(con todo el stack de middleware). Por caso se registran la latencia
+(mínima, mediana y p95), el número de consultas SQL, el pico de memoria
+de Python (tracemalloc, en una pasada aparte para no inflar los
+tiempos) y el tamaño de la respuesta.
+
+Los resultados se comparan contra presupuestos fijos por tamaño de
+dataset y, opcionalmente, contra un reporte anterior.
+"""
+import shutil
+import statistics
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import Cliente, Documento, TipoDocumento
+
+# Métricas que admiten una tolerancia relativa al comparar con otro
+# reporte, con una holgura absoluta para que el ruido en valores muy
+# pequeños no cuente como regresión.
+METRICAS_RELATIVAS = {'p50_ms': 2.0, 'pico_mb': 0.5}
+
+
+class Caso:
+    """
+    URL a medir. Con 'cache_reportes=False' se vacía el caché en disco
+    de reportes antes de cada pedido, para medir la generación.
+    """
+
+    def __init__(self, nombre, url, cache_reportes=True):
+        self.nombre = nombre
+        self.url = url
+        self.cache_reportes = cache_reportes
+
+
+def casos():
+    """Casos estándar, con filtros tomados de los datos cargados."""
+    documento = (
+        Documento.objects.filter(principal=True)
+        .order_by('id')
+        .values('tipo_documento_id', 'numero_documento')
+    )
+    mitad = documento.count() // 2
+    ejemplo = documento[mitad] if mitad else documento.first()
+    tipo = TipoDocumento.objects.filter(activo=True).order_by('id').first()
+
+    lista = [
+        Caso('clientes', '/api/clientes/'),
+        Caso('clientes_pagina', '/api/clientes/?page_size=100'),
+        Caso('clientes_campos', '/api/clientes/?fields=nombre,apellido,correo'),
+        Caso('clientes_fidelizacion', '/api/clientes/?aplica_fidelizacion=true'),
+        Caso('tipos_documento', '/api/tipos-documento/'),
+    ]
+    if tipo:
+        lista.append(Caso(
+            'clientes_tipo_documento', f'/api/clientes/?tipo_documento={tipo.id}'
+        ))
+    if ejemplo:
+        lista.append(Caso(
+            'clientes_numero_documento',
+            f"/api/clientes/?numero_documento={ejemplo['numero_documento']}"
+        ))
+    cliente = (
+        Cliente.objects.filter(activo=True).order_by('id')
+        .values('nombre', 'apellido')[mitad:mitad + 1].first()
+    )
+    if cliente:
+        apellido = cliente['apellido'].split()[0]
+        for nombre, texto in (
+            ('busqueda_prefijo', apellido[:4]),
+            ('busqueda_nombre_apellido', f"{cliente['nombre'].split()[0]} {apellido}"),
+        ):
+            lista.append(Caso(nombre, '/api/clientes/search/?' + urlencode({'q': texto})))
+    for formato in ('csv', 'xlsx', 'txt'):
+        lista.append(Caso(
+            f'download_{formato}', f'/api/download/?formato={formato}',
+            cache_reportes=False
+        ))
+    lista.append(Caso('download_csv_cache', '/api/download/?formato=csv'))
+    return lista
+
+
+def vaciar_cache_reportes():
+    shutil.rmtree(settings.REPORTES_CACHE_DIR, ignore_errors=True)
+
+
+def pedir(cliente, url):
+    """Hace el pedido y consume la respuesta completa. Retorna sus bytes."""
+    respuesta = cliente.get(url)
+    if respuesta.status_code != 200:
+        raise RuntimeError(f'{url} respondió {respuesta.status_code}')
+    if respuesta.streaming:
+        tamano = sum(len(parte) for parte in respuesta.streaming_content)
+    else:
+        tamano = len(respuesta.content)
+    respuesta.close()
+    return tamano
+
+
+def medir(cliente, caso, repeticiones=5):
+    """Mide un caso; el primer pedido calienta cachés y no se cuenta."""
+    if not caso.cache_reportes:
+        vaciar_cache_reportes()
+    pedir(cliente, caso.url)
+
+    tiempos = []
+    consultas = None
+    for _ in range(repeticiones):
+        if not caso.cache_reportes:
+            vaciar_cache_reportes()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            tamano = pedir(cliente, caso.url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas = len(capturadas)
+
+    if not caso.cache_reportes:
+        vaciar_cache_reportes()
+    tracemalloc.start()
+    try:
+        pedir(cliente, caso.url)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tiempos.sort()
+    return {
+        'url': caso.url,
+        'min_ms': round(tiempos[0], 3),
+        'p50_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 3),
+        'consultas': consultas,
+        'pico_mb': round(pico / 1024 / 1024, 3),
+        'bytes': tamano,
+    }
+
+
+def revisar_presupuestos(resultados, presupuestos):
+    """
+    Compara cada resultado con su presupuesto ({caso: {métrica: máximo}}).
+    Retorna la lista de excesos como texto.
+    """
+    fallas = []
+    for nombre, limites in presupuestos.items():
+        medido = resultados.get(nombre)
+        if medido is None:
+            continue
+        for metrica, maximo in limites.items():
+            if medido[metrica] > maximo:
+                fallas.append(
+                    f'{nombre}: {metrica} {medido[metrica]} > presupuesto {maximo}'
+                )
+    return fallas
+
+
+def comparar(resultados, base, tolerancia=1.5):
+    """
+    Compara contra los resultados de un reporte anterior. Las consultas
+    no pueden aumentar; latencia y memoria admiten 'tolerancia'.
+    """
+    fallas = []
+    for nombre, medido in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        if medido['consultas'] > anterior['consultas']:
+            fallas.append(
+                f"{nombre}: consultas {anterior['consultas']} -> {medido['consultas']}"
+            )
+        for metrica, holgura in METRICAS_RELATIVAS.items():
+            if medido[metrica] > anterior[metrica] * tolerancia + holgura:
+                fallas.append(
+                    f'{nombre}: {metrica} {anterior[metrica]} -> {medido[metrica]}'
+                )
+    return fallas
@@ -0,0 +1,270 @@
+"""
+Búsqueda de clientes por nombre, apellido o correo con un índice FTS5
+de SQLite, usada por ClienteSearchView.
+
+El índice es una tabla virtual FTS5 de contenido externo sobre
+customers_cliente: guarda solo el índice invertido y lee el texto de la
+tabla de clientes. Triggers de INSERT, DELETE y UPDATE de nombre,
+apellido o correo lo mantienen al día, incluidas las escrituras que no
+pasan por signals (bulk_create, upserts de la importación, DELETE
+directo de load_test_data).
+
+Con el tokenizer trigram (SQLite >= 3.34) cada término de 3 o más
+caracteres coincide como subcadena y los más cortos se aplican como
+prefijo con LIKE sobre esas coincidencias. Si todos los términos son
+cortos (p. ej. 'pe') el trigram no los indexa: se buscan como prefijo
+de las columnas en un segundo índice FTS5 (unicode61 con índices de
+prefijos de 1 y 2 caracteres), también por id. Sin trigram se usa
+unicode61 con prefijo por palabra en el índice principal.
+
+Orden: primero los clientes en que cada término es prefijo de alguna
+columna (consulta '^' de FTS5, resuelta con el índice) y luego el resto
+de coincidencias, por id. No se usa bm25(): calcula la frecuencia de
+cada término recorriendo todas sus coincidencias, y con términos
+comunes eso cuesta decenas de ms a un millón de clientes.
+
+SQLite reconstruye la tabla de clientes en algunos cambios de esquema
+y con ella se pierden los triggers: se vuelven a crear después de cada
+migrate (ver CustomersConfig.ready). 'manage.py rebuild_busqueda'
+regenera los dos índices completos.
+"""
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, transaction
+from django.db.models import Q
+
+from .models import Cliente
+
+TABLA = 'customers_cliente_busqueda'
+TABLA_PREFIJOS = 'customers_cliente_prefijos'
+CONTENIDO = 'customers_cliente'
+COLUMNAS = ('nombre', 'apellido', 'correo')
+
+# Tokenizers en orden de preferencia; se usa el primero que la versión
+# de SQLite soporte.
+TOKENIZERS = (
+    'trigram remove_diacritics 1',  # SQLite >= 3.45
+    'trigram',
+    'unicode61 remove_diacritics 2',
+)
+
+# Largo mínimo de un término que el tokenizer trigram puede indexar.
+LARGO_TRIGRAMA = 3
+
+# Índice de los términos más cortos que LARGO_TRIGRAMA: prefijos de 1 y
+# 2 caracteres de cada palabra.
+TOKENIZER_PREFIJOS = 'unicode61 remove_diacritics 2'
+PREFIJOS = '1 2'
+
+LIMITE = 20
+MAX_LIMITE = 100
+
+_columnas = ', '.join(COLUMNAS)
+_nuevos = ', '.join(f'new.{columna}' for columna in COLUMNAS)
+_anteriores = ', '.join(f'old.{columna}' for columna in COLUMNAS)
+
+
+
+def triggers(tabla):
+    """Triggers que mantienen al día el índice 'tabla'."""
+    return (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {tabla}_ai AFTER INSERT ON {CONTENIDO} BEGIN
+            INSERT INTO {tabla}(rowid, {_columnas}) VALUES (new.id, {_nuevos});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {tabla}_ad AFTER DELETE ON {CONTENIDO} BEGIN
+            INSERT INTO {tabla}({tabla}, rowid, {_columnas})
+            VALUES ('delete', old.id, {_anteriores});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {tabla}_au
+        AFTER UPDATE OF {_columnas} ON {CONTENIDO} BEGIN
+            INSERT INTO {tabla}({tabla}, rowid, {_columnas})
+            VALUES ('delete', old.id, {_anteriores});
+            INSERT INTO {tabla}(rowid, {_columnas}) VALUES (new.id, {_nuevos});
+        END
+        """,
+    )
+
+
+# Tokenizer del índice por alias de conexión.
+_tokenizers = {}
+
+
+def tokenizer(conexion=None):
+    """'trigram' o 'unicode61' según el índice, o None si no existe."""
+    conexion = conexion or connection
+    if conexion.vendor != 'sqlite':
+        return None
+    if conexion.alias not in _tokenizers:
+        with conexion.cursor() as cursor:
+            cursor.execute('SELECT sql FROM sqlite_master WHERE name = %s', [TABLA])
+            fila = cursor.fetchone()
+        if fila is None:
+            return None
+        _tokenizers[conexion.alias] = 'trigram' if 'trigram' in fila[0] else 'unicode61'
+    return _tokenizers[conexion.alias]
+
+
+def _existentes(cursor):
+    cursor.execute(
+        'SELECT name FROM sqlite_master WHERE name IN (%s, %s)', [TABLA, TABLA_PREFIJOS]
+    )
+    return {nombre for nombre, in cursor.fetchall()}
+
+
+def instalar(conexion=None):
+    """
+    Crea los índices que no existan y sus triggers. Retorna True si creó
+    alguno, que entonces debe poblarse con reconstruir().
+    """
+    conexion = conexion or connection
+    with conexion.cursor() as cursor:
+        existentes = _existentes(cursor)
+        if TABLA not in existentes:
+            for opciones in TOKENIZERS:
+                try:
+                    with transaction.atomic(using=conexion.alias):
+                        cursor.execute(
+                            f"CREATE VIRTUAL TABLE {TABLA} USING fts5({_columnas}, "
+                            f"content='{CONTENIDO}', content_rowid='id', "
+                            f"tokenize='{opciones}')"
+                        )
+                    break
+                except OperationalError:
+                    continue
+        if TABLA_PREFIJOS not in existentes:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {TABLA_PREFIJOS} USING fts5({_columnas}, "
+                f"content='{CONTENIDO}', content_rowid='id', "
+                f"tokenize='{TOKENIZER_PREFIJOS}', prefix='{PREFIJOS}')"
+            )
+        for tabla in (TABLA, TABLA_PREFIJOS):
+            for sql in triggers(tabla):
+                cursor.execute(sql)
+    _tokenizers.pop(conexion.alias, None)
+    return len(existentes) < 2
+
+
+def eliminar(conexion=None):
+    conexion = conexion or connection
+    with conexion.cursor() as cursor:
+        for tabla in (TABLA, TABLA_PREFIJOS):
+            for sufijo in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {tabla}_{sufijo}')
+            cursor.execute(f'DROP TABLE IF EXISTS {tabla}')
+    _tokenizers.pop(conexion.alias, None)
+
+
+def reconstruir(conexion=None):
+    """Regenera los índices completos desde la tabla de clientes y los compacta."""
+    conexion = conexion or connection
+    instalar(conexion)
+    with conexion.cursor() as cursor:
+        for tabla in (TABLA, TABLA_PREFIJOS):
+            cursor.execute(f"INSERT INTO {tabla}({tabla}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {tabla}({tabla}) VALUES ('optimize')")
+
+
+def reinstalar_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Receptor de post_migrate: repone los triggers de los índices que existen."""
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        for tabla in _existentes(cursor):
+            for sql in triggers(tabla):
+                cursor.execute(sql)
+
+
+def _frase(termino):
+    return '"' + termino.replace('"', '""') + '"'
+
+
+def _like(termino):
+    termino = termino.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return termino + '%'
+
+
+def buscar(texto, limite=LIMITE):
+    """
+    Ids de los clientes activos que coinciden con todos los términos de
+    'texto', en orden de relevancia. Lanza ValueError si no hay
+    términos que buscar.
+    """
+    terminos = texto.split()
+    if not terminos:
+        raise ValueError('Ingrese un texto a buscar.')
+
+    modo = tokenizer()
+    if modo is None:
+        return _buscar_sin_indice(terminos, limite)
+
+    if modo == 'trigram':
+        largos = [termino for termino in terminos if len(termino) >= LARGO_TRIGRAMA]
+        cortos = [termino for termino in terminos if len(termino) < LARGO_TRIGRAMA]
+        sufijo = ''
+    else:
+        largos, cortos, sufijo = terminos, [], '*'
+    columnas = '{' + ' '.join(COLUMNAS) + '}'
+    if not largos:
+        return _buscar_por_prefijo(cortos, columnas, limite)
+
+    prefijo = ' AND '.join(f'{columnas}: ^{_frase(t)}{sufijo}' for t in largos)
+    cualquiera = ' AND '.join(f'{_frase(t)}{sufijo}' for t in largos)
+
+    filtros = ''
+    parametros = []
+    for termino in cortos:
+        filtros += ' AND (' + ' OR '.join(
+            f"c.{columna} LIKE %s ESCAPE '\\'" for columna in COLUMNAS
+        ) + ')'
+        parametros += [_like(termino)] * len(COLUMNAS)
+    # Se ordena por el rowid del índice (igual a c.id): FTS5 ya entrega
+    # las coincidencias en ese orden y el LIMIT corta la lectura; con
+    # ORDER BY c.id SQLite las ordenaría todas antes de limitar.
+    sql = (
+        f'SELECT c.id FROM {TABLA} JOIN {CONTENIDO} c ON c.id = {TABLA}.rowid '
+        f'WHERE {TABLA} MATCH %s AND c.activo{filtros} ORDER BY {TABLA}.rowid LIMIT %s'
+    )
+
+    ids = []
+    with connection.cursor() as cursor:
+        for expresion in (prefijo, cualquiera):
+            # Se piden de más para completar el límite sin repetidos.
+            cursor.execute(sql, [expresion, *parametros, limite + len(ids)])
+            vistos = set(ids)
+            ids += [id_ for id_, in cursor.fetchall() if id_ not in vistos]
+            if len(ids) >= limite:
+                break
+    return ids[:limite]
+
+
+def _buscar_sin_indice(terminos, limite):
+    """Búsqueda con icontains para bases de datos sin el índice FTS5."""
+    queryset = Cliente.objects.filter(activo=True)
+    for termino in terminos:
+        queryset = queryset.filter(
+            Q(nombre__icontains=termino)
+            | Q(apellido__icontains=termino)
+            | Q(correo__icontains=termino)
+        )
+    return list(queryset.order_by('id').values_list('id', flat=True)[:limite])
+
+
+def _buscar_por_prefijo(terminos, columnas, limite):
+    """
+    Clientes activos con una columna que empieza con cada término,
+    resueltos con el índice de prefijos.
+    """
+    expresion = ' AND '.join(f'{columnas}: ^{_frase(t)}*' for t in terminos)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT c.id FROM {TABLA_PREFIJOS} '
+            f'JOIN {CONTENIDO} c ON c.id = {TABLA_PREFIJOS}.rowid '
+            f'WHERE {TABLA_PREFIJOS} MATCH %s AND c.activo '
+            f'ORDER BY {TABLA_PREFIJOS}.rowid LIMIT %s',
+            [expresion, limite]
+        )
+        return [id_ for id_, in cursor.fetchall()]
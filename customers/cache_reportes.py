@@ -0,0 +1,141 @@
+"""
+Caché en disco de los archivos del reporte de fidelización.
+
+La llave combina formato, filtros, columnas, la versión de datos del
+reporte (VersionDatos 'reporte', que cambia con cada escritura de
+Cliente, Documento, Telefono o Compra) y la versión de los catálogos. Los
+archivos se publican con un rename atómico y el directorio se poda por
+tamaño (REPORTES_CACHE_MAX_BYTES) eliminando primero los de uso más
+antiguo (LRU por mtime).
+
+Las funciones con prefijo 'a' son las variantes para las vistas async.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import catalogos, versiones
+
+
+def directorio():
+    ruta = Path(settings.REPORTES_CACHE_DIR)
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def _clave(formato, filtros, columnas, version_datos, version_catalogos):
+    contenido = json.dumps({
+        'formato': formato,
+        'filtros': filtros,
+        'columnas': columnas,
+        'datos': version_datos,
+        'catalogos': version_catalogos,
+    }, sort_keys=True)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def calcular_clave(formato, filtros, columnas=None):
+    """Llave del reporte para el estado actual de los datos."""
+    version_datos, _ = versiones.obtener(versiones.REPORTE)
+    return _clave(formato, filtros, columnas, version_datos, catalogos.version_actual())
+
+
+async def acalcular_clave(formato, filtros, columnas=None):
+    version_datos, _ = await versiones.aobtener(versiones.REPORTE)
+    return _clave(
+        formato, filtros, columnas, version_datos, await catalogos.aversion_actual()
+    )
+
+
+def ruta(clave, formato):
+    return directorio() / f'{clave}.{formato}'
+
+
+def buscar(clave, formato):
+    """Retorna la ruta del archivo en caché y lo marca como usado, o None."""
+    archivo = ruta(clave, formato)
+    try:
+        os.utime(archivo)
+    except FileNotFoundError:
+        return None
+    return archivo
+
+
+def archivo_temporal():
+    """Ruta temporal en el mismo directorio, para publicar con un rename."""
+    descriptor, nombre = tempfile.mkstemp(dir=directorio(), suffix='.tmp')
+    os.close(descriptor)
+    return Path(nombre)
+
+
+def publicar(temporal, clave, formato):
+    """Mueve el archivo temporal a su llave y poda el caché."""
+    destino = ruta(clave, formato)
+    os.replace(temporal, destino)
+    podar()
+    return destino
+
+
+def podar(max_bytes=None):
+    """Elimina los archivos usados hace más tiempo hasta respetar el límite."""
+    max_bytes = settings.REPORTES_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    archivos = []
+    for archivo in directorio().iterdir():
+        if archivo.suffix == '.tmp':
+            continue
+        try:
+            estado = archivo.stat()
+        except FileNotFoundError:
+            continue
+        archivos.append((estado.st_mtime, estado.st_size, archivo))
+
+    ocupado = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, archivo in sorted(archivos):
+        if ocupado <= max_bytes:
+            break
+        archivo.unlink(missing_ok=True)
+        ocupado -= tamano
+
+
+def iter_guardando(lineas, clave, formato):
+    """
+    Pasa las líneas de texto al cliente mientras las escribe en un archivo
+    temporal; al terminar lo publica en el caché. Si la descarga se corta
+    el archivo temporal se descarta.
+    """
+    temporal = archivo_temporal()
+    completo = False
+    try:
+        with open(temporal, 'w', newline='', encoding='utf-8') as archivo:
+            for linea in lineas:
+                archivo.write(linea)
+                yield linea
+        publicar(temporal, clave, formato)
+        completo = True
+    finally:
+        if not completo:
+            temporal.unlink(missing_ok=True)
+
+
+async def aiter_guardando(lineas, clave, formato):
+    """
+    iter_guardando() para un iterador async de líneas. Las escrituras van
+    al buffer del archivo; la publicación (rename y poda) corre en un hilo.
+    """
+    temporal = archivo_temporal()
+    completo = False
+    try:
+        with open(temporal, 'w', newline='', encoding='utf-8') as archivo:
+            async for linea in lineas:
+                archivo.write(linea)
+                yield linea
+        await sync_to_async(publicar)(temporal, clave, formato)
+        completo = True
+    finally:
+        if not completo:
+            temporal.unlink(missing_ok=True)
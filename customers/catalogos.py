@@ -0,0 +1,137 @@
+"""
+Caché en memoria del proceso para los catálogos TipoDocumento,
+TipoTelefono y CategoriaProducto.
+
+Cada proceso guarda una copia de los catálogos junto con la versión con
+la que la cargó. La versión compartida vive en el caché de Django
+(CLAVE_VERSION) y, si falta ahí, se lee de VersionDatos. Los signals de
+escritura incrementan la versión; cada worker la compara con la de su
+copia en revisar(), al empezar cada request (request_started) y cada job
+de reporte, y recarga la copia si cambió. Entre revisiones las búsquedas
+usan la copia local sin leer el caché compartido: el serializer busca
+el tipo de documento una vez por fila.
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from . import versiones
+from .models import TipoDocumento, TipoTelefono, CategoriaProducto
+
+CLAVE_VERSION = 'customers:catalogos:version'
+
+MODELOS = (TipoDocumento, TipoTelefono, CategoriaProducto)
+
+_lock = threading.Lock()
+_version = None
+_datos = {}
+
+
+def version_actual():
+    """Versión compartida de los catálogos, sin consultas si está en caché."""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version, _ = versiones.obtener(versiones.CATALOGOS)
+        cache.add(CLAVE_VERSION, version, timeout=None)
+    return version
+
+
+async def aversion_actual():
+    """version_actual() para las vistas async."""
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        version, _ = await versiones.aobtener(versiones.CATALOGOS)
+        await cache.aadd(CLAVE_VERSION, version, timeout=None)
+    return version
+
+
+def revisar(**kwargs):
+    """Recarga la copia local si la versión compartida cambió."""
+    global _version, _datos
+    version = version_actual()
+    if version != _version:
+        with _lock:
+            if version != _version:
+                _datos = {
+                    m: {obj.pk: obj for obj in m.objects.order_by('pk')}
+                    for m in MODELOS
+                }
+                _version = version
+
+
+def _catalogo(modelo):
+    """Registros del catálogo por id, cargándolos si no hay copia local."""
+    if _version is None:
+        revisar()
+    return _datos[modelo]
+
+
+async def acatalogo(modelo):
+    """_catalogo() para las vistas async: la carga corre en un hilo."""
+    if _version is None:
+        await sync_to_async(revisar)()
+    return _datos[modelo]
+
+
+def _activos_por_nombre(tipos):
+    return sorted(
+        (tipo for tipo in tipos.values() if tipo.activo),
+        key=lambda tipo: tipo.nombre
+    )
+
+
+def tipos_documento_activos():
+    """Tipos de documento activos ordenados por nombre."""
+    return _activos_por_nombre(_catalogo(TipoDocumento))
+
+
+async def atipos_documento_activos():
+    return _activos_por_nombre(await acatalogo(TipoDocumento))
+
+
+def tipo_documento(pk):
+    return _catalogo(TipoDocumento).get(pk)
+
+
+def tipo_telefono(pk):
+    return _catalogo(TipoTelefono).get(pk)
+
+
+def categoria_producto(pk):
+    return _catalogo(CategoriaProducto).get(pk)
+
+
+def resolver(modelo, valor):
+    """
+    Id del registro del catálogo indicado por id o por nombre (sin
+    distinguir mayúsculas), o None si no existe.
+    """
+    valor = str(valor).strip()
+    datos = _catalogo(modelo)
+    if valor.isdigit():
+        registro = datos.get(int(valor))
+        return registro.pk if registro else None
+    valor = valor.casefold()
+    for registro in datos.values():
+        if registro.nombre.casefold() == valor:
+            return registro.pk
+    return None
+
+
+def invalidar():
+    """
+    Incrementa la versión de los catálogos. La copia local se recarga en
+    la siguiente búsqueda y la versión compartida se publica al confirmar la
+    transacción, para que otros workers no recarguen datos sin confirmar.
+    """
+    global _version
+    versiones.incrementar(versiones.CATALOGOS)
+    _version = None
+    transaction.on_commit(_publicar_version)
+
+
+def _publicar_version():
+    version, _ = versiones.obtener(versiones.CATALOGOS)
+    cache.set(CLAVE_VERSION, version, timeout=None)
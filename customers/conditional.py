@@ -0,0 +1,56 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def evaluar(request, validadores):
+    """
+    ETag y timestamp de Last-Modified para los validadores (base,
+    last_modified) del request, más la respuesta 304 / 412 si el
+    request la amerita (o None).
+    """
+    base, last_modified = validadores
+    contenido = '|'.join([
+        base, request.get_full_path(), request.headers.get('Accept', '')
+    ])
+    etag = quote_etag(hashlib.sha1(contenido.encode()).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+
+
+def agregar(response, etag, timestamp):
+    """Agrega los validadores calculados con evaluar() a la respuesta."""
+    patch_vary_headers(response, ['Accept'])
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Agrega ETag / Last-Modified a un ListAPIView y responde 304 a
+    If-None-Match / If-Modified-Since antes de consultar y serializar
+    los datos.
+
+    La vista define get_validadores(), que retorna un texto que cambia
+    cuando cambian los datos y la fecha de última modificación (o None).
+    Si retorna None la respuesta se genera sin validadores.
+    El ETag combina ese texto con la ruta completa (filtros, cursor) y
+    el header Accept, por lo que cada variante tiene su propio ETag.
+    """
+
+    def get_validadores(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        validadores = self.get_validadores()
+        if validadores is None:
+            return super().get(request, *args, **kwargs)
+        etag, timestamp, response = evaluar(request, validadores)
+        if response is not None:
+            return response
+        return agregar(super().get(request, *args, **kwargs), etag, timestamp)
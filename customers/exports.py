@@ -0,0 +1,79 @@
+import csv
+from tempfile import SpooledTemporaryFile
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Orden de columnas del reporte de fidelización.
+REPORTE_COLUMNAS = [
+    'tipo_documento', 'numero_documento', 'nombre', 'apellido',
+    'correo', 'telefono', 'monto_ultimo_mes', 'aplica_fidelizacion'
+]
+
+# Filas del reporte por bloque: los jobs de customers.reportes actualizan
+# su progreso cada CHUNK_SIZE filas (las filas se leen con
+# customers.lectura).
+CHUNK_SIZE = 2000
+
+# Tamaño a partir del cual el XLSX generado pasa de memoria a disco.
+XLSX_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+XLSX_CONTENT_TYPE = (
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': XLSX_CONTENT_TYPE,
+    'txt': 'text/plain; charset=utf-8',
+}
+
+
+class Echo:
+    """
+    Buffer de solo escritura para csv.writer: retorna la línea en
+    lugar de guardarla, para poder emitirla directamente.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_csv(filas, columnas=REPORTE_COLUMNAS):
+    """Genera el CSV línea por línea: encabezado y luego cada fila."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(columnas)
+    for fila in filas:
+        yield writer.writerow(fila)
+
+
+def escribir_xlsx(filas, columnas=REPORTE_COLUMNAS, destino=None):
+    """
+    Escribe las filas en un libro XLSX en modo write-only de openpyxl:
+    cada fila se vuelca a disco al agregarse, sin mantener el árbol de
+    celdas en memoria.
+
+    Si se indica 'destino' (ruta o archivo) el libro se guarda ahí.
+    Si no, retorna un SpooledTemporaryFile posicionado al inicio, que
+    queda en memoria si es pequeño y pasa a disco al superar
+    XLSX_SPOOL_MAX_SIZE.
+    """
+    workbook = Workbook(write_only=True)
+    hoja = workbook.create_sheet('Sheet1')
+    hoja.append(columnas)
+    for fila in filas:
+        hoja.append(fila)
+
+    if destino is not None:
+        workbook.save(destino)
+        return destino
+
+    archivo = SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE)
+    workbook.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def escribir_txt(filas, columnas=REPORTE_COLUMNAS):
+    """Tabla de texto alineada (DataFrame.to_string) con todas las filas."""
+    df = pd.DataFrame(list(filas), columns=columnas)
+    return df.to_string(index=False)
@@ -0,0 +1,95 @@
+"""
+Cálculo de los campos desnormalizados de fidelización del Cliente
+(monto_ultimo_mes y aplica_fidelizacion) a partir del acumulado diario.
+
+Los signals de Compra refrescan al cliente afectado; el paso del tiempo
+(días que salen de la ventana) se cubre ejecutando periódicamente
+'manage.py refresh_fidelizacion'.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import versiones
+from .models import Cliente, GastoDiario
+
+# Monto mínimo de compras pagadas en el último mes para aplicar a fidelización.
+UMBRAL_FIDELIZACION = 5_000_000
+
+# Días de compras que cuentan para el monto del último mes.
+DIAS_VENTANA = 30
+
+BATCH_SIZE = 1000
+
+
+def inicio_ventana():
+    """Primer día que cuenta para el monto del último mes."""
+    return timezone.localdate(timezone.now() - timedelta(days=DIAS_VENTANA))
+
+
+def calcular_montos(cliente_ids, desde=None):
+    """Monto pagado en la ventana por cliente, con una consulta agregada."""
+    desde = desde or inicio_ventana()
+    return dict(
+        GastoDiario.objects.filter(
+            cliente_id__in=cliente_ids, estado='PAG', dia__gte=desde
+        )
+        .values('cliente_id')
+        .annotate(suma=Sum('total'))
+        .order_by()
+        .values_list('cliente_id', 'suma')
+    )
+
+
+def refrescar_clientes(cliente_ids, desde=None):
+    """
+    Recalcula los campos de fidelización de los clientes indicados y
+    guarda solo los que cambiaron. Retorna cuántos se actualizaron.
+    """
+    cliente_ids = list(cliente_ids)
+    montos = calcular_montos(cliente_ids, desde)
+    cambios = []
+    clientes = Cliente.objects.filter(id__in=cliente_ids).only(
+        'id', 'monto_ultimo_mes', 'aplica_fidelizacion'
+    )
+    for cliente in clientes:
+        monto = montos.get(cliente.id) or Decimal('0.00')
+        aplica = monto > UMBRAL_FIDELIZACION
+        if cliente.monto_ultimo_mes != monto or cliente.aplica_fidelizacion != aplica:
+            cliente.monto_ultimo_mes = monto
+            cliente.aplica_fidelizacion = aplica
+            cambios.append(cliente)
+
+    if cambios:
+        with transaction.atomic():
+            Cliente.objects.bulk_update(
+                cambios, ['monto_ultimo_mes', 'aplica_fidelizacion']
+            )
+            # bulk_update no dispara signals: se invalida el caché de reportes.
+            versiones.incrementar(versiones.REPORTE)
+    return len(cambios)
+
+
+def refrescar_todos(desde_id=0, batch_size=BATCH_SIZE):
+    """
+    Refresca todos los clientes por rangos de id a partir de 'desde_id'.
+    Cada bloque usa su propia transacción corta, para convivir con el
+    tráfico normal. Genera (último id procesado, actualizados) por bloque,
+    lo que permite reanudar desde el último id informado.
+    """
+    desde = inicio_ventana()
+    ultimo_id = desde_id
+    while True:
+        ids = list(
+            Cliente.objects.filter(id__gt=ultimo_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        actualizados = refrescar_clientes(ids, desde)
+        ultimo_id = ids[-1]
+        yield ultimo_id, actualizados
@@ -0,0 +1,118 @@
+"""
+Generación de filas sintéticas para 'manage.py load_test_data'.
+
+Las funciones trabajan solo con tipos básicos (sin el ORM) para poder
+ejecutarse en un ProcessPoolExecutor: cada bloque recibe su propia
+semilla, así el resultado es el mismo con cualquier número de procesos.
+"""
+import random
+import unicodedata
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from faker import Faker
+
+# Mezcla de estados de las compras (la mayoría pagadas).
+ESTADOS = ['PAG', 'PEN', 'CAN', 'DEV', 'PRO']
+PESOS_ESTADOS = [70, 10, 8, 5, 7]
+
+# Exponente de la distribución de Zipf de compras por cliente: pocos
+# clientes concentran muchas compras y la mayoría compra poco.
+EXPONENTE_ZIPF = 1.1
+
+# Faker es lento por llamada: los nombres se toman de un pool generado
+# una vez por bloque.
+TAMANO_POOL_NOMBRES = 500
+
+_contexto = {}
+
+
+def inicializar(contexto):
+    """Recibe los datos compartidos por todos los bloques de compras."""
+    _contexto.clear()
+    _contexto.update(contexto)
+
+
+def _ascii(texto):
+    texto = unicodedata.normalize('NFKD', texto)
+    return texto.encode('ascii', 'ignore').decode().lower().replace(' ', '')
+
+
+def generar_clientes(semilla, inicio, cantidad, tipos_doc, tipos_tel):
+    """
+    Genera 'cantidad' clientes numerados desde 'inicio'. Retorna tuplas
+    (nombre, apellido, correo, tipo_doc_id, numero_documento,
+    tipo_tel_id, telefono).
+    """
+    rnd = random.Random(semilla)
+    fake = Faker('es_CO')
+    fake.seed_instance(semilla)
+    nombres = [fake.first_name() for _ in range(TAMANO_POOL_NOMBRES)]
+    apellidos = [fake.last_name() for _ in range(TAMANO_POOL_NOMBRES)]
+
+    filas = []
+    for indice in range(inicio, inicio + cantidad):
+        nombre = rnd.choice(nombres)
+        apellido = rnd.choice(apellidos)
+        filas.append((
+            nombre,
+            apellido,
+            f'{_ascii(nombre)}.{_ascii(apellido)}.{indice}@example.com',
+            rnd.choice(tipos_doc),
+            str(10_000_000 + indice),
+            rnd.choice(tipos_tel),
+            f'3{rnd.randrange(100_000_000, 999_999_999)}',
+        ))
+    return filas
+
+
+def pesos_clientes(cliente_ids, semilla):
+    """
+    Pesos acumulados (Zipf) para elegir el cliente de cada compra.
+    El orden se baraja para que los grandes compradores no sean
+    siempre los primeros ids.
+    """
+    ids = list(cliente_ids)
+    random.Random(semilla).shuffle(ids)
+    acumulados = list(accumulate(
+        1 / (rango + 1) ** EXPONENTE_ZIPF for rango in range(len(ids))
+    ))
+    return ids, acumulados
+
+
+def generar_compras(semilla, inicio, cantidad):
+    """
+    Genera 'cantidad' compras numeradas desde 'inicio' usando el contexto
+    de inicializar(). Retorna tuplas (cliente_id, numero_factura,
+    fecha_compra, estado, total, [(producto_id, cantidad, precio), ...]).
+    """
+    rnd = random.Random(semilla)
+    cliente_ids = _contexto['cliente_ids']
+    acumulados = _contexto['pesos_clientes']
+    productos = _contexto['productos']
+    ahora = _contexto['ahora']
+    segundos = _contexto['dias'] * 24 * 60 * 60
+
+    clientes = rnd.choices(cliente_ids, cum_weights=acumulados, k=cantidad)
+    estados = rnd.choices(ESTADOS, weights=PESOS_ESTADOS, k=cantidad)
+    filas = []
+    for indice, cliente_id, estado in zip(
+        range(inicio, inicio + cantidad), clientes, estados
+    ):
+        # Fechas repartidas en la ventana, con más compras recientes.
+        antiguedad = segundos * rnd.random() ** 2
+        fecha = ahora - timedelta(seconds=antiguedad)
+
+        lineas = []
+        total = Decimal('0.00')
+        for _ in range(rnd.randint(1, 5)):
+            producto_id, precio = rnd.choice(productos)
+            cantidad_item = Decimal(rnd.randint(1, 3))
+            lineas.append((producto_id, cantidad_item, precio))
+            total += cantidad_item * precio
+
+        filas.append((
+            cliente_id, f'FAC-{indice:012d}', fecha, estado, total, lineas
+        ))
+    return filas
@@ -0,0 +1,331 @@
+"""
+Importación masiva de clientes (Cliente + Documento + Telefono) desde
+CSV o JSONL, usada por la vista ClienteImportView y por
+'manage.py importar_clientes'.
+
+Las filas se leen como stream, se validan una a una y se guardan por
+lotes, cada lote en su propia transacción:
+
+- Cliente se inserta o actualiza por 'correo' con
+  bulk_create(update_conflicts=True).
+- El documento y el teléfono de la fila quedan como principales: si el
+  cliente ya los tiene se marcan como principales, si no se crean, y
+  los demás del cliente dejan de ser principales.
+
+Una fila inválida se informa con su número y sus errores sin detener la
+importación; si un lote falla en la base de datos se informan todas
+sus filas. bulk_create no dispara signals, así que cada lote incrementa
+la versión de datos del reporte.
+"""
+import codecs
+import csv
+import json
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+
+from . import catalogos, versiones
+from .models import (
+    Cliente, Documento, Telefono, TipoDocumento, TipoTelefono,
+    normalizar_numero_documento
+)
+from .querysets import VALORES_BOOLEANOS
+
+BATCH_SIZE = 1000
+
+# Errores detallados que se incluyen en el resultado (el total se cuenta igual).
+MAX_ERRORES = 1000
+
+FORMATOS = ('csv', 'jsonl')
+
+COLUMNAS = (
+    'correo', 'nombre', 'apellido', 'activo', 'tipo_documento',
+    'numero_documento', 'telefono', 'tipo_telefono', 'extension',
+)
+
+
+def _largo(modelo, campo):
+    return modelo._meta.get_field(campo).max_length
+
+
+LARGOS = {
+    'nombre': _largo(Cliente, 'nombre'),
+    'apellido': _largo(Cliente, 'apellido'),
+    'correo': _largo(Cliente, 'correo'),
+    'numero_documento': _largo(Documento, 'numero_documento'),
+    'telefono': _largo(Telefono, 'numero'),
+    'extension': _largo(Telefono, 'extension'),
+}
+
+
+class Resultado:
+
+    def __init__(self):
+        self.procesadas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.total_errores = 0
+        self.errores = []
+
+    def agregar_error(self, fila, correo, errores):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'fila': fila, 'correo': correo, 'errores': errores})
+
+    def como_dict(self):
+        return {
+            'procesadas': self.procesadas,
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'total_errores': self.total_errores,
+            'errores': self.errores,
+        }
+
+
+def decodificar(lineas):
+    """Decodifica líneas en bytes como UTF-8 (con o sin BOM)."""
+    return codecs.iterdecode(lineas, 'utf-8-sig')
+
+
+def leer_csv(lineas):
+    """Genera (número de fila, dict, error de lectura) desde un CSV con encabezado."""
+    lector = csv.DictReader(lineas)
+    for fila in lector:
+        yield lector.line_num, fila, None
+
+
+def leer_jsonl(lineas):
+    """Genera (número de línea, dict, error de lectura) desde JSON Lines."""
+    for numero, linea in enumerate(lineas, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as error:
+            yield numero, None, f'JSON inválido: {error}'
+            continue
+        if not isinstance(fila, dict):
+            yield numero, None, 'Cada línea debe ser un objeto JSON.'
+            continue
+        yield numero, fila, None
+
+
+LECTORES = {'csv': leer_csv, 'jsonl': leer_jsonl}
+
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    if valor is None:
+        return ''
+    return str(valor).strip()
+
+
+def _resolver(modelo, valor, resueltos):
+    llave = (modelo, valor)
+    if llave not in resueltos:
+        resueltos[llave] = catalogos.resolver(modelo, valor)
+    return resueltos[llave]
+
+
+def validar_fila(fila, resueltos=None):
+    """
+    Retorna (datos limpios, errores por campo) de una fila. 'resueltos'
+    memoriza los tipos de catálogo ya resueltos durante una importación.
+    """
+    resueltos = {} if resueltos is None else resueltos
+    errores = {}
+    datos = {campo: _texto(fila, campo) for campo in COLUMNAS}
+
+    for campo in ('correo', 'nombre', 'apellido'):
+        if not datos[campo]:
+            errores[campo] = ['Este campo es requerido.']
+    for campo, largo in LARGOS.items():
+        if len(datos[campo]) > largo:
+            errores[campo] = [f'Máximo {largo} caracteres.']
+    if datos['correo'] and 'correo' not in errores:
+        try:
+            validate_email(datos['correo'])
+        except ValidationError:
+            errores['correo'] = ['Correo inválido.']
+
+    activo = fila.get('activo')
+    if isinstance(activo, bool):
+        datos['activo'] = activo
+    elif datos['activo']:
+        datos['activo'] = VALORES_BOOLEANOS.get(datos['activo'].lower())
+        if datos['activo'] is None:
+            errores['activo'] = ['Use true/false o 1/0.']
+    else:
+        datos['activo'] = None
+
+    if datos['numero_documento'] or datos['tipo_documento']:
+        datos['tipo_documento'] = _resolver(TipoDocumento, datos['tipo_documento'], resueltos)
+        if datos['tipo_documento'] is None:
+            errores['tipo_documento'] = ['Tipo de documento inexistente.']
+        if not datos['numero_documento']:
+            errores['numero_documento'] = ['Este campo es requerido.']
+
+    if datos['tipo_telefono']:
+        datos['tipo_telefono'] = _resolver(TipoTelefono, datos['tipo_telefono'], resueltos)
+        if datos['tipo_telefono'] is None:
+            errores['tipo_telefono'] = ['Tipo de teléfono inexistente.']
+    else:
+        datos['tipo_telefono'] = None
+    if (datos['tipo_telefono'] or datos['extension']) and not datos['telefono']:
+        errores['telefono'] = ['Este campo es requerido.']
+
+    return datos, errores
+
+
+def importar(filas, batch_size=BATCH_SIZE):
+    """
+    Importa las filas de un lector (leer_csv / leer_jsonl) por lotes.
+    Retorna el Resultado.
+    """
+    resultado = Resultado()
+    resueltos = {}
+    lote = []
+    for numero, fila, error in filas:
+        resultado.procesadas += 1
+        if error:
+            resultado.agregar_error(numero, None, {'__all__': [error]})
+            continue
+        datos, errores = validar_fila(fila, resueltos)
+        if errores:
+            resultado.agregar_error(numero, datos['correo'] or None, errores)
+            continue
+        lote.append((numero, datos))
+        if len(lote) >= batch_size:
+            _guardar_lote(lote, resultado)
+            lote = []
+    if lote:
+        _guardar_lote(lote, resultado)
+    return resultado
+
+
+def _guardar_lote(lote, resultado):
+    # Un correo repetido dentro del lote: gana la última fila.
+    por_correo = {datos['correo']: datos for _, datos in lote}
+    try:
+        with transaction.atomic():
+            existentes = set(
+                Cliente.objects.filter(correo__in=por_correo)
+                .values_list('correo', flat=True)
+            )
+            ids = _guardar_clientes(por_correo.values())
+            _guardar_documentos(por_correo.values(), ids)
+            _guardar_telefonos(por_correo.values(), ids)
+            versiones.incrementar(versiones.REPORTE)
+    except DatabaseError as error:
+        for numero, datos in lote:
+            resultado.agregar_error(numero, datos['correo'], {'__all__': [str(error)]})
+        return
+    resultado.creados += len(por_correo) - len(existentes)
+    resultado.actualizados += len(existentes)
+
+
+def _guardar_clientes(filas):
+    """Upsert por correo; retorna {correo: id}."""
+    ids = {}
+    # Sin columna 'activo' no se toca el valor de los clientes existentes.
+    con_activo = [datos for datos in filas if datos['activo'] is not None]
+    sin_activo = [datos for datos in filas if datos['activo'] is None]
+    for grupo, campos in (
+        (con_activo, ['nombre', 'apellido', 'activo', 'fecha_actualizacion']),
+        (sin_activo, ['nombre', 'apellido', 'fecha_actualizacion']),
+    ):
+        if not grupo:
+            continue
+        clientes = Cliente.objects.bulk_create(
+            [
+                Cliente(
+                    correo=datos['correo'], nombre=datos['nombre'],
+                    apellido=datos['apellido'],
+                    activo=True if datos['activo'] is None else datos['activo']
+                )
+                for datos in grupo
+            ],
+            update_conflicts=True,
+            unique_fields=['correo'],
+            update_fields=campos,
+        )
+        ids.update((cliente.correo, cliente.pk) for cliente in clientes)
+    return ids
+
+
+def _guardar_documentos(filas, ids):
+    nuevos = {}
+    for datos in filas:
+        if datos['numero_documento']:
+            cliente_id = ids[datos['correo']]
+            llave = (
+                cliente_id, datos['tipo_documento'],
+                normalizar_numero_documento(datos['numero_documento'])
+            )
+            nuevos[llave] = datos['numero_documento']
+    if not nuevos:
+        return
+
+    cliente_ids = {llave[0] for llave in nuevos}
+    principales = []
+    for id_, cliente_id, tipo_id, numero in Documento.objects.filter(
+        cliente_id__in=cliente_ids
+    ).values_list('id', 'cliente_id', 'tipo_documento_id', 'numero_normalizado'):
+        if nuevos.pop((cliente_id, tipo_id, numero), None) is not None:
+            principales.append(id_)
+
+    Documento.objects.filter(
+        cliente_id__in=cliente_ids, principal=True
+    ).exclude(id__in=principales).update(principal=False)
+    Documento.objects.filter(id__in=principales, principal=False).update(principal=True)
+    Documento.objects.bulk_create([
+        Documento(
+            cliente_id=cliente_id, tipo_documento_id=tipo_id,
+            numero_documento=numero_documento, numero_normalizado=numero,
+            principal=True
+        )
+        for (cliente_id, tipo_id, numero), numero_documento in nuevos.items()
+    ])
+
+
+def _guardar_telefonos(filas, ids):
+    nuevos = {}
+    for datos in filas:
+        if datos['telefono']:
+            nuevos[(ids[datos['correo']], datos['telefono'])] = datos
+    if not nuevos:
+        return
+
+    cliente_ids = {llave[0] for llave in nuevos}
+    coincidentes = []
+    # Los cambios se agrupan por valores nuevos: un UPDATE por grupo en
+    # lugar del CASE por fila de bulk_update, y nada si no hay cambios.
+    cambios = defaultdict(list)
+    for id_, cliente_id, numero, tipo_id, extension, principal in Telefono.objects.filter(
+        cliente_id__in=cliente_ids
+    ).values_list('id', 'cliente_id', 'numero', 'phone_type_id', 'extension', 'principal'):
+        datos = nuevos.pop((cliente_id, numero), None)
+        if datos is None:
+            continue
+        coincidentes.append(id_)
+        valores = (datos['tipo_telefono'] or tipo_id, datos['extension'] or extension)
+        if valores != (tipo_id, extension) or not principal:
+            cambios[valores].append(id_)
+
+    Telefono.objects.filter(
+        cliente_id__in=cliente_ids, principal=True
+    ).exclude(id__in=coincidentes).update(principal=False)
+    for (tipo_id, extension), telefono_ids in cambios.items():
+        Telefono.objects.filter(id__in=telefono_ids).update(
+            phone_type_id=tipo_id, extension=extension, principal=True
+        )
+    Telefono.objects.bulk_create([
+        Telefono(
+            cliente_id=cliente_id, numero=numero,
+            phone_type_id=datos['tipo_telefono'],
+            extension=datos['extension'] or None, principal=True
+        )
+        for (cliente_id, numero), datos in nuevos.items()
+    ])
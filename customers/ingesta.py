@@ -0,0 +1,249 @@
+"""
+Ingesta por lotes de compras (Compra + DetalleCompra) desde el punto de
+venta, usada por CompraLoteView.
+
+Por lote se hace una consulta para los productos (por 'codigo'), una
+para los clientes (por 'correo') y una para las facturas ya
+registradas; luego se insertan cabeceras y detalles con bulk_create. El
+total de cada compra se calcula al validar sus líneas, en la misma
+pasada.
+
+'numero_factura' es la llave de idempotencia: una factura ya registrada
+no se vuelve a crear y se informa en 'existentes' con su id, así el
+punto de venta puede reintentar un lote completo sin duplicar compras.
+La fecha de la compra es la de registro (auto_now_add).
+
+bulk_create no dispara signals: al terminar se refrescan el acumulado
+diario y la fidelización de los clientes afectados y se incrementa la
+versión de datos del reporte.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+
+from . import rollups, versiones
+from .models import Cliente, Compra, DetalleCompra, Producto
+from .totales import CENTAVOS
+
+# Máximo de compras por request.
+MAX_COMPRAS = 5000
+
+ESTADOS = {codigo for codigo, _ in Compra.ESTADO_CHOICES}
+
+LARGO_FACTURA = Compra._meta.get_field('numero_factura').max_length
+
+
+def _campo_decimal(modelo, nombre):
+    campo = modelo._meta.get_field(nombre)
+    return campo.max_digits, campo.decimal_places
+
+
+CANTIDAD = _campo_decimal(DetalleCompra, 'cantidad')
+PRECIO = _campo_decimal(DetalleCompra, 'precio_unitario')
+TOTAL = _campo_decimal(Compra, 'total')
+
+
+def _cabe(numero, digitos):
+    """True si 'numero' entra en un DecimalField con esos dígitos."""
+    max_digits, decimal_places = digitos
+    _, cifras, exponente = numero.as_tuple()
+    if exponente >= 0:
+        decimales, enteros = 0, len(cifras) + exponente
+    else:
+        decimales, enteros = -exponente, max(0, len(cifras) + exponente)
+    return decimales <= decimal_places and enteros <= max_digits - decimal_places
+
+
+def _decimal(valor, minimo, digitos):
+    """Decimal validado contra los dígitos del campo, o None si no es válido."""
+    try:
+        numero = Decimal(str(valor))
+    except (InvalidOperation, ValueError):
+        return None
+    if not numero.is_finite() or numero < minimo or not _cabe(numero, digitos):
+        return None
+    return numero
+
+
+def validar_compra(compra, productos, clientes):
+    """
+    Valida una compra del lote contra los productos y clientes ya
+    consultados. Retorna (datos, errores).
+    """
+    errores = {}
+    if not isinstance(compra, dict):
+        return None, {'__all__': ['Cada compra debe ser un objeto.']}
+
+    numero = compra.get('numero_factura')
+    if numero is None:
+        numero = ''
+    # Se aceptan textos y enteros; listas, objetos o booleanos no.
+    if isinstance(numero, bool) or not isinstance(numero, (str, int)):
+        errores['numero_factura'] = ['Debe ser un texto o un entero.']
+        numero = ''
+    else:
+        numero = str(numero).strip()
+        if not numero:
+            errores['numero_factura'] = ['Este campo es requerido.']
+        elif len(numero) > LARGO_FACTURA:
+            errores['numero_factura'] = [f'Máximo {LARGO_FACTURA} caracteres.']
+
+    cliente_id = clientes.get(str(compra.get('correo') or '').strip())
+    if cliente_id is None:
+        errores['correo'] = ['Cliente inexistente.']
+
+    estado = compra.get('estado') or 'PEN'
+    if not isinstance(estado, str) or estado not in ESTADOS:
+        errores['estado'] = [f'Use uno de: {", ".join(sorted(ESTADOS))}.']
+
+    detalles = compra.get('detalles')
+    lineas = []
+    total = Decimal('0')
+    if not isinstance(detalles, list) or not detalles:
+        errores['detalles'] = ['Debe tener al menos una línea.']
+        detalles = []
+    for indice, detalle in enumerate(detalles):
+        if not isinstance(detalle, dict):
+            errores[f'detalles[{indice}]'] = ['Cada línea debe ser un objeto.']
+            continue
+        producto = productos.get(str(detalle.get('producto') or '').strip())
+        cantidad = _decimal(detalle.get('cantidad', 1), Decimal('0.01'), CANTIDAD)
+        # Sin precio explícito se usa el precio base del producto.
+        precio = detalle.get('precio_unitario')
+        precio_valido = True
+        if precio is None:
+            precio = producto[1] if producto else None
+        else:
+            precio = _decimal(precio, Decimal('0'), PRECIO)
+            precio_valido = precio is not None
+        error_linea = []
+        if producto is None:
+            error_linea.append('Producto inexistente.')
+        if cantidad is None:
+            error_linea.append('Cantidad inválida.')
+        if not precio_valido:
+            error_linea.append('Precio unitario inválido.')
+        if not error_linea and not _cabe((cantidad * precio).quantize(CENTAVOS), TOTAL):
+            error_linea.append('El total de la línea excede el máximo.')
+        if error_linea:
+            errores[f'detalles[{indice}]'] = error_linea
+            continue
+        lineas.append((producto[0], cantidad, precio))
+        total += cantidad * precio
+
+    if lineas and not _cabe(total.quantize(CENTAVOS), TOTAL):
+        errores['total'] = ['El total de la compra excede el máximo.']
+
+    if errores:
+        return None, errores
+    return {
+        'numero_factura': numero,
+        'cliente_id': cliente_id,
+        'estado': estado,
+        'total': total.quantize(CENTAVOS),
+        'lineas': lineas,
+    }, {}
+
+
+def _consultar_catalogos(compras):
+    """Productos {codigo: (id, precio_base)} y clientes {correo: id} del lote."""
+    codigos = set()
+    correos = set()
+    for compra in compras:
+        if not isinstance(compra, dict):
+            continue
+        correos.add(str(compra.get('correo') or '').strip())
+        detalles = compra.get('detalles')
+        # validar_compra reporta el error de los detalles que no son lista.
+        if not isinstance(detalles, list):
+            continue
+        for detalle in detalles:
+            if isinstance(detalle, dict):
+                codigos.add(str(detalle.get('producto') or '').strip())
+    productos = {
+        codigo: (id_, precio)
+        for id_, codigo, precio in Producto.objects.filter(
+            codigo__in=codigos, activo=True
+        ).values_list('id', 'codigo', 'precio_base')
+    }
+    clientes = dict(
+        Cliente.objects.filter(correo__in=correos, activo=True)
+        .values_list('correo', 'id')
+    )
+    return productos, clientes
+
+
+def registrar_compras(compras):
+    """
+    Registra las compras válidas del lote. Retorna un dict con
+    'recibidas', 'creadas', 'existentes' y 'errores' (por índice).
+    """
+    productos, clientes = _consultar_catalogos(compras)
+    errores = []
+    validas = {}
+    for indice, compra in enumerate(compras):
+        datos, errores_compra = validar_compra(compra, productos, clientes)
+        if errores_compra:
+            numero = compra.get('numero_factura') if isinstance(compra, dict) else None
+            errores.append({'indice': indice, 'numero_factura': numero, 'errores': errores_compra})
+        elif datos['numero_factura'] in validas:
+            errores.append({
+                'indice': indice, 'numero_factura': datos['numero_factura'],
+                'errores': {'numero_factura': ['Repetida en el lote.']},
+            })
+        else:
+            validas[datos['numero_factura']] = datos
+
+    try:
+        creadas, existentes = _insertar(validas)
+    except IntegrityError:
+        # Otro request registró alguna de las facturas entre la consulta
+        # y la inserción: se reintenta una vez con las existentes al día.
+        creadas, existentes = _insertar(validas)
+
+    return {
+        'recibidas': len(compras),
+        'creadas': creadas,
+        'existentes': existentes,
+        'errores': errores,
+    }
+
+
+def _insertar(validas):
+    with transaction.atomic():
+        registradas = dict(
+            Compra.objects.filter(numero_factura__in=validas)
+            .values_list('numero_factura', 'id')
+        )
+        nuevas = [
+            datos for numero, datos in validas.items() if numero not in registradas
+        ]
+        compras = Compra.objects.bulk_create([
+            Compra(
+                cliente_id=datos['cliente_id'],
+                numero_factura=datos['numero_factura'],
+                estado=datos['estado'],
+                total=datos['total']
+            )
+            for datos in nuevas
+        ])
+        DetalleCompra.objects.bulk_create([
+            DetalleCompra(
+                compra_id=compra.pk, producto_id=producto_id,
+                cantidad=cantidad, precio_unitario=precio
+            )
+            for compra, datos in zip(compras, nuevas)
+            for producto_id, cantidad, precio in datos['lineas']
+        ])
+        if compras:
+            rollups.refrescar_clientes({datos['cliente_id'] for datos in nuevas})
+            versiones.incrementar(versiones.REPORTE)
+
+    creadas = [
+        {'numero_factura': compra.numero_factura, 'id': compra.pk, 'total': str(compra.total)}
+        for compra in compras
+    ]
+    existentes = [
+        {'numero_factura': numero, 'id': id_} for numero, id_ in registradas.items()
+    ]
+    return creadas, existentes
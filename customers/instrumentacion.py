@@ -0,0 +1,243 @@
+"""
+Medición por request de consultas SQL y fases de las vistas.
+
+InstrumentacionMiddleware crea una Medicion por request. Mientras está
+activa, un execute_wrapper de la conexión cuenta las consultas, suma su
+tiempo y guarda las más lentas, y las vistas marcan sus fases con
+fase() o medir_iteracion(). Al terminar se agrega el header
+Server-Timing y se escribe una línea de log en JSON.
+
+La Medicion vive en una ContextVar y el execute_wrapper se instala en
+cada conexión al crearse (connection_created), así también se miden
+las consultas del ORM async, que corren en los hilos de sync_to_async
+con su propia conexión. El middleware funciona en modo sync y async.
+
+En las respuestas en streaming el cuerpo se genera después de enviar
+los headers: Server-Timing cubre solo hasta crear la respuesta y la
+línea de log se escribe al terminar de enviar el cuerpo, con el total.
+Las FileResponse no se envuelven, para conservar sendfile: su línea de
+log se escribe al crear la respuesta.
+
+Sin una Medicion activa las funciones no hacen nada, así que las
+vistas pueden usarlas también fuera de un request (comandos, jobs).
+"""
+import contextvars
+import heapq
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_actual = contextvars.ContextVar('customers_medicion', default=None)
+
+# Largo máximo del SQL guardado para las consultas lentas.
+LARGO_SQL = 300
+
+
+class Medicion:
+    """Acumula consultas y fases de un request."""
+
+    def __init__(self, max_lentas=3):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.sql_ms = 0.0
+        self.fases = {}
+        self.max_lentas = max_lentas
+        self._lentas = []
+
+    def registrar_consulta(self, sql, duracion_ms):
+        self.consultas += 1
+        self.sql_ms += duracion_ms
+        if self.max_lentas:
+            entrada = (duracion_ms, self.consultas, sql)
+            if len(self._lentas) < self.max_lentas:
+                heapq.heappush(self._lentas, entrada)
+            elif duracion_ms > self._lentas[0][0]:
+                heapq.heapreplace(self._lentas, entrada)
+
+    def sumar_fase(self, nombre, duracion_ms):
+        self.fases[nombre] = self.fases.get(nombre, 0.0) + duracion_ms
+
+    def lentas(self):
+        return [
+            {'ms': round(duracion, 3), 'sql': sql[:LARGO_SQL]}
+            for duracion, _, sql in sorted(self._lentas, reverse=True)
+        ]
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def server_timing(self):
+        """Valor del header Server-Timing (duraciones en ms)."""
+        partes = [f'sql;dur={self.sql_ms:.1f};desc="{self.consultas} queries"']
+        partes += [f'{nombre};dur={ms:.1f}' for nombre, ms in self.fases.items()]
+        partes.append(f'total;dur={self.total_ms():.1f}')
+        return ', '.join(partes)
+
+    def como_dict(self):
+        return {
+            'total_ms': round(self.total_ms(), 3),
+            'consultas': self.consultas,
+            'sql_ms': round(self.sql_ms, 3),
+            'fases': {nombre: round(ms, 3) for nombre, ms in self.fases.items()},
+            'consultas_lentas': self.lentas(),
+        }
+
+
+def instalar(sender=None, connection=None, **kwargs):
+    """
+    Receptor de connection_created: agrega el execute_wrapper que mide
+    las consultas de la conexión mientras haya una Medicion activa.
+    """
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+@contextmanager
+def activar(medicion):
+    """
+    Activa la medición en el contexto actual y registra las consultas
+    de todas las conexiones mientras dura el bloque.
+    """
+    token = _actual.set(medicion)
+    # Las conexiones de este hilo abiertas antes de conectar el receptor.
+    for conexion in connections.all():
+        instalar(connection=conexion)
+    try:
+        yield medicion
+    finally:
+        _actual.reset(token)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.registrar_consulta(sql, (time.perf_counter() - inicio) * 1000)
+
+
+@contextmanager
+def fase(nombre):
+    """Suma la duración del bloque a la fase 'nombre' del request."""
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar_fase(nombre, (time.perf_counter() - inicio) * 1000)
+
+
+def medir_iteracion(nombre, iterable):
+    """
+    Suma a la fase 'nombre' el tiempo de producir cada elemento, para
+    medir generadores que otra fase consume (p. ej. serializar filas
+    mientras se escribe el archivo).
+    """
+    if _actual.get() is None:
+        yield from iterable
+        return
+    iterador = iter(iterable)
+    while True:
+        with fase(nombre):
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+        yield elemento
+
+
+def registrar(request, response, medicion):
+    datos = {
+        'metodo': request.method,
+        'ruta': request.path,
+        'estado': response.status_code,
+        **medicion.como_dict(),
+    }
+    logger.info(json.dumps(datos, ensure_ascii=False))
+
+
+def _iter_streaming(contenido, request, response, medicion):
+    """
+    Mide el envío del cuerpo en streaming y registra al terminar, también
+    si el cliente corta la descarga.
+    """
+    try:
+        with activar(medicion), fase('streaming'):
+            yield from contenido
+    finally:
+        registrar(request, response, medicion)
+
+
+async def _aiter_streaming(contenido, request, response, medicion):
+    """_iter_streaming() para el cuerpo async de las vistas async."""
+    try:
+        with activar(medicion), fase('streaming'):
+            async for parte in contenido:
+                yield parte
+    finally:
+        registrar(request, response, medicion)
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide cada request: consultas SQL, fases marcadas por las vistas y
+    tiempo total. Agrega Server-Timing si INSTRUMENTACION_SERVER_TIMING
+    está activo y escribe una línea de log JSON en 'customers.instrumentacion'.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        medicion = self.crear_medicion()
+        with activar(medicion):
+            response = self.get_response(request)
+        return self.terminar(request, response, medicion)
+
+    async def __acall__(self, request):
+        medicion = self.crear_medicion()
+        with activar(medicion):
+            response = await self.get_response(request)
+        return self.terminar(request, response, medicion)
+
+    def crear_medicion(self):
+        return Medicion(getattr(settings, 'INSTRUMENTACION_CONSULTAS_LENTAS', 3))
+
+    def terminar(self, request, response, medicion):
+        if getattr(settings, 'INSTRUMENTACION_SERVER_TIMING', True):
+            response['Server-Timing'] = medicion.server_timing()
+
+        # FileResponse se registra de inmediato: reemplazar su contenido
+        # descarta file_to_stream y el servidor ya no puede usar sendfile
+        # (wsgi.file_wrapper). Enviar un archivo no hace consultas.
+        if not response.streaming or getattr(response, 'file_to_stream', None):
+            registrar(request, response, medicion)
+        elif response.is_async:
+            response.streaming_content = _aiter_streaming(
+                response.streaming_content, request, response, medicion
+            )
+        else:
+            response.streaming_content = _iter_streaming(
+                response.streaming_content, request, response, medicion
+            )
+        return response
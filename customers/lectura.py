@@ -0,0 +1,104 @@
+"""
+Lectura rápida de clientes para los listados de solo lectura
+(ClienteListView y ClienteDownloadReportView).
+
+Produce las mismas filas que ClienteListSerializer y
+ClienteReporteFidelizacionSerializer sin instancias de modelo ni campos
+de DRF por fila: el queryset se lee con values() y el documento y el
+teléfono principales se anotan como subconsultas correlacionadas (por
+el índice de cliente_id), así una sola consulta trae cada cliente con
+todo lo que se serializa. El nombre del tipo de documento sale del
+caché de catálogos una vez por tipo.
+
+Los serializers siguen definiendo la salida: las pruebas comparan ambas
+rutas y el decimal se formatea con el mismo campo de DRF.
+'manage.py benchmark_serializacion' mide la diferencia.
+"""
+from operator import itemgetter
+
+from django.db.models import OuterRef, Subquery
+
+from . import catalogos
+from .models import Documento, Telefono
+from .serializers import ClienteReporteFidelizacionSerializer
+
+# Clientes leídos por consulta al recorrer el queryset en streaming.
+CHUNK_SIZE = 2000
+
+# Campo serializado -> (alias de la anotación, modelo, columna).
+SUBCONSULTAS = {
+    'tipo_documento': ('documento_tipo_id', Documento, 'tipo_documento_id'),
+    'numero_documento': ('documento_numero', Documento, 'numero_documento'),
+    'telefono': ('telefono_numero', Telefono, 'numero'),
+}
+
+
+def _principal(modelo, columna):
+    """'columna' del registro prioritario del cliente, como primer_principal()."""
+    return Subquery(
+        modelo.objects.filter(cliente=OuterRef('pk'))
+        .order_by('-principal', 'id')
+        .values(columna)[:1]
+    )
+
+
+def valores(queryset, campos):
+    """values() del queryset con las columnas y subconsultas que usan 'campos'."""
+    columnas = ['id']
+    anotaciones = {}
+    for campo in campos:
+        if campo in SUBCONSULTAS:
+            alias, modelo, columna = SUBCONSULTAS[campo]
+            anotaciones[alias] = _principal(modelo, columna)
+        else:
+            columnas.append(campo)
+    return queryset.annotate(**anotaciones).values(*columnas, *anotaciones)
+
+
+def lectores(campos):
+    """
+    Una función por campo que toma el dict de valores() y retorna el
+    valor serializado. Los nombres de tipo de documento se memorizan
+    durante la vida de los lectores.
+    """
+    decimal = ClienteReporteFidelizacionSerializer().fields['monto_ultimo_mes']
+    tipos = {None: None}
+
+    def tipo_documento(fila):
+        tipo_id = fila['documento_tipo_id']
+        if tipo_id not in tipos:
+            tipo = catalogos.tipo_documento(tipo_id)
+            tipos[tipo_id] = tipo.nombre if tipo else None
+        return tipos[tipo_id]
+
+    def monto_ultimo_mes(fila):
+        valor = fila['monto_ultimo_mes']
+        return None if valor is None else decimal.to_representation(valor)
+
+    especiales = {
+        'tipo_documento': tipo_documento,
+        'numero_documento': itemgetter('documento_numero'),
+        'telefono': itemgetter('telefono_numero'),
+        'monto_ultimo_mes': monto_ultimo_mes,
+    }
+    return [especiales.get(campo) or itemgetter(campo) for campo in campos]
+
+
+def serializar(filas, campos):
+    """Dicts serializados, con 'campos' en orden, de las filas de valores()."""
+    funciones = list(zip(campos, lectores(campos)))
+    return [
+        {campo: lector(fila) for campo, lector in funciones}
+        for fila in filas
+    ]
+
+
+def iter_filas(queryset, columnas, chunk_size=CHUNK_SIZE):
+    """
+    Genera una lista de valores por cliente, en el orden de 'columnas',
+    leyendo el queryset por bloques para que la memoria no dependa del
+    número de clientes.
+    """
+    funciones = lectores(columnas)
+    for fila in valores(queryset, columnas).iterator(chunk_size=chunk_size):
+        yield [lector(fila) for lector in funciones]
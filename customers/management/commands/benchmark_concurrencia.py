@@ -0,0 +1,210 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from customers import benchmarks
+
+# Segundos de envío acumulados antes de dormir al simular un cliente lento.
+DEUDA_MINIMA = 0.01
+
+
+class ClienteLento:
+    """Cuenta los bytes recibidos y calcula la espera para un ancho de banda dado."""
+
+    def __init__(self, velocidad):
+        self.velocidad = velocidad
+        self.bytes = 0
+        self.deuda = 0.0
+
+    def recibir(self, parte):
+        """Segundos que el cliente tarda en recibir lo acumulado, o 0."""
+        self.bytes += len(parte)
+        if not self.velocidad:
+            return 0
+        self.deuda += len(parte) / self.velocidad
+        if self.deuda < DEUDA_MINIMA:
+            return 0
+        espera, self.deuda = self.deuda, 0.0
+        return espera
+
+
+def pedir_wsgi(aplicacion, url, velocidad=None):
+    """Atiende el pedido con el handler WSGI. Retorna los bytes recibidos."""
+    ruta = urlsplit(url)
+    environ = {'PATH_INFO': ruta.path, 'QUERY_STRING': ruta.query}
+    setup_testing_defaults(environ)
+    estados = []
+    cuerpo = aplicacion(environ, lambda estado, headers: estados.append(estado))
+    cliente = ClienteLento(velocidad)
+    try:
+        for parte in cuerpo:
+            espera = cliente.recibir(parte)
+            if espera:
+                time.sleep(espera)
+    finally:
+        cuerpo.close()
+    if not estados[0].startswith('200'):
+        raise RuntimeError(f'{url} respondió {estados[0]}')
+    return cliente.bytes
+
+
+async def pedir_asgi(aplicacion, url, velocidad=None):
+    """Atiende el pedido con el handler ASGI. Retorna los bytes recibidos."""
+    ruta = urlsplit(url)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'root_path': '',
+        'path': ruta.path, 'raw_path': ruta.path.encode(),
+        'query_string': ruta.query.encode(),
+        'headers': [(b'host', b'127.0.0.1')],
+        'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80),
+    }
+    enviado = False
+    terminado = asyncio.Event()
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await terminado.wait()
+        return {'type': 'http.disconnect'}
+
+    estados = []
+    cliente = ClienteLento(velocidad)
+
+    async def send(mensaje):
+        if mensaje['type'] == 'http.response.start':
+            estados.append(mensaje['status'])
+        elif mensaje['type'] == 'http.response.body':
+            espera = cliente.recibir(mensaje.get('body', b''))
+            if espera:
+                await asyncio.sleep(espera)
+
+    try:
+        await aplicacion(scope, receive, send)
+    finally:
+        terminado.set()
+    if estados[0] != 200:
+        raise RuntimeError(f'{url} respondió {estados[0]}')
+    return cliente.bytes
+
+
+def latencia_wsgi(aplicacion, url, enviado):
+    pedir_wsgi(aplicacion, url)
+    return time.perf_counter() - enviado
+
+
+async def latencia_asgi(aplicacion, url):
+    enviado = time.perf_counter()
+    await pedir_asgi(aplicacion, url)
+    return time.perf_counter() - enviado
+
+
+def resumir(latencias):
+    latencias = sorted(latencias)
+    return (
+        statistics.median(latencias) * 1000,
+        latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000,
+        latencias[-1] * 1000,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Serves slow report downloads concurrently with short list and '
+        'catalog requests, through the sync views on a threaded WSGI '
+        'handler and through the async views on a single ASGI event loop, '
+        'and reports the latency of the short requests on each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--descargas', type=int, default=8,
+            help='Concurrent CSV report downloads.',
+        )
+        parser.add_argument(
+            '--velocidad', type=float, default=1024 * 1024,
+            help='Bytes per second each download client receives (0 = unlimited).',
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=0.05,
+            help='Seconds between short requests while the downloads run.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Threads of the WSGI server.',
+        )
+
+    def handle(self, *args, **options):
+        rutas = {
+            'wsgi': (
+                reverse('cliente-download-csv'),
+                [reverse('cliente-list') + '?page_size=20', reverse('tipo-documento-list')],
+            ),
+            'asgi': (
+                reverse('cliente-download-async'),
+                [
+                    reverse('cliente-list-async') + '?page_size=20',
+                    reverse('tipo-documento-list-async'),
+                ],
+            ),
+        }
+        resultados = {
+            'wsgi': self.medir_wsgi(*rutas['wsgi'], options),
+            'asgi': asyncio.run(self.medir_asgi(*rutas['asgi'], options)),
+        }
+        for nombre, (duracion, tamano, latencias) in resultados.items():
+            p50, p95, maximo = resumir(latencias)
+            self.stdout.write(
+                f'{nombre}  downloads {options["descargas"]} x {tamano / 1024:8.1f} KiB '
+                f'in {duracion:7.2f} s  {len(latencias)} short requests '
+                f'p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  max {maximo:8.1f} ms'
+            )
+
+    def medir_wsgi(self, descarga, rapidas, options):
+        aplicacion = WSGIHandler()
+        benchmarks.vaciar_cache_reportes()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            inicio = time.perf_counter()
+            descargas = [
+                pool.submit(pedir_wsgi, aplicacion, descarga, options['velocidad'])
+                for _ in range(options['descargas'])
+            ]
+            pedidos = []
+            while not all(futuro.done() for futuro in descargas):
+                url = rapidas[len(pedidos) % len(rapidas)]
+                pedidos.append(
+                    pool.submit(latencia_wsgi, aplicacion, url, time.perf_counter())
+                )
+                time.sleep(options['intervalo'])
+            tamano = max(futuro.result() for futuro in descargas)
+            duracion = time.perf_counter() - inicio
+            latencias = [futuro.result() for futuro in pedidos]
+        return duracion, tamano, latencias
+
+    async def medir_asgi(self, descarga, rapidas, options):
+        aplicacion = ASGIHandler()
+        benchmarks.vaciar_cache_reportes()
+        inicio = time.perf_counter()
+        descargas = [
+            asyncio.create_task(pedir_asgi(aplicacion, descarga, options['velocidad']))
+            for _ in range(options['descargas'])
+        ]
+        pedidos = []
+        while not all(tarea.done() for tarea in descargas):
+            url = rapidas[len(pedidos) % len(rapidas)]
+            pedidos.append(asyncio.create_task(latencia_asgi(aplicacion, url)))
+            await asyncio.sleep(options['intervalo'])
+        tamano = max(await asyncio.gather(*descargas))
+        duracion = time.perf_counter() - inicio
+        latencias = await asyncio.gather(*pedidos)
+        return duracion, tamano, latencias
@@ -0,0 +1,205 @@
+import json
+import logging
+import platform
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+from django.utils import timezone
+
+from customers import benchmarks
+from customers.models import Cliente, TipoDocumento
+
+DIRECTORIO = settings.BASE_DIR / 'benchmarks'
+PRESUPUESTOS = DIRECTORIO / 'presupuestos.json'
+
+SUFIJOS = {'k': 1_000, 'm': 1_000_000}
+
+
+def tamano(valor):
+    """Acepta '1000', '1k', '100k' o '1m'."""
+    valor = valor.strip().lower()
+    if valor[-1:] in SUFIJOS:
+        return int(valor[:-1]) * SUFIJOS[valor[-1]]
+    return int(valor)
+
+
+def etiqueta(clientes):
+    for sufijo, factor in sorted(SUFIJOS.items(), key=lambda s: -s[1]):
+        if clientes >= factor and clientes % factor == 0:
+            return f'{clientes // factor}{sufijo}'
+    return str(clientes)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a separate benchmark database and measures latency, SQL '
+        'query count and peak Python memory of the customers endpoints. '
+        'Writes a JSON report and fails on budget or baseline regressions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clientes', type=tamano, default=1_000,
+            help='Dataset size in customers (e.g. 1k, 100k, 1m).',
+        )
+        parser.add_argument(
+            '--compras', type=tamano, default=None,
+            help='Number of orders (default: 3 per customer).',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes used to generate the dataset.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Timed requests per case, after one warm-up request.',
+        )
+        parser.add_argument(
+            '--casos', nargs='*', default=None,
+            help='Only run these cases (default: all).',
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='JSON report path (default: benchmarks/resultados/<size>_<timestamp>.json).',
+        )
+        parser.add_argument(
+            '--budgets', default=str(PRESUPUESTOS),
+            help='JSON budgets file, keyed by dataset size label.',
+        )
+        parser.add_argument(
+            '--baseline', default=None,
+            help='Previous JSON report to compare against.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.5,
+            help='Allowed latency/memory ratio against the baseline.',
+        )
+        parser.add_argument(
+            '--fresh', action='store_true',
+            help='Discard the cached benchmark database and seed it again.',
+        )
+
+    def handle(self, *args, **options):
+        clientes = options['clientes']
+        compras = options['compras'] if options['compras'] is not None else clientes * 3
+        nombre = etiqueta(clientes)
+
+        # La base de benchmark es un archivo aparte, reutilizable entre
+        # corridas: sembrar un millón de clientes toma minutos.
+        DIRECTORIO.mkdir(exist_ok=True)
+        ruta_db = DIRECTORIO / f'db_{nombre}_{compras}_{options["seed"]}.sqlite3'
+        if options['fresh']:
+            ruta_db.unlink(missing_ok=True)
+
+        nombre_original = connection.settings_dict['NAME']
+        connection.settings_dict['TEST']['NAME'] = str(ruta_db)
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=True)
+        setup_test_environment()
+        temporal = tempfile.TemporaryDirectory()
+        ajustes = override_settings(
+            DEBUG=False,
+            REPORTES_DIR=temporal.name,
+            REPORTES_CACHE_DIR=str(Path(temporal.name) / 'cache'),
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+            }},
+        )
+        try:
+            with ajustes:
+                self.sembrar(clientes, compras, options)
+                resultados = self.medir(options)
+        finally:
+            teardown_test_environment()
+            temporal.cleanup()
+            connection.creation.destroy_test_db(
+                nombre_original, verbosity=0, keepdb=True
+            )
+
+        reporte = {
+            'fecha': timezone.now().isoformat(),
+            'dataset': {
+                'etiqueta': nombre, 'clientes': clientes,
+                'compras': compras, 'semilla': options['seed'],
+            },
+            'repeticiones': options['repeat'],
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'maquina': platform.machine(),
+            },
+            'resultados': resultados,
+        }
+        salida = Path(options['output'] or (
+            DIRECTORIO / 'resultados'
+            / f"{nombre}_{timezone.now().strftime('%Y%m%d%H%M%S')}.json"
+        ))
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(reporte, indent=2), encoding='utf-8')
+        self.stdout.write(f'Report written to {salida}')
+
+        fallas = []
+        ruta_presupuestos = Path(options['budgets'])
+        if ruta_presupuestos.exists():
+            presupuestos = json.loads(ruta_presupuestos.read_text(encoding='utf-8'))
+            if nombre in presupuestos:
+                fallas += benchmarks.revisar_presupuestos(resultados, presupuestos[nombre])
+            else:
+                self.stdout.write(self.style.WARNING(f'No budgets for dataset {nombre}.'))
+        if options['baseline']:
+            base = json.loads(Path(options['baseline']).read_text(encoding='utf-8'))
+            fallas += benchmarks.comparar(
+                resultados, base['resultados'], options['tolerance']
+            )
+
+        if fallas:
+            for falla in fallas:
+                self.stdout.write(self.style.ERROR(falla))
+            raise CommandError(f'{len(fallas)} benchmark regressions.')
+        self.stdout.write(self.style.SUCCESS('All benchmarks within budget.'))
+
+    def sembrar(self, clientes, compras, options):
+        if not TipoDocumento.objects.exists():
+            call_command('loaddata', 'catalogos', verbosity=0)
+        if Cliente.objects.count() == clientes:
+            self.stdout.write(f'Reusing benchmark dataset with {clientes} customers.')
+            return
+        self.stdout.write(f'Seeding {clientes} customers and {compras} orders...')
+        with override_settings(DEBUG=True):
+            call_command(
+                'load_test_data', clean=True, clientes=clientes, compras=compras,
+                productos=max(25, clientes // 1000), seed=options['seed'],
+                workers=options['workers'], stdout=self.stdout
+            )
+
+    def medir(self, options):
+        # La línea de log por request se sigue generando (su costo entra
+        # en la medición) pero no se muestra entre los resultados.
+        logging.getLogger('customers.instrumentacion').setLevel(logging.WARNING)
+        cliente = Client()
+        resultados = {}
+        for caso in benchmarks.casos():
+            if options['casos'] and caso.nombre not in options['casos']:
+                continue
+            resultados[caso.nombre] = medido = benchmarks.medir(
+                cliente, caso, options['repeat']
+            )
+            self.stdout.write(
+                f"{caso.nombre:<28} p50 {medido['p50_ms']:10.2f} ms  "
+                f"p95 {medido['p95_ms']:10.2f} ms  "
+                f"{medido['consultas']:3d} queries  "
+                f"peak {medido['pico_mb']:8.2f} MiB  "
+                f"{medido['bytes'] / 1024:10.1f} KiB"
+            )
+        return resultados
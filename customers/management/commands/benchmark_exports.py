@@ -0,0 +1,75 @@
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from customers import lectura
+from customers.exports import REPORTE_COLUMNAS, escribir_xlsx
+from customers.querysets import clientes_activos
+from customers.views import ClienteDownloadReportView
+
+
+def xlsx_pandas(view, queryset):
+    """Ruta anterior: serializa todo, arma un DataFrame y usa to_excel."""
+    data = view.get_serializer(clientes_activos(), many=True).data
+    df = pd.DataFrame(data)
+    df = df.reindex(columns=[col for col in REPORTE_COLUMNAS if col in df.columns])
+    output = BytesIO()
+    df.to_excel(output, index=False, engine='openpyxl')
+    return output.getbuffer().nbytes
+
+
+def xlsx_write_only(view, queryset):
+    """Ruta actual: libro write-only alimentado por un queryset en bloques."""
+    archivo = escribir_xlsx(lectura.iter_filas(queryset, REPORTE_COLUMNAS))
+    archivo.seek(0, 2)
+    tamano = archivo.tell()
+    archivo.close()
+    return tamano
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the pandas XLSX export with the openpyxl write-only '
+        'export of the loyalty report (time and peak Python memory).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Number of runs per export path (the best run is reported).',
+        )
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/download/'))
+        view = ClienteDownloadReportView(request=request, format_kwarg=None)
+
+        rutas = [
+            ('pandas', xlsx_pandas),
+            ('write_only', xlsx_write_only),
+        ]
+        for nombre, exportar in rutas:
+            mejor_tiempo = None
+            mejor_pico = None
+            for _ in range(options['repeat']):
+                queryset = view.get_queryset()
+                tracemalloc.start()
+                inicio = time.perf_counter()
+                tamano = exportar(view, queryset)
+                duracion = time.perf_counter() - inicio
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                mejor_tiempo = min(duracion, mejor_tiempo or duracion)
+                mejor_pico = min(pico, mejor_pico or pico)
+
+            self.stdout.write(
+                f'{nombre:<12} {mejor_tiempo:8.3f} s  '
+                f'peak {mejor_pico / 1024 / 1024:8.2f} MiB  '
+                f'file {tamano / 1024:8.1f} KiB'
+            )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from customers import lectura, renderers
+from customers.exports import REPORTE_COLUMNAS
+from customers.models import Cliente
+from customers.serializers import ClienteListSerializer
+
+from .benchmark_serializacion import mejor_tiempo
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders the customer list and loyalty report payloads of the '
+        'current database with the DRF JSON renderer and the renderers '
+        'in customers.renderers (time, size and time per byte).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Number of runs per renderer (the best run is reported).',
+        )
+
+    def handle(self, *args, **options):
+        disponibles = [('drf json', JSONRenderer())]
+        if renderers.orjson is not None:
+            disponibles.append(('orjson', renderers.OrjsonRenderer()))
+        if renderers.msgpack is not None:
+            disponibles.append(('msgpack', renderers.MessagePackRenderer()))
+
+        queryset = Cliente.objects.filter(activo=True).order_by('id')
+        cargas = [
+            ('list', ClienteListSerializer.Meta.fields),
+            ('report', REPORTE_COLUMNAS),
+        ]
+        for carga, campos in cargas:
+            datos = lectura.serializar(lectura.valores(queryset, campos), campos)
+            self.stdout.write(f'{carga}: {len(datos)} customers')
+            for nombre, renderer in disponibles:
+                tamano = len(renderer.render(datos))
+                duracion = mejor_tiempo(lambda: renderer.render(datos), options['repeat'])
+                por_byte = duracion / tamano * 1_000_000_000 if tamano else 0
+                self.stdout.write(
+                    f'  {nombre:<9} {duracion:8.3f} s  {tamano / 1024:10.1f} KiB  '
+                    f'{por_byte:6.2f} ns/byte'
+                )
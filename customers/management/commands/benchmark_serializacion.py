@@ -0,0 +1,105 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers import lectura
+from customers.exports import REPORTE_COLUMNAS
+from customers.models import Cliente
+from customers.querysets import clientes_activos
+from customers.serializers import ClienteReporteFidelizacionSerializer
+
+
+def filas_serializer(queryset, serializer, columnas):
+    """Filas del reporte con el serializer DRF, por bloques con iterator()."""
+    for obj in queryset.iterator(chunk_size=lectura.CHUNK_SIZE):
+        data = serializer.to_representation(obj)
+        yield [data.get(columna) for columna in columnas]
+
+
+def mejor_tiempo(funcion, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the DRF serializer with the values()-based fast path '
+        '(customers.lectura) on the loyalty report rows of the current '
+        'database: serialization alone and rows read end to end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Number of runs per path (the best run is reported).',
+        )
+        parser.add_argument(
+            '--min-speedup', type=float, default=5.0,
+            help='Fail if the serialization speedup is below this factor.',
+        )
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeat']
+        serializer = ClienteReporteFidelizacionSerializer()
+        columnas = REPORTE_COLUMNAS
+
+        # Serialización sola: los datos ya están cargados en memoria.
+        instancias = list(clientes_activos().order_by('id'))
+        valores = list(lectura.valores(
+            Cliente.objects.filter(activo=True).order_by('id'), columnas
+        ))
+
+        def serializar_drf():
+            # El serializer memoriza el registro principal en cada objeto.
+            for instancia in instancias:
+                vars(instancia).pop('_documento_principal', None)
+                vars(instancia).pop('_telefono_principal', None)
+            return ClienteReporteFidelizacionSerializer(instancias, many=True).data
+
+        tiempos = {
+            'serializer': mejor_tiempo(serializar_drf, repeticiones),
+            'lectura': mejor_tiempo(
+                lambda: lectura.serializar(valores, columnas), repeticiones
+            ),
+        }
+        # Extremo a extremo: consultas por bloques más filas del reporte.
+        tiempos_filas = {
+            'serializer': mejor_tiempo(
+                lambda: sum(1 for _ in filas_serializer(
+                    clientes_activos(), serializer, columnas
+                )),
+                repeticiones
+            ),
+            'lectura': mejor_tiempo(
+                lambda: sum(1 for _ in lectura.iter_filas(
+                    Cliente.objects.filter(activo=True), columnas
+                )),
+                repeticiones
+            ),
+        }
+
+        total = len(instancias)
+        self.stdout.write(f'{total} customers')
+        for titulo, medidos in (
+            ('serialization', tiempos), ('rows end to end', tiempos_filas)
+        ):
+            for nombre, duracion in medidos.items():
+                por_fila = duracion / total * 1_000_000 if total else 0
+                self.stdout.write(
+                    f'{titulo:<16} {nombre:<11} {duracion:8.3f} s  {por_fila:8.2f} us/row'
+                )
+            self.stdout.write(
+                f'{titulo:<16} speedup     {medidos["serializer"] / medidos["lectura"]:8.1f}x'
+            )
+
+        aceleracion = tiempos['serializer'] / tiempos['lectura']
+        if aceleracion < options['min_speedup']:
+            raise CommandError(
+                f'Serialization speedup {aceleracion:.1f}x is below '
+                f'{options["min_speedup"]:.1f}x.'
+            )
@@ -0,0 +1,194 @@
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.test.utils import override_settings
+
+from customers import ingesta, lectura, sqlite
+from customers.models import Cliente, Producto
+from customers.serializers import ClienteListSerializer
+
+from .benchmark_concurrencia import resumir
+
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Clientes por página leída.
+PAGINA = 50
+
+
+def copiar_base(origen, destino):
+    """Copia consistente de la base, aunque otro proceso la esté usando."""
+    fuente = sqlite3.connect(origen)
+    copia = sqlite3.connect(destino)
+    try:
+        fuente.backup(copia)
+    finally:
+        fuente.close()
+        copia.close()
+
+
+def leer(maximo_id):
+    """Una página del listado de clientes a partir de un id al azar."""
+    campos = ClienteListSerializer.Meta.fields
+    queryset = Cliente.objects.filter(
+        activo=True, id__gte=random.randint(1, maximo_id)
+    ).order_by('id')
+    return lectura.serializar(lectura.valores(queryset, campos)[:PAGINA], campos)
+
+
+def escribir(correos, productos):
+    """Registra una compra de dos líneas para un cliente al azar."""
+    resultado = ingesta.registrar_compras([{
+        'numero_factura': f'BENCH-{uuid.uuid4().hex[:20]}',
+        'correo': random.choice(correos),
+        'detalles': [
+            {'producto': codigo, 'cantidad': 1}
+            for codigo in random.sample(productos, min(2, len(productos)))
+        ],
+    }])
+    if resultado['errores']:
+        raise CommandError(f'Compra rechazada: {resultado["errores"]}')
+
+
+class Carga:
+    """Hilos que leen y escriben durante un tiempo fijo, como workers WSGI."""
+
+    def __init__(self, hilos, segundos, escrituras, maximo_id, correos, productos):
+        self.hilos = hilos
+        self.segundos = segundos
+        self.escrituras = escrituras
+        self.maximo_id = maximo_id
+        self.correos = correos
+        self.productos = productos
+        self.lock = threading.Lock()
+        self.latencias = {'read': [], 'write': []}
+        self.bloqueos = 0
+
+    def ejecutar(self):
+        fin = time.perf_counter() + self.segundos
+        hilos = [threading.Thread(target=self.trabajar, args=(fin,)) for _ in range(self.hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+    def trabajar(self, fin):
+        try:
+            while time.perf_counter() < fin:
+                tipo = 'write' if random.random() < self.escrituras else 'read'
+                inicio = time.perf_counter()
+                # Igual que un request: con CONN_MAX_AGE = 0 cada operación
+                # abre y cierra su conexión.
+                close_old_connections()
+                try:
+                    if tipo == 'write':
+                        escribir(self.correos, self.productos)
+                    else:
+                        leer(self.maximo_id)
+                except OperationalError as error:
+                    if 'locked' not in str(error):
+                        raise
+                    with self.lock:
+                        self.bloqueos += 1
+                    continue
+                finally:
+                    close_old_connections()
+                with self.lock:
+                    self.latencias[tipo].append(time.perf_counter() - inicio)
+        finally:
+            connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs a mixed read/write load (customer list pages and purchase '
+        'registrations) from several threads against a copy of the '
+        'database, once per SQLite profile in settings.SQLITE_PERFILES, '
+        'and reports throughput, latency and "database is locked" errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos', type=int, default=8,
+            help='Concurrent threads (like WSGI worker threads).',
+        )
+        parser.add_argument(
+            '--segundos', type=float, default=10,
+            help='Seconds of load per profile.',
+        )
+        parser.add_argument(
+            '--escrituras', type=float, default=0.2,
+            help='Fraction of operations that register a purchase.',
+        )
+        parser.add_argument(
+            '--perfiles', nargs='+', default=['predeterminado', 'rendimiento'],
+            help='Profiles of settings.SQLITE_PERFILES to compare.',
+        )
+
+    def handle(self, *args, **options):
+        desconocidos = set(options['perfiles']) - set(settings.SQLITE_PERFILES)
+        if desconocidos:
+            raise CommandError(f'Unknown profiles: {", ".join(sorted(desconocidos))}')
+        conexion = connections['default']
+        if conexion.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite.')
+
+        maximo_id = max(Cliente.objects.order_by('-id').values_list('id', flat=True)[:1] or [1])
+        correos = list(
+            Cliente.objects.filter(activo=True).order_by('?').values_list('correo', flat=True)[:1000]
+        )
+        productos = list(Producto.objects.filter(activo=True).values_list('codigo', flat=True))
+        if not correos or not productos:
+            raise CommandError('The database needs active customers and products.')
+
+        original = dict(conexion.settings_dict)
+        directorio = Path(tempfile.mkdtemp(prefix='benchmark_sqlite_'))
+        try:
+            for perfil in options['perfiles']:
+                carga = Carga(
+                    options['hilos'], options['segundos'], options['escrituras'],
+                    maximo_id, correos, productos
+                )
+                self.medir(conexion, original, directorio / f'{perfil}.sqlite3', perfil, carga)
+                self.informar(perfil, carga)
+        finally:
+            connections.close_all()
+            conexion.settings_dict.update(original)
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def medir(self, conexion, original, copia, perfil, carga):
+        """Corre la carga sobre una copia nueva de la base con el perfil dado."""
+        connections.close_all()
+        copiar_base(original['NAME'], copia)
+        # settings_dict es el mismo dict en las conexiones de todos los hilos.
+        conexion.settings_dict.update(
+            original, NAME=str(copia), **settings.SQLITE_PERFILES[perfil]['conexion']
+        )
+        sqlite.aplicar_journal_mode(perfil=perfil)
+        connections.close_all()
+        # Sin DEBUG las conexiones no acumulan el log de consultas.
+        with override_settings(SQLITE_PERFIL=perfil, DEBUG=False, CACHES=CACHE_LOCAL):
+            carga.ejecutar()
+        connections.close_all()
+
+    def informar(self, perfil, carga):
+        total = sum(len(latencias) for latencias in carga.latencias.values())
+        self.stdout.write(
+            f'{perfil:<15} {total / carga.segundos:8.1f} ops/s  '
+            f'locked errors {carga.bloqueos}'
+        )
+        for tipo, latencias in carga.latencias.items():
+            if not latencias:
+                continue
+            p50, p95, maximo = resumir(latencias)
+            self.stdout.write(
+                f'  {tipo:<6} {len(latencias) / carga.segundos:8.1f} ops/s  '
+                f'p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  max {maximo:8.1f} ms'
+            )
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports customers with their main document and phone from a CSV '
+        'or JSONL file, upserting on correo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Path to the CSV or JSONL file.')
+        parser.add_argument(
+            '--formato',
+            choices=importacion.FORMATOS,
+            default=None,
+            help='File format (default: from the file extension, else csv).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=importacion.BATCH_SIZE,
+            help='Rows saved per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        formato = options['formato']
+        if formato is None:
+            es_jsonl = options['archivo'].lower().endswith(('.jsonl', '.ndjson'))
+            formato = 'jsonl' if es_jsonl else 'csv'
+
+        try:
+            archivo = open(options['archivo'], 'rb')
+        except OSError as error:
+            raise CommandError(error)
+        with archivo:
+            filas = importacion.LECTORES[formato](importacion.decodificar(archivo))
+            resultado = importacion.importar(filas, batch_size=options['batch_size'])
+
+        for error in resultado.errores:
+            self.stdout.write(self.style.ERROR(json.dumps(error, ensure_ascii=False)))
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.procesadas} rows processed: {resultado.creados} created, '
+            f'{resultado.actualizados} updated, {resultado.total_errores} with errors.'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from customers.reportes import limpiar_expirados
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired report jobs and their generated files.'
+
+    def handle(self, *args, **options):
+        borrados = limpiar_expirados()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {borrados} expired report jobs.'
+        ))
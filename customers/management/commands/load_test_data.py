@@ -1,19 +1,44 @@
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from decimal import Decimal
 from faker import Faker
 
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Max
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.utils import timezone
 
 # Importa todos tus modelos
 from customers.models import (
     TipoDocumento, TipoTelefono, Cliente, Documento, Telefono,
-    CategoriaProducto, Producto, Compra, DetalleCompra
+    CategoriaProducto, Producto, Compra, DetalleCompra, GastoDiario,
+    normalizar_numero_documento
 )
+from customers import catalogos, generadores, rollups, versiones
+
+# Orden inverso de dependencia para --clean.
+TABLAS_LIMPIEZA = (
+    GastoDiario, DetalleCompra, Compra, Telefono, Documento, Cliente,
+    Producto, CategoriaProducto,
+)
+
+
+@contextmanager
+def fecha_compra_manual():
+    """
+    Desactiva auto_now_add de Compra.fecha_compra para que bulk_create
+    respete las fechas generadas.
+    """
+    campo = Compra._meta.get_field('fecha_compra')
+    campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        campo.auto_now_add = True
 
-# Configura Faker para español (Colombia)
-fake = Faker('es_CO')
 
 class Command(BaseCommand):
     help = 'Generates test data for the customers application.'
@@ -24,32 +49,59 @@ class Command(BaseCommand):
             action='store_true',
             help='Delete all existing data before generating new data (except catalogs).',
         )
+        parser.add_argument(
+            '--clientes', type=int, default=30,
+            help='Number of customers to create.',
+        )
+        parser.add_argument(
+            '--productos', type=int, default=25,
+            help='Number of products to create.',
+        )
+        parser.add_argument(
+            '--compras', type=int, default=50,
+            help='Number of orders to create (1 to 5 lines each).',
+        )
+        parser.add_argument(
+            '--dias', type=int, default=365,
+            help='Orders are spread over this many days back from now.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Random seed; the same seed produces the same data.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes used to generate rows (1 generates in-process).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows generated and inserted per transaction.',
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         if not settings.DEBUG:
             raise CommandError("This command cannot be run in production.")
 
-        is_clean = options['clean']
+        semilla = options['seed']
+        if semilla is None:
+            semilla = random.SystemRandom().randrange(2 ** 32)
+        self.batch_size = options['batch_size']
+        self.workers = options['workers']
+        inicio = time.perf_counter()
 
-        if is_clean:
+        if options['clean']:
             self.stdout.write(self.style.WARNING('Cleaning database...'))
-            # Borra en orden inverso de dependencia
-            DetalleCompra.objects.all().delete()
-            Compra.objects.all().delete()
-            Telefono.objects.all().delete()
-            Documento.objects.all().delete()
-            Cliente.objects.all().delete()
-            Producto.objects.all().delete()
-            CategoriaProducto.objects.all().delete()
+            self.limpiar()
             self.stdout.write(self.style.SUCCESS('Database cleaned.'))
 
         # --- 1. Cargar Catálogos Base (Tus JSON) ---
         # Asumimos que TIPO_DOCUMENTO y TIPO_TELEFONO ya fueron cargados
         # desde tu 'catalogos.json' (usando manage.py loaddata)
 
-        tipos_doc = list(TipoDocumento.objects.filter(activo=True))
-        tipos_tel = list(TipoTelefono.objects.all())
+        tipos_doc = list(
+            TipoDocumento.objects.filter(activo=True).values_list('id', flat=True)
+        )
+        tipos_tel = list(TipoTelefono.objects.values_list('id', flat=True))
 
         if not tipos_doc or not tipos_tel:
             self.stdout.write(self.style.ERROR(
@@ -60,6 +112,62 @@ class Command(BaseCommand):
             ))
             return
 
+        productos = self.crear_productos(options['productos'], semilla)
+        cliente_ids = self.crear_clientes(
+            options['clientes'], semilla, tipos_doc, tipos_tel
+        )
+        compras, lineas = self.crear_compras(
+            options['compras'], semilla, cliente_ids, productos, options['dias']
+        )
+
+        # --- 6. Acumulados ---
+        # bulk_create no dispara signals: se reconstruyen el acumulado
+        # diario y la fidelización, y se invalida el caché de reportes.
+        self.stdout.write('Rebuilding daily spend rollup and loyalty fields...')
+        for _ in rollups.reconstruir():
+            pass
+        versiones.incrementar(versiones.REPORTE)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully generated test data (seed {semilla}) in '
+            f'{time.perf_counter() - inicio:.1f}s. {len(cliente_ids)} clients, '
+            f'{len(productos)} products, {compras} orders, {lineas} order lines.'
+        ))
+
+    def limpiar(self):
+        # DELETE directo por tabla: el delete() del ORM carga cada fila y
+        # dispara sus signals, inviable con millones de filas.
+        with transaction.atomic(), connection.cursor() as cursor:
+            for modelo in TABLAS_LIMPIEZA:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+            versiones.incrementar(versiones.REPORTE)
+            catalogos.invalidar()
+
+    def bloques(self, total, inicio):
+        """Rangos (indice_bloque, inicio, cantidad) de batch_size filas."""
+        for numero, desplazamiento in enumerate(range(0, total, self.batch_size)):
+            yield numero, inicio + desplazamiento, min(self.batch_size, total - desplazamiento)
+
+    @contextmanager
+    def ejecutor(self, contexto=None):
+        """
+        Retorna una función map: en el proceso actual con --workers 1 o
+        sobre un ProcessPoolExecutor. El orden de los resultados se
+        conserva en ambos casos.
+        """
+        if self.workers <= 1:
+            if contexto is not None:
+                generadores.inicializar(contexto)
+            yield map
+            return
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=generadores.inicializar if contexto is not None else None,
+            initargs=(contexto,) if contexto is not None else (),
+        ) as executor:
+            yield executor.map
+
+    def crear_productos(self, cantidad, semilla):
         # --- 2. Crear CategoriaProducto ---
         self.stdout.write('Creating CategoriaProducto...')
         categorias_data = [
@@ -78,95 +186,117 @@ class Command(BaseCommand):
 
         # --- 3. Crear Producto ---
         self.stdout.write('Creating Producto...')
+        rnd = random.Random(semilla)
+        fake = Faker('es_CO')
+        fake.seed_instance(semilla)
+        inicio = (Producto.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
         productos = []
-        for i in range(25):
-            cat = random.choice(categorias)
-            es_servicio = cat.nombre == 'Servicios Profesionales'
-            prod = Producto.objects.create(
-                codigo=f'PROD-{fake.ean(length=8)}',
+        for indice in range(inicio, inicio + cantidad):
+            cat = rnd.choice(categorias)
+            productos.append(Producto(
+                codigo=f'SKU-{indice:08d}',
                 nombre=fake.bs().capitalize(),
                 categoria=cat,
-                precio_base=Decimal(random.randrange(10000, 500000)),
-                es_servicio=es_servicio,
+                precio_base=Decimal(rnd.randrange(10000, 500000)),
+                es_servicio=cat.nombre == 'Servicios Profesionales',
                 activo=True
-            )
-            productos.append(prod)
+            ))
+        Producto.objects.bulk_create(productos, batch_size=self.batch_size)
+        return productos
 
+    def crear_clientes(self, cantidad, semilla, tipos_doc, tipos_tel):
         # --- 4. Crear Cliente, Documento y Telefono ---
         self.stdout.write('Creating Cliente, Documento, and Telefono...')
-        clientes = []
-        for _ in range(30): # Crear 30 clientes
-            cliente = Cliente.objects.create(
-                nombre=fake.first_name(),
-                apellido=fake.last_name(),
-                correo=fake.unique.email(),
-            )
-            clientes.append(cliente)
-
-            # Crear Documento principal
-            Documento.objects.create(
-                cliente=cliente,
-                tipo_documento=random.choice(tipos_doc),
-                numero_documento=fake.ssn().replace('-', ''),
-                principal=True
-            )
-
-            # Crear Telefono principal
-            Telefono.objects.create(
-                cliente=cliente,
-                phone_type=random.choice(tipos_tel),
-                numero=fake.phone_number(),
-                principal=True
-            )
+        if not cantidad:
+            return []
+        inicio = (Cliente.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+        argumentos = [
+            (semilla + numero, desde, filas, tipos_doc, tipos_tel)
+            for numero, desde, filas in self.bloques(cantidad, inicio)
+        ]
+        cliente_ids = []
+        with self.ejecutor() as mapear:
+            for filas in mapear(generadores.generar_clientes, *zip(*argumentos)):
+                with transaction.atomic():
+                    clientes = Cliente.objects.bulk_create(
+                        [
+                            Cliente(nombre=nombre, apellido=apellido, correo=correo)
+                            for nombre, apellido, correo, *_ in filas
+                        ],
+                        batch_size=self.batch_size
+                    )
+                    documentos = []
+                    telefonos = []
+                    for cliente, fila in zip(clientes, filas):
+                        _, _, _, tipo_doc, numero_doc, tipo_tel, telefono = fila
+                        documentos.append(Documento(
+                            cliente_id=cliente.id,
+                            tipo_documento_id=tipo_doc,
+                            numero_documento=numero_doc,
+                            numero_normalizado=normalizar_numero_documento(numero_doc),
+                            principal=True
+                        ))
+                        telefonos.append(Telefono(
+                            cliente_id=cliente.id,
+                            phone_type_id=tipo_tel,
+                            numero=telefono,
+                            principal=True
+                        ))
+                    Documento.objects.bulk_create(documentos, batch_size=self.batch_size)
+                    Telefono.objects.bulk_create(telefonos, batch_size=self.batch_size)
+                cliente_ids.extend(cliente.id for cliente in clientes)
+                self.stdout.write(f'  {len(cliente_ids)}/{cantidad} clients')
+        return cliente_ids
 
+    def crear_compras(self, cantidad, semilla, cliente_ids, productos, dias):
         # --- 5. Crear Compra y DetalleCompra ---
         self.stdout.write('Creating Compra and DetalleCompra...')
-        for _ in range(50): # Crear 50 compras
-            cliente = random.choice(clientes)
-
-            # Crear cabecera de Compra (con totales en 0 temporalmente)
-            compra = Compra.objects.create(
-                cliente=cliente,
-                numero_factura=f'FAC-{fake.ean(length=13)}',
-                estado=random.choice(['PEN', 'PAG', 'CAN']),
-            )
-
-            # Crear detalles de la compra (1 a 5 items)
-            num_items = random.randint(1, 5)
-            compra_subtotal = Decimal('0.00')
-
-            detalles_a_crear = []
-            for _ in range(num_items):
-                producto = random.choice(productos)
-                cantidad = Decimal(random.randint(1, 3))
-
-                # Usar el precio base del producto como precio unitario
-                precio_unitario = producto.precio_base 
-                item_subtotal = cantidad * precio_unitario
-                compra_subtotal += item_subtotal
-
-                detalles_a_crear.append(
-                    DetalleCompra(
-                        compra=compra,
-                        producto=producto,
-                        cantidad=cantidad,
-                        precio_unitario=precio_unitario
+        if not cantidad or not cliente_ids or not productos:
+            return 0, 0
+        ids, acumulados = generadores.pesos_clientes(cliente_ids, semilla)
+        contexto = {
+            'cliente_ids': ids,
+            'pesos_clientes': acumulados,
+            'productos': [(p.id, p.precio_base) for p in productos],
+            'ahora': timezone.now(),
+            'dias': dias,
+        }
+        inicio = (Compra.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+        argumentos = [
+            (semilla + numero, desde, filas)
+            for numero, desde, filas in self.bloques(cantidad, inicio)
+        ]
+        creadas = 0
+        lineas = 0
+        with self.ejecutor(contexto) as mapear, fecha_compra_manual():
+            for filas in mapear(generadores.generar_compras, *zip(*argumentos)):
+                with transaction.atomic():
+                    # El total se calcula al generar las líneas, en la misma pasada.
+                    compras = Compra.objects.bulk_create(
+                        [
+                            Compra(
+                                cliente_id=cliente_id,
+                                numero_factura=numero_factura,
+                                fecha_compra=fecha,
+                                estado=estado,
+                                total=total
+                            )
+                            for cliente_id, numero_factura, fecha, estado, total, _ in filas
+                        ],
+                        batch_size=self.batch_size
                     )
-                )
-
-            # Crear detalles en lote
-            DetalleCompra.objects.bulk_create(detalles_a_crear)
-
-            # Calcular totales y actualizar la Compra
-            # Asumamos un IVA fijo del 19% para el ejemplo
-            compra_impuestos = compra_subtotal * Decimal('0.19')
-            compra_total = compra_subtotal + compra_impuestos
-
-            compra.subtotal = compra_subtotal
-            compra.impuestos = compra_impuestos
-            compra.total = compra_total
-            compra.save()
-
-        self.stdout.write(self.style.SUCCESS(
-            f'Successfully generated test data. {len(clientes)} clients, {len(productos)} products, 50 orders.'
-        ))
\ No newline at end of file
+                    detalles = [
+                        DetalleCompra(
+                            compra_id=compra.id,
+                            producto_id=producto_id,
+                            cantidad=cantidad_item,
+                            precio_unitario=precio
+                        )
+                        for compra, fila in zip(compras, filas)
+                        for producto_id, cantidad_item, precio in fila[5]
+                    ]
+                    DetalleCompra.objects.bulk_create(detalles, batch_size=self.batch_size)
+                creadas += len(compras)
+                lineas += len(detalles)
+                self.stdout.write(f'  {creadas}/{cantidad} orders')
+        return creadas, lineas
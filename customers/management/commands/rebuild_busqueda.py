@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from customers import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text customer search index (SQLite FTS5) and its triggers.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The customer search index requires SQLite (FTS5).')
+        inicio = time.perf_counter()
+        busqueda.reconstruir(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'Search index rebuilt with the {busqueda.tokenizer(connection)} tokenizer '
+            f'in {time.perf_counter() - inicio:.1f} s.'
+        ))
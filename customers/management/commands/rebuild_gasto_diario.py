@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from customers.rollups import BATCH_SIZE, reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily spend rollup (GastoDiario) from Compra in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of customers processed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        bloques = 0
+        for ultimo_id in reconstruir(batch_size=options['batch_size']):
+            bloques += 1
+            self.stdout.write(f'Processed customers up to id {ultimo_id}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Daily spend rollup rebuilt in {bloques} batches.'
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from customers.totales import BATCH_SIZE, recalcular_totales
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes Compra.total from its DetalleCompra lines in batches. '
+        'Use --verify-only to report drift without writing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Only report orders whose stored total differs from their lines.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of orders processed per aggregate query.',
+        )
+        parser.add_argument(
+            '--start-id',
+            type=int,
+            default=0,
+            help='Resume after this order id.',
+        )
+
+    def handle(self, *args, **options):
+        verificar = options['verify_only']
+        revisadas = 0
+        total_diferencias = 0
+        for ultimo_id, diferencias in recalcular_totales(
+            desde_id=options['start_id'],
+            batch_size=options['batch_size'],
+            solo_verificar=verificar,
+        ):
+            revisadas = ultimo_id
+            total_diferencias += len(diferencias)
+            for compra_id, guardado, calculado in diferencias:
+                self.stdout.write(
+                    f'Compra {compra_id}: stored {guardado}, computed {calculado}'
+                )
+
+        accion = 'with drift' if verificar else 'corrected'
+        estilo = self.style.WARNING if verificar and total_diferencias else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'Checked orders up to id {revisadas}. {total_diferencias} orders {accion}.'
+        ))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from customers.fidelizacion import BATCH_SIZE, refrescar_todos
+
+
+class Command(BaseCommand):
+    help = (
+        'Refreshes Cliente.monto_ultimo_mes and Cliente.aplica_fidelizacion '
+        'in id-range batches. Can be resumed with --start-id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-id',
+            type=int,
+            default=0,
+            help='Resume after this customer id (last id reported by a previous run).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of customers refreshed per transaction.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to reduce load on live traffic.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for ultimo_id, actualizados in refrescar_todos(
+            desde_id=options['start_id'], batch_size=options['batch_size']
+        ):
+            total += actualizados
+            self.stdout.write(
+                f'Processed customers up to id {ultimo_id} ({actualizados} updated).'
+            )
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loyalty fields refreshed. {total} customers updated.'
+        ))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_remove_compra_descuento_remove_compra_impuestos_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='numero_normalizado',
+            field=models.CharField(default='', editable=False, help_text='Llave de búsqueda derivada de numero_documento', max_length=100, verbose_name='Número Normalizado'),
+        ),
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['tipo_documento', 'numero_normalizado'], name='documento_tipo_numero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['numero_normalizado'], name='documento_numero_norm_idx'),
+        ),
+    ]
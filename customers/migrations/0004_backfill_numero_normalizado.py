@@ -0,0 +1,51 @@
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def normalizar_numero_documento(numero):
+    """
+    Copia de models.normalizar_numero_documento al crear esta migración:
+    el backfill no debe cambiar si la función cambia después.
+    """
+    if not numero:
+        return ''
+    return re.sub(r'[\W_]+', '', numero.casefold())
+
+
+def backfill_numero_normalizado(apps, schema_editor):
+    """
+    Calcula numero_normalizado para los documentos existentes,
+    recorriendo la tabla por rangos de id para acotar la memoria.
+    """
+    Documento = apps.get_model('customers', 'Documento')
+    ultimo_id = 0
+    while True:
+        lote = list(
+            Documento.objects.filter(id__gt=ultimo_id)
+            .order_by('id')
+            .only('id', 'numero_documento')[:BATCH_SIZE]
+        )
+        if not lote:
+            break
+        for documento in lote:
+            documento.numero_normalizado = normalizar_numero_documento(
+                documento.numero_documento
+            )
+        Documento.objects.bulk_update(lote, ['numero_normalizado'])
+        ultimo_id = lote[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_documento_numero_normalizado'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_numero_normalizado, migrations.RunPython.noop
+        ),
+    ]
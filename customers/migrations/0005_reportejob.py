@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-17 02:40
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_backfill_numero_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('clave', models.CharField(db_index=True, help_text='Hash de formato y filtros para reutilizar jobs idénticos', max_length=64, verbose_name='Clave')),
+                ('formato', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel'), ('txt', 'Texto')], default='csv', max_length=4, verbose_name='Formato')),
+                ('filtros', models.JSONField(blank=True, default=dict, verbose_name='Filtros')),
+                ('estado', models.CharField(choices=[('PEN', 'Pendiente'), ('PRO', 'En Proceso'), ('LIS', 'Listo'), ('ERR', 'Error')], default='PEN', max_length=3, verbose_name='Estado')),
+                ('progreso', models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de Filas')),
+                ('archivo', models.CharField(blank=True, max_length=255, verbose_name='Archivo')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_finalizacion', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Finalización')),
+                ('fecha_expiracion', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Fecha de Expiración')),
+            ],
+            options={
+                'verbose_name': 'Job de Reporte',
+                'verbose_name_plural': 'Jobs de Reporte',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado__in', ['PEN', 'PRO'])), fields=('clave',), name='reportejob_clave_activa_unica')],
+            },
+        ),
+    ]
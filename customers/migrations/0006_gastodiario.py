@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-17 02:41
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+BATCH_SIZE = 1000
+
+
+def poblar_gasto_diario(apps, schema_editor):
+    """Construye el acumulado diario a partir de las compras existentes."""
+    Cliente = apps.get_model('customers', 'Cliente')
+    Compra = apps.get_model('customers', 'Compra')
+    GastoDiario = apps.get_model('customers', 'GastoDiario')
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Cliente.objects.filter(id__gt=ultimo_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        agregado = (
+            Compra.objects.filter(cliente_id__in=ids)
+            .annotate(dia=TruncDate('fecha_compra'))
+            .values('cliente_id', 'dia', 'estado')
+            .annotate(suma=Sum('total'))
+            .order_by()
+        )
+        GastoDiario.objects.bulk_create([
+            GastoDiario(
+                cliente_id=fila['cliente_id'], dia=fila['dia'],
+                estado=fila['estado'], total=fila['suma']
+            )
+            for fila in agregado
+        ])
+        ultimo_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_reportejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GastoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Día')),
+                ('estado', models.CharField(choices=[('PEN', 'Pendiente'), ('PAG', 'Pagado'), ('CAN', 'Cancelado'), ('DEV', 'Devuelto'), ('PRO', 'En Proceso')], max_length=3, verbose_name='Estado')),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=17, verbose_name='Total')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gastos_diarios', to='customers.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Gasto Diario',
+                'verbose_name_plural': 'Gastos Diarios',
+                'constraints': [models.UniqueConstraint(fields=('cliente', 'estado', 'dia'), name='gastodiario_cliente_estado_dia_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_gasto_diario, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-17 02:42
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+from datetime import timedelta
+
+BATCH_SIZE = 1000
+
+# Valores de customers.fidelizacion al crear esta migración: el cálculo
+# inicial no depende de cambios posteriores en ese módulo.
+UMBRAL_FIDELIZACION = 5_000_000
+DIAS_VENTANA = 30
+
+
+def poblar_fidelizacion(apps, schema_editor):
+    """Calcula los campos de fidelización desde el acumulado diario."""
+    Cliente = apps.get_model('customers', 'Cliente')
+    GastoDiario = apps.get_model('customers', 'GastoDiario')
+    desde = timezone.localdate(timezone.now() - timedelta(days=DIAS_VENTANA))
+    montos = (
+        GastoDiario.objects.filter(estado='PAG', dia__gte=desde)
+        .values('cliente_id')
+        .annotate(suma=Sum('total'))
+        .order_by('cliente_id')
+        .values_list('cliente_id', 'suma')
+    )
+    lote = []
+    for cliente_id, monto in montos.iterator(chunk_size=BATCH_SIZE):
+        lote.append(Cliente(
+            id=cliente_id,
+            monto_ultimo_mes=monto,
+            aplica_fidelizacion=monto > UMBRAL_FIDELIZACION
+        ))
+        if len(lote) == BATCH_SIZE:
+            Cliente.objects.bulk_update(lote, ['monto_ultimo_mes', 'aplica_fidelizacion'])
+            lote = []
+    Cliente.objects.bulk_update(lote, ['monto_ultimo_mes', 'aplica_fidelizacion'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_gastodiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='aplica_fidelizacion',
+            field=models.BooleanField(default=False, verbose_name='Aplica Fidelización'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='monto_ultimo_mes',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=17, verbose_name='Monto Último Mes'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('activo', True), ('aplica_fidelizacion', True)), fields=['id'], name='cliente_fidelizacion_idx'),
+        ),
+        migrations.RunPython(poblar_fidelizacion, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0007_cliente_fidelizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True, verbose_name='Nombre')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Versión')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+            ],
+            options={
+                'verbose_name': 'Versión de Datos',
+                'verbose_name_plural': 'Versiones de Datos',
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2 on 2026-10-17 03:50
+
+from django.db import OperationalError, migrations, transaction
+
+# DDL de customers.busqueda al crear esta migración: el índice inicial no
+# depende de cambios posteriores en ese módulo.
+TABLA = 'customers_cliente_busqueda'
+TOKENIZERS = (
+    'trigram remove_diacritics 1',
+    'trigram',
+    'unicode61 remove_diacritics 2',
+)
+
+TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_cliente_busqueda_ai
+    AFTER INSERT ON customers_cliente BEGIN
+        INSERT INTO customers_cliente_busqueda(rowid, nombre, apellido, correo)
+        VALUES (new.id, new.nombre, new.apellido, new.correo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_cliente_busqueda_ad
+    AFTER DELETE ON customers_cliente BEGIN
+        INSERT INTO customers_cliente_busqueda(
+            customers_cliente_busqueda, rowid, nombre, apellido, correo
+        ) VALUES ('delete', old.id, old.nombre, old.apellido, old.correo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_cliente_busqueda_au
+    AFTER UPDATE OF nombre, apellido, correo ON customers_cliente BEGIN
+        INSERT INTO customers_cliente_busqueda(
+            customers_cliente_busqueda, rowid, nombre, apellido, correo
+        ) VALUES ('delete', old.id, old.nombre, old.apellido, old.correo);
+        INSERT INTO customers_cliente_busqueda(rowid, nombre, apellido, correo)
+        VALUES (new.id, new.nombre, new.apellido, new.correo);
+    END
+    """,
+)
+
+
+def crear_indice(apps, schema_editor):
+    """Índice FTS5 de clientes con sus triggers (solo SQLite)."""
+    conexion = schema_editor.connection
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        for opciones in TOKENIZERS:
+            try:
+                with transaction.atomic(using=conexion.alias):
+                    cursor.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} "
+                        f"USING fts5(nombre, apellido, correo, "
+                        f"content='customers_cliente', content_rowid='id', "
+                        f"tokenize='{opciones}')"
+                    )
+                break
+            except OperationalError:
+                continue
+        for sql in TRIGGERS:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABLA}({TABLA}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLA}({TABLA}) VALUES ('optimize')")
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sufijo in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {TABLA}_{sufijo}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0008_versiondatos'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-17 06:10
+
+from django.db import migrations
+
+# DDL de customers.busqueda al crear esta migración.
+TABLA = 'customers_cliente_prefijos'
+
+TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_cliente_prefijos_ai
+    AFTER INSERT ON customers_cliente BEGIN
+        INSERT INTO customers_cliente_prefijos(rowid, nombre, apellido, correo)
+        VALUES (new.id, new.nombre, new.apellido, new.correo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_cliente_prefijos_ad
+    AFTER DELETE ON customers_cliente BEGIN
+        INSERT INTO customers_cliente_prefijos(
+            customers_cliente_prefijos, rowid, nombre, apellido, correo
+        ) VALUES ('delete', old.id, old.nombre, old.apellido, old.correo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_cliente_prefijos_au
+    AFTER UPDATE OF nombre, apellido, correo ON customers_cliente BEGIN
+        INSERT INTO customers_cliente_prefijos(
+            customers_cliente_prefijos, rowid, nombre, apellido, correo
+        ) VALUES ('delete', old.id, old.nombre, old.apellido, old.correo);
+        INSERT INTO customers_cliente_prefijos(rowid, nombre, apellido, correo)
+        VALUES (new.id, new.nombre, new.apellido, new.correo);
+    END
+    """,
+)
+
+
+def crear_indice(apps, schema_editor):
+    """Índice FTS5 de prefijos cortos de clientes (solo SQLite)."""
+    conexion = schema_editor.connection
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} "
+            f"USING fts5(nombre, apellido, correo, "
+            f"content='customers_cliente', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='1 2')"
+        )
+        for sql in TRIGGERS:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABLA}({TABLA}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLA}({TABLA}) VALUES ('optimize')")
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sufijo in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {TABLA}_{sufijo}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0009_cliente_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
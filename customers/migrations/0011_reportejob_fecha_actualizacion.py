@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0010_cliente_prefijos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportejob',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización'),
+        ),
+    ]
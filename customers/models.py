@@ -1,8 +1,22 @@
+import re
+import uuid
+
 from django.db import models
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
 
+def normalizar_numero_documento(numero):
+    """
+    Llave de búsqueda de un número de documento: sin espacios,
+    en minúsculas (casefold) y sin puntuación.
+    Ej: ' 1.234.567-8 ' -> '12345678'
+    """
+    if not numero:
+        return ''
+    return re.sub(r'[\W_]+', '', numero.casefold())
+
+
 class TipoDocumento(models.Model):
     """
     Catálogo de tipos de documentos de identidad
@@ -49,7 +63,31 @@ class Cliente(models.Model):
         default=True,
         verbose_name='Activo'
     )
+    # Valores desnormalizados del reporte de fidelización, mantenidos por
+    # customers.fidelizacion y 'manage.py refresh_fidelizacion'.
+    monto_ultimo_mes = models.DecimalField(
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Monto Último Mes'
+    )
+    aplica_fidelizacion = models.BooleanField(
+        default=False,
+        verbose_name='Aplica Fidelización'
+    )
 
+    class Meta:
+        indexes = [
+            # Índice parcial con los clientes activos que aplican a
+            # fidelización, ordenados por id. En SQLite un filtro booleano
+            # se compila como 'WHERE activo AND aplica_fidelizacion', que
+            # un índice normal no puede resolver.
+            models.Index(
+                fields=['id'],
+                condition=models.Q(activo=True, aplica_fidelizacion=True),
+                name='cliente_fidelizacion_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
@@ -76,6 +114,13 @@ class Documento(models.Model):
         max_length=50,
         verbose_name='Número de Documento'
     )
+    numero_normalizado = models.CharField(
+        max_length=100,
+        editable=False,
+        default='',
+        verbose_name='Número Normalizado',
+        help_text='Llave de búsqueda derivada de numero_documento'
+    )
     principal = models.BooleanField(
         default=False,
         verbose_name='Documento Principal'
@@ -91,6 +136,27 @@ class Documento(models.Model):
         verbose_name='Fecha de Vencimiento'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['tipo_documento', 'numero_normalizado'],
+                name='documento_tipo_numero_idx'
+            ),
+            models.Index(
+                fields=['numero_normalizado'],
+                name='documento_numero_norm_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.numero_normalizado = normalizar_numero_documento(
+            self.numero_documento
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'numero_documento' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'numero_normalizado'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.tipo_documento.nombre}: {self.numero_documento}"
 
@@ -318,3 +384,177 @@ class DetalleCompra(models.Model):
     def __str__(self):
         return f"{self.producto.nombre} x {self.cantidad} "
 
+
+
+class GastoDiario(models.Model):
+    """
+    Total de compras por cliente, día y estado.
+    Se mantiene al crear, modificar o eliminar una Compra
+    (ver customers.rollups) y se reconstruye con
+    'manage.py rebuild_gasto_diario'.
+    """
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name='gastos_diarios',
+        verbose_name='Cliente'
+    )
+    dia = models.DateField(
+        verbose_name='Día'
+    )
+    estado = models.CharField(
+        max_length=3,
+        choices=Compra.ESTADO_CHOICES,
+        verbose_name='Estado'
+    )
+    total = models.DecimalField(
+        max_digits=17,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Total'
+    )
+
+    class Meta:
+        verbose_name = 'Gasto Diario'
+        verbose_name_plural = 'Gastos Diarios'
+        constraints = [
+            # Su índice (cliente, estado, dia) sirve también a la suma
+            # por cliente de las compras pagadas desde una fecha.
+            models.UniqueConstraint(
+                fields=['cliente', 'estado', 'dia'],
+                name='gastodiario_cliente_estado_dia_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente_id} {self.dia} {self.estado}: ${self.total}"
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de versión por grupo de datos (p. ej. 'catalogos').
+    Se incrementa en cada escritura del grupo y sirve para validar
+    respuestas en caché (ver customers.versiones).
+    """
+    nombre = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Nombre'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Versión'
+    )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Actualización'
+    )
+
+    class Meta:
+        verbose_name = 'Versión de Datos'
+        verbose_name_plural = 'Versiones de Datos'
+
+    def __str__(self):
+        return f"{self.nombre} v{self.version}"
+
+
+class ReporteJob(models.Model):
+    """
+    Generación en segundo plano del reporte de fidelización.
+    El archivo generado se guarda en REPORTES_DIR hasta su expiración.
+    """
+    ESTADO_CHOICES = [
+        ('PEN', 'Pendiente'),
+        ('PRO', 'En Proceso'),
+        ('LIS', 'Listo'),
+        ('ERR', 'Error'),
+    ]
+    ESTADOS_ACTIVOS = ['PEN', 'PRO']
+
+    FORMATO_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+        ('txt', 'Texto'),
+    ]
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    clave = models.CharField(
+        max_length=64,
+        db_index=True,
+        verbose_name='Clave',
+        help_text='Hash de formato y filtros para reutilizar jobs idénticos'
+    )
+    formato = models.CharField(
+        max_length=4,
+        choices=FORMATO_CHOICES,
+        default='csv',
+        verbose_name='Formato'
+    )
+    filtros = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Filtros'
+    )
+    estado = models.CharField(
+        max_length=3,
+        choices=ESTADO_CHOICES,
+        default='PEN',
+        verbose_name='Estado'
+    )
+    progreso = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Filas Procesadas'
+    )
+    total = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Total de Filas'
+    )
+    archivo = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Archivo'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Error'
+    )
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    # Latido del job: se renueva con cada actualización del progreso.
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de Actualización'
+    )
+    fecha_finalizacion = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Fecha de Finalización'
+    )
+    fecha_expiracion = models.DateTimeField(
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name='Fecha de Expiración'
+    )
+
+    class Meta:
+        verbose_name = 'Job de Reporte'
+        verbose_name_plural = 'Jobs de Reporte'
+        constraints = [
+            # Solo un job activo por combinación de formato y filtros.
+            models.UniqueConstraint(
+                fields=['clave'],
+                condition=models.Q(estado__in=['PEN', 'PRO']),
+                name='reportejob_clave_activa_unica'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Reporte {self.formato} - {self.get_estado_display()}"
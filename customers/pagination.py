@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ClienteCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) ordenada por 'id'.
+
+    Cada página se obtiene con 'WHERE id > <último id>' sobre la llave
+    primaria, sin OFFSET ni COUNT(*), por lo que una página profunda
+    cuesta lo mismo que la primera. El cursor es opaco (base64).
+
+    Es opcional: solo se pagina si el request incluye '?cursor=' o
+    '?page_size='; sin ellos la vista conserva la respuesta completa.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def solicitada(self, request):
+        """Indica si el request pidió paginación."""
+        params = request.query_params
+        return (
+            self.cursor_query_param in params
+            or self.page_size_query_param in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.solicitada(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
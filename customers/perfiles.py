@@ -0,0 +1,228 @@
+"""
+Perfilado bajo demanda de requests individuales para usuarios staff.
+
+Un usuario staff agrega '?perfil=cprofile' (o '?perfil=muestreo', o el
+header 'X-Perfil') a cualquier vista de customers y la vista se ejecuta
+bajo el perfilador. El archivo queda en PERFILES_DIR y su URL de
+descarga se devuelve en el header 'X-Perfil'.
+
+- cprofile: archivo .prof de cProfile (pstats, snakeviz, flameprof).
+- muestreo: pilas muestreadas cada PERFILES_INTERVALO_MUESTREO segundos
+  en formato "collapsed" (.txt), para flamegraph.pl o speedscope.
+
+Para cualquier otro usuario el parámetro se ignora: la vista se ejecuta
+normalmente y no se escribe nada.
+
+Las vistas async no se perfilan: ambos perfiladores siguen un hilo y en
+el event loop mezclarían los requests concurrentes.
+"""
+import cProfile
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.urls import reverse
+from django.utils.deprecation import MiddlewareMixin
+
+MODOS = {'cprofile': '.prof', 'muestreo': '.txt'}
+
+PARAMETRO = 'perfil'
+HEADER = 'HTTP_X_PERFIL'
+
+
+def directorio():
+    ruta = Path(settings.PERFILES_DIR)
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def ruta(nombre):
+    """Ruta de un perfil por nombre, o None si el nombre no es válido."""
+    base, extension = os.path.splitext(nombre)
+    if extension not in MODOS.values() or len(base) != 32:
+        return None
+    try:
+        int(base, 16)
+    except ValueError:
+        return None
+    return directorio() / nombre
+
+
+def podar(max_archivos=None):
+    """Conserva solo los perfiles más recientes."""
+    max_archivos = settings.PERFILES_MAX_ARCHIVOS if max_archivos is None else max_archivos
+    archivos = sorted(
+        directorio().iterdir(), key=lambda archivo: archivo.stat().st_mtime, reverse=True
+    )
+    for archivo in archivos[max_archivos:]:
+        archivo.unlink(missing_ok=True)
+
+
+class PerfilCProfile:
+
+    def __init__(self):
+        self._perfil = cProfile.Profile()
+
+    def iniciar(self):
+        self._perfil.enable()
+
+    def detener(self):
+        self._perfil.disable()
+
+    def guardar(self, destino):
+        self._perfil.dump_stats(destino)
+
+
+class PerfilMuestreo:
+    """
+    Muestrea desde un hilo aparte la pila del hilo que atiende el
+    request. Las muestras se acumulan mientras el perfil está iniciado.
+    """
+
+    def __init__(self, intervalo=None):
+        self.intervalo = intervalo or settings.PERFILES_INTERVALO_MUESTREO
+        self.muestras = Counter()
+        self._objetivo = None
+        self._activo = threading.Event()
+        self._fin = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._objetivo = threading.get_ident()
+        self._activo.set()
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._activo.clear()
+
+    def guardar(self, destino):
+        self._fin.set()
+        self._activo.set()
+        self._hilo.join()
+        with open(destino, 'w', encoding='utf-8') as archivo:
+            for pila, cantidad in self.muestras.most_common():
+                archivo.write(f'{pila} {cantidad}\n')
+
+    def _muestrear(self):
+        while not self._fin.wait(self.intervalo):
+            self._activo.wait()
+            if self._fin.is_set():
+                break
+            marco = sys._current_frames().get(self._objetivo)
+            pila = []
+            while marco is not None:
+                codigo = marco.f_code
+                pila.append(
+                    f'{codigo.co_name} ({codigo.co_filename}:{codigo.co_firstlineno})'
+                )
+                marco = marco.f_back
+            if pila:
+                self.muestras[';'.join(reversed(pila))] += 1
+
+
+PERFILADORES = {'cprofile': PerfilCProfile, 'muestreo': PerfilMuestreo}
+
+
+def modo_solicitado(request):
+    """Modo pedido por un usuario staff, o None."""
+    modo = request.GET.get(PARAMETRO) or request.META.get(HEADER)
+    if modo not in MODOS:
+        return None
+    usuario = getattr(request, 'user', None)
+    if not (usuario and usuario.is_authenticated and usuario.is_staff):
+        return None
+    return modo
+
+
+def _iter_perfilado(contenido, perfilador, destino):
+    """
+    Perfila también la generación del cuerpo en streaming: el perfilador
+    corre mientras se produce cada parte y se detiene mientras el
+    servidor la envía.
+    """
+    iterador = iter(contenido)
+    try:
+        while True:
+            perfilador.iniciar()
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                perfilador.detener()
+            yield parte
+    finally:
+        perfilador.detener()
+        perfilador.guardar(destino)
+        podar()
+
+
+class PerfilMiddleware(MiddlewareMixin):
+    """
+    Ejecuta bajo el perfilador las vistas de customers pedidas por
+    staff con '?perfil=' o 'X-Perfil'. Debe ir después de
+    AuthenticationMiddleware y al final de MIDDLEWARE, porque ejecuta
+    la vista desde process_view.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.async_mode:
+            self.process_view = self.aprocess_view
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        """
+        process_view() en modo async: sin perfil pedido no usa un hilo;
+        las vistas sync perfiladas se ejecutan en uno.
+        """
+        if iscoroutinefunction(view_func):
+            return None
+        if not (request.GET.get(PARAMETRO) or request.META.get(HEADER)):
+            return None
+        return await sync_to_async(PerfilMiddleware.process_view)(
+            self, request, view_func, view_args, view_kwargs
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, 'PERFILES_HABILITADOS', False):
+            return None
+        if not view_func.__module__.startswith('customers.'):
+            return None
+        modo = modo_solicitado(request)
+        if modo is None:
+            return None
+
+        nombre = f'{uuid.uuid4().hex}{MODOS[modo]}'
+        destino = directorio() / nombre
+        perfilador = PERFILADORES[modo]()
+        perfilador.iniciar()
+        try:
+            response = view_func(request, *view_args, **view_kwargs)
+            # Las respuestas diferidas (DRF) se renderizan dentro del perfil.
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+        except BaseException:
+            # El perfil de un request que falla también se guarda.
+            perfilador.detener()
+            perfilador.guardar(destino)
+            raise
+        perfilador.detener()
+
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = _iter_perfilado(
+                response.streaming_content, perfilador, destino
+            )
+        else:
+            perfilador.guardar(destino)
+            podar()
+        response['X-Perfil'] = request.build_absolute_uri(
+            reverse('perfil-descarga', kwargs={'nombre': nombre})
+        )
+        return response
@@ -0,0 +1,108 @@
+from django.db.models import Prefetch
+
+from .models import Cliente, Documento, Telefono, normalizar_numero_documento
+
+VALORES_BOOLEANOS = {
+    'true': True, '1': True,
+    'false': False, '0': False,
+}
+
+
+# Campos serializados que se leen de los documentos y de los teléfonos.
+CAMPOS_DOCUMENTO = {'tipo_documento', 'numero_documento'}
+CAMPOS_TELEFONO = {'telefono'}
+
+
+def clientes_activos(campos=None):
+    """
+    Clientes activos con sus documentos y teléfonos precargados.
+
+    Los documentos y teléfonos se precargan ordenados por 'principal'
+    para que el serializer resuelva el registro prioritario sin
+    consultas adicionales por cliente. El nombre del tipo de documento
+    se toma del caché de catálogos, sin JOIN.
+
+    Con 'campos' (los campos a serializar, p. ej. de '?fields=') solo se
+    leen las columnas del cliente que esos campos usan y se omiten los
+    prefetch que no necesitan.
+    """
+    queryset = Cliente.objects.filter(activo=True)
+    prefetches = []
+    if campos is not None:
+        columnas = {campo.name for campo in Cliente._meta.concrete_fields}
+        queryset = queryset.only('id', *[campo for campo in campos if campo in columnas])
+    if campos is None or CAMPOS_DOCUMENTO.intersection(campos):
+        prefetches.append(Prefetch(
+            'documentos',
+            queryset=Documento.objects.only(
+                'cliente', 'tipo_documento', 'numero_documento', 'principal'
+            ).order_by('-principal', 'id'),
+            to_attr='documentos_ordenados'
+        ))
+    if campos is None or CAMPOS_TELEFONO.intersection(campos):
+        prefetches.append(Prefetch(
+            'telefonos',
+            queryset=Telefono.objects.only(
+                'cliente', 'numero', 'principal'
+            ).order_by('-principal', 'id'),
+            to_attr='telefonos_ordenados'
+        ))
+    return queryset.prefetch_related(*prefetches)
+
+
+def filtrar_por_documento(queryset, tipo_documento=None, numero_documento=None):
+    """
+    Filtra clientes por tipo y/o número de documento.
+
+    Los filtros se evalúan como semi-join sobre el mismo documento, sin
+    JOIN que multiplique filas del cliente (no hace falta DISTINCT).
+    """
+    filtros_documento = {}
+    if tipo_documento:
+        filtros_documento['tipo_documento_id'] = tipo_documento
+
+    if numero_documento:
+        filtros_documento['numero_normalizado'] = (
+            normalizar_numero_documento(numero_documento)
+        )
+
+    if filtros_documento:
+        # SQLite no descorrelaciona EXISTS: con un EXISTS correlacionado
+        # el planificador puede recorrer el índice de tipo_documento por
+        # cada cliente (costo cuadrático). Con 'id IN (subquery)' el plan
+        # parte del índice del documento ((tipo_documento,
+        # numero_normalizado), numero_normalizado o tipo_documento) y
+        # luego busca al cliente por llave primaria.
+        return queryset.filter(
+            pk__in=Documento.objects.filter(
+                **filtros_documento
+            ).values('cliente_id')
+        )
+
+    return queryset
+
+
+def filtrar_por_fidelizacion(queryset, aplica_fidelizacion=None):
+    """
+    Filtra por el campo persistido 'aplica_fidelizacion' (indexado).
+    Acepta booleanos o los textos 'true'/'false' de un query param;
+    cualquier otro valor no filtra.
+    """
+    if isinstance(aplica_fidelizacion, str):
+        aplica_fidelizacion = VALORES_BOOLEANOS.get(aplica_fidelizacion.lower())
+    if aplica_fidelizacion is None:
+        return queryset
+    return queryset.filter(aplica_fidelizacion=aplica_fidelizacion)
+
+
+def reporte_fidelizacion(tipo_documento=None, numero_documento=None,
+                         aplica_fidelizacion=None):
+    """
+    Queryset completo del reporte de fidelización con sus filtros.
+    'monto_ultimo_mes' y 'aplica_fidelizacion' se leen de los campos
+    persistidos del Cliente.
+    """
+    queryset = filtrar_por_documento(
+        clientes_activos(), tipo_documento, numero_documento
+    )
+    return filtrar_por_fidelizacion(queryset, aplica_fidelizacion)
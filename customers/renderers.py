@@ -0,0 +1,72 @@
+"""
+Renderers de la API más baratos que el JSONRenderer de DRF para las
+respuestas grandes (listado de clientes, reporte de fidelización).
+
+- OrjsonRenderer: 'application/json' con orjson. Produce los mismos
+  bytes que JSONRenderer: los tipos que orjson no conoce o que formatea
+  distinto (Decimal, fechas y horas, textos lazy) pasan por el
+  JSONEncoder de DRF.
+- MessagePackRenderer: 'application/msgpack' (o ?format=msgpack), con
+  los mismos valores que el JSON.
+
+orjson y msgpack son opcionales. Sin orjson, OrjsonRenderer delega en
+JSONRenderer; MessagePackRenderer se habilita en config/settings.py solo
+si msgpack está instalado.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+# Separadores de línea que JSONRenderer siempre escapa.
+_SEPARADORES = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class OrjsonRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson. La salida indentada (?indent, API
+    navegable) o con ensure_ascii usa el JSONRenderer de DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        for caracter, escapado in _SEPARADORES:
+            if caracter in ret:
+                ret = ret.replace(caracter, escapado)
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack con los mismos valores que el JSON de la API."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
@@ -0,0 +1,215 @@
+"""
+Generación del reporte de fidelización en segundo plano.
+
+Los jobs se ejecutan en un pool de hilos local al proceso y el archivo
+resultante se guarda en REPORTES_DIR hasta que expira (REPORTES_TTL).
+
+Si el proceso termina con un job pendiente o en proceso, el job queda
+activo sin fecha de expiración. Un job en proceso renueva
+fecha_actualizacion con cada bloque de filas; se da por abandonado si
+pasa REPORTES_JOB_TIMEOUT sin renovarla, o si sigue pendiente ese tiempo
+después de creado. crear_job() lo marca como error para poder crear uno
+nuevo y limpiar_expirados() lo elimina.
+"""
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import catalogos, lectura
+from .exports import CHUNK_SIZE, REPORTE_COLUMNAS, iter_csv, escribir_xlsx, escribir_txt
+from .models import ReporteJob
+from .querysets import reporte_fidelizacion
+
+logger = logging.getLogger(__name__)
+
+FILTROS_REPORTE = ('tipo_documento', 'numero_documento', 'aplica_fidelizacion')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de hilos compartido por el proceso, creado al primer uso."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.REPORTES_MAX_WORKERS,
+                    thread_name_prefix='reportes'
+                )
+    return _executor
+
+
+def abandonados():
+    """
+    Jobs en proceso sin actualizarse, o pendientes desde su creación,
+    hace más de REPORTES_JOB_TIMEOUT.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.REPORTES_JOB_TIMEOUT)
+    return ReporteJob.objects.filter(
+        Q(estado='PEN', fecha_creacion__lt=limite)
+        | Q(estado='PRO', fecha_actualizacion__lt=limite)
+    )
+
+
+def marcar_abandonados(**filtros):
+    """Marca como error los jobs abandonados. Retorna cuántos marcó."""
+    ahora = timezone.now()
+    return abandonados().filter(**filtros).update(
+        estado='ERR',
+        error='El job no terminó a tiempo.',
+        fecha_actualizacion=ahora,
+        fecha_finalizacion=ahora,
+        fecha_expiracion=ahora + timedelta(seconds=settings.REPORTES_TTL)
+    )
+
+
+def calcular_clave(formato, filtros):
+    """Hash estable de formato y filtros, usado para reutilizar jobs."""
+    contenido = json.dumps(
+        {'formato': formato, 'filtros': filtros}, sort_keys=True
+    )
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def crear_job(formato, filtros):
+    """
+    Crea y encola un job de reporte, o retorna el job activo que ya
+    existe para el mismo formato y filtros.
+
+    Retorna una tupla (job, creado).
+    """
+    filtros = {
+        k: v for k, v in filtros.items()
+        if k in FILTROS_REPORTE and v not in (None, '')
+    }
+    clave = calcular_clave(formato, filtros)
+
+    marcar_abandonados(clave=clave)
+    existente = ReporteJob.objects.filter(
+        clave=clave, estado__in=ReporteJob.ESTADOS_ACTIVOS
+    ).first()
+    if existente:
+        return existente, False
+
+    try:
+        with transaction.atomic():
+            job = ReporteJob.objects.create(
+                clave=clave, formato=formato, filtros=filtros
+            )
+    except IntegrityError:
+        # Otro request creó el mismo job entre la consulta y el insert.
+        job = ReporteJob.objects.filter(
+            clave=clave, estado__in=ReporteJob.ESTADOS_ACTIVOS
+        ).first()
+        if job:
+            return job, False
+        raise
+
+    transaction.on_commit(lambda: encolar_job(job.pk))
+    return job, True
+
+
+def encolar_job(job_id):
+    """Envía el job al pool, o lo ejecuta en línea si no hay workers."""
+    if settings.REPORTES_MAX_WORKERS == 0:
+        ejecutar_job(job_id)
+    else:
+        get_executor().submit(ejecutar_job, job_id)
+
+
+def _contar_progreso(filas, job_id):
+    """
+    Pasa las filas y actualiza el progreso y el latido del job en cada
+    bloque.
+    """
+    procesadas = 0
+    for fila in filas:
+        yield fila
+        procesadas += 1
+        if procesadas % CHUNK_SIZE == 0:
+            ReporteJob.objects.filter(pk=job_id).update(
+                progreso=procesadas, fecha_actualizacion=timezone.now()
+            )
+    ReporteJob.objects.filter(pk=job_id).update(
+        progreso=procesadas, fecha_actualizacion=timezone.now()
+    )
+
+
+def ruta_archivo(job):
+    return Path(settings.REPORTES_DIR) / f'{job.pk}.{job.formato}'
+
+
+def ejecutar_job(job_id):
+    """Genera el archivo del job y registra su estado final."""
+    try:
+        catalogos.revisar()
+        job = ReporteJob.objects.get(pk=job_id)
+        queryset = reporte_fidelizacion(**job.filtros)
+        ReporteJob.objects.filter(pk=job_id).update(
+            estado='PRO', total=queryset.count(), fecha_actualizacion=timezone.now()
+        )
+
+        ruta = ruta_archivo(job)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Mismas filas que la descarga directa, leídas con values() (ver
+        # customers.lectura); los documentos y teléfonos salen de
+        # subconsultas, sin los prefetch del queryset.
+        filas = _contar_progreso(
+            lectura.iter_filas(queryset.prefetch_related(None), REPORTE_COLUMNAS),
+            job_id
+        )
+        if job.formato == 'xlsx':
+            escribir_xlsx(filas, destino=ruta)
+        elif job.formato == 'txt':
+            ruta.write_text(escribir_txt(filas), encoding='utf-8')
+        else:
+            with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+                archivo.writelines(iter_csv(filas))
+
+        ahora = timezone.now()
+        ReporteJob.objects.filter(pk=job_id).update(
+            estado='LIS',
+            archivo=str(ruta),
+            fecha_actualizacion=ahora,
+            fecha_finalizacion=ahora,
+            fecha_expiracion=ahora + timedelta(seconds=settings.REPORTES_TTL)
+        )
+    except Exception as exc:
+        logger.exception('Error generando el reporte %s', job_id)
+        ahora = timezone.now()
+        ReporteJob.objects.filter(pk=job_id).update(
+            estado='ERR',
+            error=str(exc),
+            fecha_actualizacion=ahora,
+            fecha_finalizacion=ahora,
+            fecha_expiracion=ahora + timedelta(seconds=settings.REPORTES_TTL)
+        )
+    finally:
+        if settings.REPORTES_MAX_WORKERS != 0:
+            close_old_connections()
+
+
+def limpiar_expirados():
+    """
+    Elimina los jobs expirados o abandonados y sus archivos. Retorna
+    cuántos borró.
+    """
+    expirados = ReporteJob.objects.filter(
+        Q(fecha_expiracion__lt=timezone.now()) | Q(pk__in=abandonados().values('pk'))
+    )
+    for job in expirados.only('archivo'):
+        if job.archivo:
+            Path(job.archivo).unlink(missing_ok=True)
+    borrados, _ = expirados.delete()
+    return borrados
@@ -0,0 +1,119 @@
+"""
+Mantenimiento del acumulado diario de compras (GastoDiario).
+
+Cada Compra aporta su total a la fila (cliente, día, estado). Los
+signals de customers.signals aplican la diferencia cuando una compra se
+crea, cambia o se elimina. Las escrituras masivas que no disparan
+signals (update(), bulk_create, bulk_update) deben llamar a
+refrescar_clientes() o reconstruir el acumulado.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import fidelizacion
+from .models import Cliente, Compra, GastoDiario
+
+BATCH_SIZE = 1000
+
+
+def aporte(cliente_id, fecha_compra, estado, total):
+    """Llave (cliente, día, estado) y monto que aporta una compra."""
+    dia = timezone.localdate(fecha_compra)
+    return (cliente_id, dia, estado), total or Decimal('0.00')
+
+
+def ajustar(llave, delta):
+    """
+    Suma 'delta' a la fila del acumulado, creándola si no existe.
+
+    Un descuento sobre una fila inexistente se ignora: la fila ya fue
+    borrada (p. ej. en cascada al eliminar el cliente).
+    """
+    if not delta:
+        return
+    cliente_id, dia, estado = llave
+    if delta < 0:
+        GastoDiario.objects.filter(
+            cliente_id=cliente_id, dia=dia, estado=estado
+        ).update(total=F('total') + delta)
+        return
+    with transaction.atomic():
+        fila, creada = GastoDiario.objects.get_or_create(
+            cliente_id=cliente_id, dia=dia, estado=estado,
+            defaults={'total': delta}
+        )
+        if not creada:
+            GastoDiario.objects.filter(pk=fila.pk).update(
+                total=F('total') + delta
+            )
+
+
+def aplicar_cambio(anterior, actual):
+    """
+    Aplica el cambio de una compra al acumulado. 'anterior' y 'actual'
+    son tuplas (llave, monto) de aporte() o None.
+    """
+    if anterior and actual and anterior[0] == actual[0]:
+        ajustar(actual[0], actual[1] - anterior[1])
+        return
+    if anterior:
+        ajustar(anterior[0], -anterior[1])
+    if actual:
+        ajustar(actual[0], actual[1])
+
+
+def _agregado_compras(compras):
+    return (
+        compras
+        .annotate(dia=TruncDate('fecha_compra'))
+        .values('cliente_id', 'dia', 'estado')
+        .annotate(suma=Sum('total'))
+        .order_by()
+    )
+
+
+def refrescar_clientes(cliente_ids):
+    """
+    Recalcula desde Compra las filas del acumulado de los clientes
+    indicados, con una sola consulta agregada, y refresca sus campos
+    de fidelización.
+    """
+    cliente_ids = list(cliente_ids)
+    with transaction.atomic():
+        GastoDiario.objects.filter(cliente_id__in=cliente_ids).delete()
+        GastoDiario.objects.bulk_create([
+            GastoDiario(
+                cliente_id=fila['cliente_id'],
+                dia=fila['dia'],
+                estado=fila['estado'],
+                total=fila['suma']
+            )
+            for fila in _agregado_compras(
+                Compra.objects.filter(cliente_id__in=cliente_ids)
+            )
+        ])
+        fidelizacion.refrescar_clientes(cliente_ids)
+
+
+def reconstruir(batch_size=BATCH_SIZE):
+    """
+    Reconstruye todo el acumulado recorriendo los clientes por rangos
+    de id. Cada bloque se procesa en su propia transacción.
+    Genera el último id procesado de cada bloque.
+    """
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Cliente.objects.filter(id__gt=ultimo_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        refrescar_clientes(ids)
+        ultimo_id = ids[-1]
+        yield ultimo_id
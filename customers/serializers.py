@@ -1,8 +1,60 @@
 from rest_framework import serializers
+from django.urls import reverse
+from . import catalogos
 from .models import (
     Cliente,
-    TipoDocumento
+    TipoDocumento,
+    ReporteJob
 )
+
+
+def primer_principal(obj, to_attr, related_name):
+    """
+    Retorna el registro prioritario de una relación (documentos o
+    teléfonos): el primero marcado como principal o, si no hay,
+    el de menor id.
+
+    Si la vista precargó la relación con un Prefetch(to_attr=...)
+    ordenado por ('-principal', 'id') no se ejecuta ninguna consulta.
+    """
+    items = getattr(obj, to_attr, None)
+    if items is not None:
+        return items[0] if items else None
+    return getattr(obj, related_name).order_by('-principal', 'id').first()
+
+
+def campos_solicitados(valor, disponibles):
+    """
+    Campos pedidos en un parámetro como '?fields=nombre,correo', en el
+    orden de 'disponibles'. None si no se pidió ninguno.
+    """
+    pedidos = {campo.strip() for campo in (valor or '').split(',') if campo.strip()}
+    if not pedidos:
+        return None
+    desconocidos = pedidos.difference(disponibles)
+    if desconocidos:
+        raise serializers.ValidationError({
+            'fields': [
+                f"Campos desconocidos: {', '.join(sorted(desconocidos))}. "
+                f"Use: {', '.join(disponibles)}."
+            ]
+        })
+    return [campo for campo in disponibles if campo in pedidos]
+
+
+class CamposSeleccionablesMixin:
+    """
+    Limita los campos del serializer con el argumento 'campos'. Los
+    campos no pedidos se eliminan, así sus métodos get_* no se ejecutan.
+    """
+
+    def __init__(self, *args, campos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nombre in set(self.fields).difference(campos):
+                self.fields.pop(nombre)
+
+
 class TipoDocumentoSerializer(serializers.ModelSerializer):
     """
     Serializer para listar los tipos de documento.
@@ -12,10 +64,11 @@ class TipoDocumentoSerializer(serializers.ModelSerializer):
         model = TipoDocumento
         fields = ['id', 'nombre']
 
-class ClienteListSerializer(serializers.ModelSerializer):
+class ClienteListSerializer(CamposSeleccionablesMixin, serializers.ModelSerializer):
     """
     Serializer simple para listar clientes con su
-    documento y teléfono principal.
+    documento y teléfono principal. Admite 'campos' para serializar
+    solo algunos.
     """
     numero_documento = serializers.SerializerMethodField()
     telefono = serializers.SerializerMethodField()
@@ -33,12 +86,24 @@ class ClienteListSerializer(serializers.ModelSerializer):
         ]
 
     def get_documento_principal(self, obj):
-        """Helper para obtener el documento prioritario."""
-        doc = obj.documentos.filter(principal=True).first()
-        
-        if not doc:
-            doc = obj.documentos.first()
-        return doc
+        """
+        Helper para obtener el documento prioritario.
+        Usa los documentos precargados por la vista (ordenados por
+        'principal') y memoriza el resultado en el objeto.
+        """
+        if not hasattr(obj, '_documento_principal'):
+            obj._documento_principal = primer_principal(
+                obj, 'documentos_ordenados', 'documentos'
+            )
+        return obj._documento_principal
+
+    def get_telefono_principal(self, obj):
+        """Helper para obtener el teléfono prioritario."""
+        if not hasattr(obj, '_telefono_principal'):
+            obj._telefono_principal = primer_principal(
+                obj, 'telefonos_ordenados', 'telefonos'
+            )
+        return obj._telefono_principal
 
     def get_numero_documento(self, obj):
         doc = self.get_documento_principal(obj)
@@ -46,22 +111,21 @@ class ClienteListSerializer(serializers.ModelSerializer):
     
     def get_tipo_documento(self, obj):
         doc = self.get_documento_principal(obj)
-        return doc.tipo_documento.nombre if doc and doc.tipo_documento else None
+        if not doc:
+            return None
+        tipo = catalogos.tipo_documento(doc.tipo_documento_id)
+        return tipo.nombre if tipo else None
 
     def get_telefono(self, obj):
-        tel = obj.telefonos.filter(principal=True).first()
-        
-        if not tel:
-            tel = obj.telefonos.first()
-
+        tel = self.get_telefono_principal(obj)
         return tel.numero if tel else None
 
 
 class ClienteReporteFidelizacionSerializer(ClienteListSerializer):
     """
     Extiende el serializer de cliente para incluir
-    los campos anotados (calculados en la DB) para el reporte
-    de fidelización.
+    los campos de fidelización persistidos en el Cliente
+    para el reporte de fidelización.
     """
 
     monto_ultimo_mes = serializers.DecimalField(
@@ -73,4 +137,48 @@ class ClienteReporteFidelizacionSerializer(ClienteListSerializer):
         fields = ClienteListSerializer.Meta.fields + [
             'monto_ultimo_mes',
             'aplica_fidelizacion'
-        ]
\ No newline at end of file
+        ]
+
+
+class ReporteJobCreateSerializer(serializers.Serializer):
+    """
+    Parámetros para solicitar un reporte de fidelización
+    en segundo plano.
+    """
+    formato = serializers.ChoiceField(
+        choices=ReporteJob.FORMATO_CHOICES, default='csv'
+    )
+    tipo_documento = serializers.IntegerField(required=False)
+    numero_documento = serializers.CharField(required=False, allow_blank=True)
+    aplica_fidelizacion = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
+class ReporteJobSerializer(serializers.ModelSerializer):
+    """
+    Estado de un job de reporte, con la URL de descarga
+    cuando el archivo está listo.
+    """
+    url_descarga = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReporteJob
+        fields = [
+            'id',
+            'formato',
+            'filtros',
+            'estado',
+            'progreso',
+            'total',
+            'error',
+            'fecha_creacion',
+            'fecha_finalizacion',
+            'fecha_expiracion',
+            'url_descarga'
+        ]
+
+    def get_url_descarga(self, obj):
+        if obj.estado != 'LIS':
+            return None
+        url = reverse('reporte-job-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,99 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import catalogos, fidelizacion, rollups, totales, versiones
+from .models import (
+    Compra, DetalleCompra, Cliente, Documento, Telefono,
+    TipoDocumento, TipoTelefono, CategoriaProducto
+)
+
+
+def aporte_guardado(compra_id):
+    """Aporte al acumulado de la compra según lo guardado en la DB."""
+    guardado = Compra.objects.filter(pk=compra_id).values(
+        'cliente_id', 'fecha_compra', 'estado', 'total'
+    ).first()
+    return rollups.aporte(**guardado) if guardado else None
+
+
+@receiver(pre_save, sender=Compra)
+def guardar_aporte_anterior(sender, instance, raw=False, **kwargs):
+    """Guarda el aporte al acumulado que tenía la compra antes del cambio."""
+    instance._aporte_anterior = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._aporte_anterior = aporte_guardado(instance.pk)
+
+
+@receiver(pre_delete, sender=Compra)
+def guardar_aporte_eliminado(sender, instance, **kwargs):
+    """
+    Lee el aporte desde la DB: la instancia en memoria puede tener un
+    total desactualizado (p. ej. si lo cambiaron sus detalles).
+    """
+    instance._aporte_anterior = aporte_guardado(instance.pk)
+
+
+@receiver(post_save, sender=Compra)
+def actualizar_gasto_diario(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_aporte_anterior', None)
+    rollups.aplicar_cambio(
+        anterior,
+        rollups.aporte(
+            instance.cliente_id, instance.fecha_compra,
+            instance.estado, instance.total
+        )
+    )
+    clientes = {instance.cliente_id}
+    if anterior:
+        clientes.add(anterior[0][0])
+    fidelizacion.refrescar_clientes(clientes)
+
+
+@receiver(post_delete, sender=Compra)
+def descontar_gasto_diario(sender, instance, **kwargs):
+    anterior = getattr(instance, '_aporte_anterior', None) or rollups.aporte(
+        instance.cliente_id, instance.fecha_compra,
+        instance.estado, instance.total
+    )
+    rollups.aplicar_cambio(anterior, None)
+    fidelizacion.refrescar_clientes([instance.cliente_id])
+
+
+@receiver(post_save, sender=DetalleCompra)
+def actualizar_total_compra(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    totales.recalcular_compra(instance.compra_id)
+
+
+@receiver(post_delete, sender=DetalleCompra)
+def descontar_total_compra(sender, instance, origin=None, **kwargs):
+    # Si el borrado viene en cascada desde la compra (o su cliente) no se
+    # recalcula: la compra también se está eliminando.
+    modelo_origen = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if modelo_origen is not DetalleCompra:
+        return
+    totales.recalcular_compra(instance.compra_id)
+
+
+@receiver([post_save, post_delete], sender=TipoDocumento)
+@receiver([post_save, post_delete], sender=TipoTelefono)
+@receiver([post_save, post_delete], sender=CategoriaProducto)
+def invalidar_catalogos(sender, **kwargs):
+    # También con loaddata (raw): los catálogos se cargan desde fixtures.
+    catalogos.invalidar()
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+@receiver([post_save, post_delete], sender=Documento)
+@receiver([post_save, post_delete], sender=Telefono)
+@receiver([post_save, post_delete], sender=Compra)
+def incrementar_version_reporte(sender, raw=False, **kwargs):
+    """Invalida los reportes guardados en customers.cache_reportes."""
+    if raw:
+        return
+    versiones.incrementar(versiones.REPORTE)
@@ -0,0 +1,54 @@
+"""
+Perfil de SQLite de las conexiones (SQLITE_PERFIL y SQLITE_PERFILES en
+config/settings.py).
+
+aplicar_perfil(), conectado a connection_created, ejecuta los PRAGMA del
+perfil al abrir cada conexión SQLite. Son ajustes por conexión, y con
+conexiones persistentes (CONN_MAX_AGE) se ejecutan una vez por hilo y no
+en cada request. Los ajustes de conexión del perfil (CONN_MAX_AGE,
+CONN_HEALTH_CHECKS, transaction_mode) se agregan a DATABASES en
+config/settings.py.
+
+journal_mode queda guardado en el archivo de la base y cambiarlo necesita
+acceso exclusivo: con otras conexiones abiertas falla con 'database is
+locked'. Por eso no se aplica por conexión sino una vez, al terminar
+migrate (aplicar_journal_mode, conectado a post_migrate).
+
+'manage.py benchmark_sqlite' compara los perfiles con una carga mixta de
+lecturas y escrituras.
+"""
+from django.conf import settings
+from django.db import connections
+
+
+def perfil_configurado(perfil=None):
+    """Ajustes del perfil indicado o del configurado; {} sin perfil."""
+    perfil = perfil or getattr(settings, 'SQLITE_PERFIL', None)
+    if not perfil:
+        return {}
+    return settings.SQLITE_PERFILES[perfil]
+
+
+def aplicar_perfil(sender=None, connection=None, **kwargs):
+    """
+    Receptor de connection_created. Usa la conexión de sqlite3 directamente
+    para que los PRAGMA no cuenten como consultas del request.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for nombre, valor in perfil_configurado().get('pragmas', {}).items():
+        connection.connection.execute(f'PRAGMA {nombre} = {valor}')
+
+
+def aplicar_journal_mode(sender=None, using='default', perfil=None, **kwargs):
+    """
+    Guarda el journal_mode del perfil en la base 'using'. También es
+    receptor de post_migrate. Retorna el modo resultante, o None si no
+    aplica (otro motor, base en memoria o perfil sin journal_mode).
+    """
+    connection = connections[using]
+    modo = perfil_configurado(perfil).get('journal_mode')
+    if connection.vendor != 'sqlite' or not modo or connection.is_in_memory_db():
+        return None
+    connection.ensure_connection()
+    return connection.connection.execute(f'PRAGMA journal_mode = {modo}').fetchone()[0]
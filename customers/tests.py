@@ -1,3 +1,1421 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import pstats
+import re
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import FileResponse
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .models import (
+    TipoDocumento, TipoTelefono, Cliente, Documento, Telefono, Compra,
+    ReporteJob, GastoDiario, Producto, DetalleCompra, VersionDatos
+)
+from . import benchmarks, busqueda, cache_reportes, catalogos, lectura, renderers, reportes
+from .exports import REPORTE_COLUMNAS
+from .instrumentacion import InstrumentacionMiddleware
+from .querysets import clientes_activos, reporte_fidelizacion, filtrar_por_fidelizacion
+from .serializers import ClienteListSerializer, ClienteReporteFidelizacionSerializer
+from .views import ClienteListView
+
+# La línea de log por request solo se revisa en InstrumentacionTests.
+logging.getLogger('customers.instrumentacion').setLevel(logging.WARNING)
+
+# El caché de Django guarda la versión de los catálogos: los tests usan uno
+# en memoria en lugar del caché en disco de desarrollo (BASE_DIR/cache).
+CACHE_PRUEBAS = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+})
+
+
+def setUpModule():
+    CACHE_PRUEBAS.enable()
+
+
+def tearDownModule():
+    CACHE_PRUEBAS.disable()
+
+
+class DirectorioReportesMixin:
+    """Usa directorios temporales para los reportes y su caché en disco."""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajuste = override_settings(
+            REPORTES_DIR=directorio.name,
+            REPORTES_CACHE_DIR=os.path.join(directorio.name, 'cache')
+        )
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+
+class CatalogosLimpiosMixin:
+    """
+    Cada test parte sin versión de catálogos en el caché ni copia local:
+    ambos sobreviven al rollback de los datos del test anterior.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        catalogos._version = None
+
+
+def crear_cliente(indice, tipo_doc, tipo_tel, **kwargs):
+    """Crea un cliente con un documento secundario y uno principal."""
+    cliente = Cliente.objects.create(
+        nombre=f'Nombre{indice}',
+        apellido=f'Apellido{indice}',
+        correo=f'cliente{indice}@example.com',
+        **kwargs
+    )
+    Documento.objects.create(
+        cliente=cliente, tipo_documento=tipo_doc,
+        numero_documento=f'SEC-{indice}', principal=False
+    )
+    Documento.objects.create(
+        cliente=cliente, tipo_documento=tipo_doc,
+        numero_documento=f'{indice:08d}', principal=True
+    )
+    Telefono.objects.create(
+        cliente=cliente, phone_type=tipo_tel,
+        numero=f'300{indice:07d}', principal=True
+    )
+    return cliente
+
+
+class ClienteQueryCountTests(DirectorioReportesMixin, TestCase):
+    """
+    Las vistas de clientes deben ejecutar un número fijo de consultas
+    sin importar cuántos clientes existan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        cls.tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        for i in range(10):
+            cliente = crear_cliente(i, cls.tipo_doc, cls.tipo_tel)
+            Compra.objects.create(
+                cliente=cliente, numero_factura=f'FAC-{i}',
+                estado='PAG', total=Decimal('100.00')
+            )
+
+    def test_listado_resuelve_documento_principal(self):
+        response = self.client.get(reverse('cliente-list'))
+        fila = response.json()[0]
+        self.assertEqual(fila['numero_documento'], '00000000')
+        self.assertEqual(fila['tipo_documento'], 'Cédula')
+        self.assertEqual(fila['telefono'], '3000000000')
+
+    def test_listado_numero_fijo_de_consultas(self):
+        catalogos.tipos_documento_activos()
+        # validadores (ETag) + clientes con documento y teléfono anotados
+        with self.assertNumQueries(2):
+            self.client.get(reverse('cliente-list'))
+
+        crear_cliente(99, self.tipo_doc, self.tipo_tel)
+        catalogos.tipos_documento_activos()
+        with self.assertNumQueries(2):
+            self.client.get(reverse('cliente-list'))
+
+    def test_reporte_numero_fijo_de_consultas(self):
+        catalogos.tipos_documento_activos()
+        # versión de datos + clientes con documento y teléfono anotados
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('cliente-download-csv'))
+            b''.join(response.streaming_content)
+
+    def test_campos_pedidos_omiten_columnas_y_subconsultas(self):
+        catalogos.tipos_documento_activos()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('cliente-list'), {'fields': 'correo,nombre'})
+        sql = consultas.captured_queries[-1]['sql']
+        self.assertNotIn('"apellido"', sql)
+        self.assertNotIn('customers_documento', sql)
+        self.assertNotIn('customers_telefono', sql)
+        self.assertEqual(
+            response.json()[0], {'nombre': 'Nombre0', 'correo': 'cliente0@example.com'}
+        )
+        # Solo el teléfono: se anota el teléfono pero no el documento.
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('cliente-list'), {'fields': 'telefono'})
+        sql = consultas.captured_queries[-1]['sql']
+        self.assertIn('customers_telefono', sql)
+        self.assertNotIn('customers_documento', sql)
+        self.assertEqual(response.json()[0], {'telefono': '3000000000'})
+
+    def test_campo_desconocido(self):
+        response = self.client.get(reverse('cliente-list'), {'fields': 'nombre,clave'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('clave', response.json()['fields'][0])
+
+
+class ReporteExportTests(DirectorioReportesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cliente = crear_cliente(1, tipo_doc, tipo_tel)
+        Compra.objects.create(
+            cliente=cliente, numero_factura='FAC-1',
+            estado='PAG', total=Decimal('6000000.00')
+        )
+
+    def test_csv_en_streaming_con_columnas_del_reporte(self):
+        response = self.client.get(reverse('cliente-download-csv'))
+        self.assertTrue(response.streaming)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lineas, [
+            'tipo_documento,numero_documento,nombre,apellido,correo,'
+            'telefono,monto_ultimo_mes,aplica_fidelizacion',
+            'Cédula,00000001,Nombre1,Apellido1,cliente1@example.com,'
+            '3000000001,6000000.00,True',
+        ])
+
+    def test_columnas_pedidas(self):
+        url = reverse('cliente-download-csv')
+        response = self.client.get(url, {'fields': 'monto_ultimo_mes,correo'})
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lineas, ['correo,monto_ultimo_mes', 'cliente1@example.com,6000000.00'])
+        # Otras columnas no reutilizan el archivo en caché.
+        response = self.client.get(url, {'fields': 'correo'})
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lineas, ['correo', 'cliente1@example.com'])
+
+    def test_xlsx_write_only(self):
+        response = self.client.get(
+            reverse('cliente-download-csv'), {'formato': 'xlsx'}
+        )
+        self.assertIn('.xlsx', response['Content-Disposition'])
+        libro = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        filas = list(libro.active.iter_rows(values_only=True))
+        self.assertEqual(filas[0][0], 'tipo_documento')
+        self.assertEqual(filas[1][-2:], ('6000000.00', True))
+
+    def test_descarga_repetida_sale_del_cache(self):
+        url = reverse('cliente-download-csv')
+        primera = b''.join(self.client.get(url).streaming_content)
+        catalogos.tipos_documento_activos()
+        with self.assertNumQueries(1):
+            segunda = b''.join(self.client.get(url).streaming_content)
+        self.assertEqual(primera, segunda)
+
+    def test_escritura_invalida_reporte_en_cache(self):
+        url = reverse('cliente-download-csv')
+        b''.join(self.client.get(url).streaming_content)
+        Cliente.objects.filter(correo='cliente1@example.com').get().save()
+        with self.assertNumQueries(2):
+            b''.join(self.client.get(url).streaming_content)
+
+    def test_poda_conserva_los_usados_recientemente(self):
+        url = reverse('cliente-download-csv')
+        for formato in ('csv', 'txt'):
+            response = self.client.get(url, {'formato': formato})
+            b''.join(response.streaming_content)
+        viejo, nuevo = sorted(cache_reportes.directorio().iterdir())
+        os.utime(viejo, (1, 1))
+        cache_reportes.podar(max_bytes=nuevo.stat().st_size)
+        self.assertFalse(viejo.exists())
+        self.assertTrue(nuevo.exists())
+
+
+class ClienteCursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        for i in range(5):
+            crear_cliente(i, tipo_doc, tipo_tel)
+
+    def test_sin_parametros_retorna_lista_completa(self):
+        response = self.client.get(reverse('cliente-list'))
+        self.assertEqual(len(response.json()), 5)
+
+    def test_recorre_todas_las_paginas_sin_count(self):
+        catalogos.tipos_documento_activos()
+        url = reverse('cliente-list') + '?page_size=2'
+        correos = []
+        while url:
+            with self.assertNumQueries(1):
+                data = self.client.get(url).json()
+            self.assertNotIn('count', data)
+            correos += [fila['correo'] for fila in data['results']]
+            url = data['next']
+        self.assertEqual(len(correos), 5)
+        self.assertEqual(len(set(correos)), 5)
+
+
+class DocumentoNormalizadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cedula = TipoDocumento.objects.create(nombre='Cédula')
+        cls.pasaporte = TipoDocumento.objects.create(nombre='Pasaporte')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.cliente = crear_cliente(1, cls.cedula, tipo_tel)
+        Documento.objects.create(
+            cliente=cls.cliente, tipo_documento=cls.pasaporte,
+            numero_documento='AB-12.345', principal=False
+        )
+
+    def test_save_calcula_numero_normalizado(self):
+        documento = Documento.objects.get(numero_documento='AB-12.345')
+        self.assertEqual(documento.numero_normalizado, 'ab12345')
+
+    def test_filtro_ignora_mayusculas_y_puntuacion(self):
+        response = self.client.get(
+            reverse('cliente-list'),
+            {'tipo_documento': self.pasaporte.id, 'numero_documento': ' ab 12345 '}
+        )
+        self.assertEqual([f['correo'] for f in response.json()], [self.cliente.correo])
+
+    def test_filtros_aplican_sobre_el_mismo_documento(self):
+        response = self.client.get(
+            reverse('cliente-list'),
+            {'tipo_documento': self.cedula.id, 'numero_documento': 'AB12345'}
+        )
+        self.assertEqual(response.json(), [])
+
+
+class ClienteFiltroQueryPlanTests(TestCase):
+    """
+    Verifica en SQLite que los filtros de documento se resuelven con
+    semi-joins que usan los índices, sin DISTINCT sobre los clientes.
+    """
+
+    def get_queryset(self, **params):
+        request = Request(APIRequestFactory().get('/api/clientes/', params))
+        view = ClienteListView(request=request)
+        return view.get_queryset()
+
+    def test_filtro_tipo_y_numero_usa_indice_compuesto(self):
+        queryset = self.get_queryset(tipo_documento=1, numero_documento='123')
+        self.assertNotIn('DISTINCT', str(queryset.query).upper())
+
+        plan = queryset.explain()
+        self.assertIn('documento_tipo_numero_idx', plan)
+        self.assertIn('SEARCH customers_cliente USING INTEGER PRIMARY KEY', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_filtro_numero_usa_indice_normalizado(self):
+        plan = self.get_queryset(numero_documento='123').explain()
+        self.assertIn('documento_numero_norm_idx', plan)
+        self.assertIn('SEARCH customers_cliente USING INTEGER PRIMARY KEY', plan)
+
+    def test_filtro_tipo_sin_subconsulta_correlacionada(self):
+        queryset = self.get_queryset(tipo_documento=1)
+        sql = str(queryset.query).upper()
+        self.assertNotIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+        plan = queryset.explain()
+        self.assertNotIn('CORRELATED', plan)
+        self.assertIn('SEARCH customers_cliente USING INTEGER PRIMARY KEY', plan)
+
+
+@override_settings(REPORTES_MAX_WORKERS=0)
+class ReporteJobTests(DirectorioReportesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        crear_cliente(1, tipo_doc, tipo_tel)
+
+    def test_job_genera_archivo_descargable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('reporte-job-create'), {'formato': 'csv'}
+            )
+        self.assertEqual(response.status_code, 202)
+
+        detalle = self.client.get(
+            reverse('reporte-job-detail', args=[response.json()['id']])
+        ).json()
+        self.assertEqual(detalle['estado'], 'LIS')
+        self.assertEqual(detalle['progreso'], 1)
+
+        descarga = self.client.get(detalle['url_descarga'])
+        contenido = b''.join(descarga.streaming_content).decode()
+        self.assertIn('cliente1@example.com', contenido)
+
+    def test_job_igual_a_la_descarga_directa(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job, _ = reportes.crear_job('csv', {})
+        job.refresh_from_db()
+        with open(job.archivo, encoding='utf-8', newline='') as archivo:
+            generado = archivo.read()
+        descarga = self.client.get(reverse('cliente-download-csv'))
+        self.assertEqual(generado, b''.join(descarga.streaming_content).decode())
+
+    def test_solicitudes_identicas_comparten_job(self):
+        primero = self.client.post(reverse('reporte-job-create'), {'formato': 'xlsx'})
+        segundo = self.client.post(reverse('reporte-job-create'), {'formato': 'xlsx'})
+        self.assertEqual(segundo.status_code, 200)
+        self.assertEqual(primero.json()['id'], segundo.json()['id'])
+
+        descarga = self.client.get(
+            reverse('reporte-job-download', args=[primero.json()['id']])
+        )
+        self.assertEqual(descarga.status_code, 409)
+
+    def test_limpia_jobs_expirados(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job, _ = reportes.crear_job('csv', {})
+        job.refresh_from_db()
+        ReporteJob.objects.filter(pk=job.pk).update(
+            fecha_expiracion=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(reportes.limpiar_expirados(), 1)
+        self.assertFalse(os.path.exists(job.archivo))
+
+    def test_job_abandonado_se_reemplaza_y_se_limpia(self):
+        abandonado = ReporteJob.objects.create(clave=reportes.calcular_clave('csv', {}))
+        ReporteJob.objects.filter(pk=abandonado.pk).update(
+            fecha_creacion=timezone.now() - timedelta(seconds=settings.REPORTES_JOB_TIMEOUT + 1)
+        )
+        job, creado = reportes.crear_job('csv', {})
+        self.assertTrue(creado)
+        abandonado.refresh_from_db()
+        self.assertEqual(abandonado.estado, 'ERR')
+
+        otro = ReporteJob.objects.create(clave='otra')
+        ReporteJob.objects.filter(pk=otro.pk).update(
+            fecha_creacion=timezone.now() - timedelta(seconds=settings.REPORTES_JOB_TIMEOUT + 1)
+        )
+        self.assertEqual(reportes.limpiar_expirados(), 1)
+        self.assertFalse(ReporteJob.objects.filter(pk=otro.pk).exists())
+
+    def test_job_largo_con_latido_no_se_abandona(self):
+        vencido = timezone.now() - timedelta(seconds=settings.REPORTES_JOB_TIMEOUT + 1)
+        largo = ReporteJob.objects.create(clave='larga', estado='PRO')
+        ReporteJob.objects.filter(pk=largo.pk).update(fecha_creacion=vencido)
+        self.assertFalse(reportes.abandonados().exists())
+
+        # Sin latido el job se da por abandonado; el progreso lo renueva.
+        ReporteJob.objects.filter(pk=largo.pk).update(fecha_actualizacion=vencido)
+        self.assertTrue(reportes.abandonados().exists())
+        list(reportes._contar_progreso(range(3), largo.pk))
+        self.assertFalse(reportes.abandonados().exists())
+        largo.refresh_from_db()
+        self.assertEqual(largo.progreso, 3)
+
+
+class GastoDiarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.cliente = crear_cliente(1, tipo_doc, tipo_tel)
+
+    def gasto(self, estado):
+        return sum(
+            GastoDiario.objects.filter(cliente=self.cliente, estado=estado)
+            .values_list('total', flat=True),
+            Decimal('0.00')
+        )
+
+    def test_acumulado_sigue_creacion_cambio_y_borrado(self):
+        compra = Compra.objects.create(
+            cliente=self.cliente, numero_factura='FAC-1',
+            estado='PEN', total=Decimal('100.00')
+        )
+        Compra.objects.create(
+            cliente=self.cliente, numero_factura='FAC-2',
+            estado='PAG', total=Decimal('50.00')
+        )
+        self.assertEqual(self.gasto('PEN'), Decimal('100.00'))
+
+        compra.estado = 'PAG'
+        compra.total = Decimal('120.00')
+        compra.save()
+        self.assertEqual(self.gasto('PEN'), Decimal('0.00'))
+        self.assertEqual(self.gasto('PAG'), Decimal('170.00'))
+
+        compra.delete()
+        self.assertEqual(self.gasto('PAG'), Decimal('50.00'))
+
+    def test_reconstruir_coincide_con_compras(self):
+        Compra.objects.create(
+            cliente=self.cliente, numero_factura='FAC-1',
+            estado='PAG', total=Decimal('6000000.00')
+        )
+        GastoDiario.objects.all().delete()
+        call_command('rebuild_gasto_diario', stdout=StringIO())
+        self.assertEqual(self.gasto('PAG'), Decimal('6000000.00'))
+
+        queryset = reporte_fidelizacion()
+        self.assertTrue(queryset.get(pk=self.cliente.pk).aplica_fidelizacion)
+
+    def test_borrar_cliente_elimina_su_acumulado(self):
+        Compra.objects.create(
+            cliente=self.cliente, numero_factura='FAC-1',
+            estado='PAG', total=Decimal('10.00')
+        )
+        self.cliente.delete()
+        self.assertFalse(GastoDiario.objects.exists())
+
+
+class FidelizacionPersistidaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.fiel = crear_cliente(1, tipo_doc, tipo_tel)
+        cls.otro = crear_cliente(2, tipo_doc, tipo_tel)
+        Compra.objects.create(
+            cliente=cls.fiel, numero_factura='FAC-1',
+            estado='PAG', total=Decimal('6000000.00')
+        )
+
+    def test_compra_actualiza_campos_persistidos(self):
+        self.fiel.refresh_from_db()
+        self.assertEqual(self.fiel.monto_ultimo_mes, Decimal('6000000.00'))
+        self.assertTrue(self.fiel.aplica_fidelizacion)
+
+    def test_filtro_aplica_fidelizacion(self):
+        response = self.client.get(
+            reverse('cliente-list'), {'aplica_fidelizacion': 'true'}
+        )
+        self.assertEqual([f['correo'] for f in response.json()], [self.fiel.correo])
+
+        response = self.client.get(
+            reverse('cliente-list'), {'aplica_fidelizacion': 'false'}
+        )
+        self.assertEqual([f['correo'] for f in response.json()], [self.otro.correo])
+
+    def test_refresh_corrige_valores_desactualizados(self):
+        Cliente.objects.update(
+            monto_ultimo_mes=Decimal('0.00'), aplica_fidelizacion=False
+        )
+        call_command('refresh_fidelizacion', batch_size=1, stdout=StringIO())
+        self.fiel.refresh_from_db()
+        self.assertTrue(self.fiel.aplica_fidelizacion)
+
+    def test_filtro_usa_indice(self):
+        plan = filtrar_por_fidelizacion(
+            Cliente.objects.filter(activo=True), 'true'
+        ).explain()
+        self.assertIn('cliente_fidelizacion_idx', plan)
+
+
+class TotalCompraTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.cliente = crear_cliente(1, tipo_doc, tipo_tel)
+        cls.producto = Producto.objects.create(
+            codigo='P-1', nombre='Producto', precio_base=Decimal('10.00')
+        )
+
+    def crear_compra(self, numero, total='0.00'):
+        return Compra.objects.create(
+            cliente=self.cliente, numero_factura=numero,
+            estado='PAG', total=Decimal(total)
+        )
+
+    def test_detalles_mantienen_el_total(self):
+        compra = self.crear_compra('FAC-1')
+        detalle = DetalleCompra.objects.create(
+            compra=compra, producto=self.producto,
+            cantidad=Decimal('2'), precio_unitario=Decimal('10.50')
+        )
+        DetalleCompra.objects.create(
+            compra=compra, producto=self.producto,
+            cantidad=Decimal('1'), precio_unitario=Decimal('5.00')
+        )
+        compra.refresh_from_db()
+        self.assertEqual(compra.total, Decimal('26.00'))
+
+        detalle.delete()
+        compra.refresh_from_db()
+        self.assertEqual(compra.total, Decimal('5.00'))
+        self.assertEqual(
+            GastoDiario.objects.get(cliente=self.cliente, estado='PAG').total,
+            Decimal('5.00')
+        )
+
+    def test_borrar_compra_no_deja_acumulado_negativo(self):
+        compra = self.crear_compra('FAC-1')
+        DetalleCompra.objects.create(
+            compra=compra, producto=self.producto,
+            cantidad=Decimal('1'), precio_unitario=Decimal('7.00')
+        )
+        compra.delete()
+        self.assertEqual(
+            GastoDiario.objects.get(cliente=self.cliente, estado='PAG').total,
+            Decimal('0.00')
+        )
+
+    def test_verificar_y_corregir_en_bloque(self):
+        compra = self.crear_compra('FAC-1')
+        DetalleCompra.objects.bulk_create([
+            DetalleCompra(
+                compra=compra, producto=self.producto,
+                cantidad=Decimal('3'), precio_unitario=Decimal('2000000.00')
+            )
+        ])
+        self.crear_compra('FAC-2')
+
+        salida = StringIO()
+        call_command('recalcular_totales', verify_only=True, stdout=salida)
+        self.assertIn('1 orders with drift', salida.getvalue())
+        compra.refresh_from_db()
+        self.assertEqual(compra.total, Decimal('0.00'))
+
+        call_command('recalcular_totales', batch_size=1, stdout=StringIO())
+        compra.refresh_from_db()
+        self.assertEqual(compra.total, Decimal('6000000.00'))
+        self.cliente.refresh_from_db()
+        self.assertTrue(self.cliente.aplica_fidelizacion)
+
+
+class ConditionalGetTests(CatalogosLimpiosMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.cliente = crear_cliente(1, cls.tipo_doc, tipo_tel)
+
+    def test_clientes_304_sin_serializar(self):
+        url = reverse('cliente-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_cambio_de_documento_invalida_etag(self):
+        url = reverse('cliente-list')
+        response = self.client.get(url)
+        documento = self.cliente.documentos.first()
+        documento.numero_documento = '999'
+        documento.save()
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_borrar_o_desactivar_invalida_last_modified(self):
+        url = reverse('cliente-list')
+        tipo_tel = TipoTelefono.objects.first()
+        otro = crear_cliente(2, self.tipo_doc, tipo_tel)
+        crear_cliente(3, self.tipo_doc, tipo_tel)
+        response = self.client.get(url)
+        self.cliente.delete()
+        otro.activo = False
+        otro.save()
+        # Last-Modified tiene resolución de segundos.
+        VersionDatos.objects.update(
+            fecha_actualizacion=timezone.now() + timedelta(seconds=5)
+        )
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_etag_depende_de_los_filtros(self):
+        url = reverse('cliente-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(
+            url, {'numero_documento': '1'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_catalogo_usa_version(self):
+        url = reverse('tipo-documento-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            TipoDocumento.objects.create(nombre='Pasaporte')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+
+class CatalogoCacheTests(CatalogosLimpiosMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cedula = TipoDocumento.objects.create(nombre='Cédula')
+        TipoDocumento.objects.create(nombre='Antiguo', activo=False)
+
+    def test_catalogo_sin_consultas(self):
+        self.client.get(reverse('tipo-documento-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('tipo-documento-list'))
+        self.assertEqual(response.json(), [{'id': self.cedula.id, 'nombre': 'Cédula'}])
+
+    def test_escritura_invalida_catalogo(self):
+        self.assertEqual(catalogos.tipo_documento(self.cedula.id).nombre, 'Cédula')
+        self.cedula.nombre = 'Cédula de Ciudadanía'
+        self.cedula.save()
+        self.assertEqual(
+            catalogos.tipo_documento(self.cedula.id).nombre, 'Cédula de Ciudadanía'
+        )
+
+    def test_version_compartida_distinta_recarga(self):
+        catalogos.tipos_documento_activos()
+        TipoDocumento.objects.filter(pk=self.cedula.pk).update(nombre='Otro')
+        cache.set(catalogos.CLAVE_VERSION, catalogos.version_actual() + 1)
+        # La versión compartida se revisa al empezar cada request.
+        self.assertEqual(catalogos.tipo_documento(self.cedula.id).nombre, 'Cédula')
+        self.client.get(reverse('tipo-documento-list'))
+        self.assertEqual(catalogos.tipo_documento(self.cedula.id).nombre, 'Otro')
+
+    def test_busquedas_no_leen_el_cache_compartido(self):
+        catalogos.tipos_documento_activos()
+        cache.delete(catalogos.CLAVE_VERSION)
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                catalogos.tipo_documento(self.cedula.id)
+        self.assertIsNone(cache.get(catalogos.CLAVE_VERSION))
+
+
+@override_settings(DEBUG=True)
+class LoadTestDataTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        TipoDocumento.objects.create(nombre='Cédula')
+        TipoTelefono.objects.create(nombre='Celular')
+
+    def cargar(self):
+        call_command(
+            'load_test_data', clientes=40, productos=5, compras=120,
+            seed=7, batch_size=25, stdout=StringIO()
+        )
+
+    def test_genera_datos_consistentes(self):
+        self.cargar()
+        self.assertEqual(Cliente.objects.count(), 40)
+        self.assertEqual(Documento.objects.filter(principal=True).count(), 40)
+        self.assertEqual(Compra.objects.count(), 120)
+        self.assertFalse(Documento.objects.filter(numero_normalizado='').exists())
+        # Fechas repartidas en el tiempo, no todas en el momento de la carga.
+        self.assertGreater(
+            Compra.objects.values('fecha_compra__date').distinct().count(), 10
+        )
+
+        salida = StringIO()
+        call_command('recalcular_totales', verify_only=True, stdout=salida)
+        self.assertIn('0 orders with drift', salida.getvalue())
+        self.assertEqual(
+            GastoDiario.objects.aggregate(suma=Sum('total'))['suma'],
+            Compra.objects.aggregate(suma=Sum('total'))['suma']
+        )
+
+    def test_misma_semilla_mismos_datos(self):
+        self.cargar()
+        primera = list(Compra.objects.order_by('id').values_list(
+            'cliente__correo', 'estado', 'total'
+        ))
+        call_command(
+            'load_test_data', clean=True, clientes=0, productos=0, compras=0,
+            stdout=StringIO()
+        )
+        self.cargar()
+        segunda = list(Compra.objects.order_by('id').values_list(
+            'cliente__correo', 'estado', 'total'
+        ))
+        # Los índices de correo continúan tras los ids existentes.
+        self.assertEqual(
+            [fila[1:] for fila in primera], [fila[1:] for fila in segunda]
+        )
+
+
+class BenchmarkTests(DirectorioReportesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        for indice in range(3):
+            crear_cliente(indice, tipo_doc, tipo_tel)
+
+    def test_mide_consultas_y_tamano(self):
+        caso = benchmarks.Caso('clientes', reverse('cliente-list'))
+        medido = benchmarks.medir(self.client, caso, repeticiones=2)
+        self.assertEqual(medido['consultas'], 2)
+        self.assertGreater(medido['bytes'], 0)
+        self.assertLessEqual(medido['min_ms'], medido['p95_ms'])
+
+    def test_presupuestos_y_comparacion(self):
+        resultados = {'clientes': {'consultas': 5, 'p50_ms': 30.0, 'pico_mb': 1.0}}
+        self.assertEqual(
+            benchmarks.revisar_presupuestos(
+                resultados, {'clientes': {'consultas': 4, 'p50_ms': 50}}
+            ),
+            ['clientes: consultas 5 > presupuesto 4']
+        )
+        base = {'clientes': {'consultas': 5, 'p50_ms': 20.0, 'pico_mb': 1.0}}
+        self.assertEqual(
+            benchmarks.comparar(resultados, base, tolerancia=1.2),
+            ['clientes: p50_ms 20.0 -> 30.0']
+        )
+        self.assertEqual(benchmarks.comparar(resultados, base, tolerancia=1.5), [])
+
+
+class InstrumentacionTests(DirectorioReportesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        for indice in range(3):
+            crear_cliente(indice, tipo_doc, tipo_tel)
+
+    def registro(self, logs):
+        return json.loads(logs.records[-1].getMessage())
+
+    def test_server_timing_y_log_del_listado(self):
+        catalogos.tipos_documento_activos()
+        with self.assertLogs('customers.instrumentacion', 'INFO') as logs:
+            response = self.client.get(reverse('cliente-list'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        registro = self.registro(logs)
+        self.assertEqual(registro['ruta'], reverse('cliente-list'))
+        self.assertEqual(registro['consultas'], 2)
+        self.assertLessEqual(len(registro['consultas_lentas']), 3)
+
+    def test_fases_del_reporte_xlsx(self):
+        with self.assertLogs('customers.instrumentacion', 'INFO') as logs:
+            response = self.client.get(reverse('cliente-download-csv'), {'formato': 'xlsx'})
+        for nombre in ('cache', 'serializacion', 'xlsx', 'publicacion'):
+            self.assertIn(f'{nombre};dur=', response['Server-Timing'])
+        self.assertNotIn('streaming', self.registro(logs)['fases'])
+        response.close()
+
+    def test_file_response_conserva_el_archivo(self):
+        # El cliente de pruebas envuelve el contenido: se usa el middleware solo.
+        middleware = InstrumentacionMiddleware(lambda request: FileResponse(BytesIO(b'x')))
+        with self.assertLogs('customers.instrumentacion', 'INFO'):
+            response = middleware(APIRequestFactory().get('/api/download/'))
+        # Sin reemplazar el contenido, el servidor puede usar sendfile.
+        self.assertIsNotNone(response.file_to_stream)
+        response.close()
+
+    def test_csv_en_streaming_registra_al_terminar(self):
+        with self.assertLogs('customers.instrumentacion', 'INFO') as logs:
+            response = self.client.get(reverse('cliente-download-csv'))
+            self.assertNotIn('serializacion', response['Server-Timing'])
+            antes = int(re.search(r'desc="(\d+) queries"', response['Server-Timing'])[1])
+            b''.join(response.streaming_content)
+        registro = self.registro(logs)
+        self.assertIn('serializacion', registro['fases'])
+        # Las consultas del streaming se cuentan al terminar.
+        self.assertGreater(registro['consultas'], antes)
+
+
+@override_settings(PERFILES_HABILITADOS=True)
+class PerfilTests(DirectorioReportesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        crear_cliente(1, tipo_doc, tipo_tel)
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.usuario = User.objects.create_user('usuario', password='x')
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajuste = override_settings(PERFILES_DIR=directorio.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.directorio = directorio.name
+
+    def test_staff_descarga_perfil_cprofile(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('cliente-list'), {'perfil': 'cprofile'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+        descarga = self.client.get(response['X-Perfil'])
+        self.assertEqual(descarga.status_code, 200)
+        ruta = os.path.join(self.directorio, os.listdir(self.directorio)[0])
+        estadisticas = pstats.Stats(ruta)
+        self.assertTrue(any(
+            funcion[2] == 'list' for funcion in estadisticas.stats
+        ))
+
+    def test_perfil_cubre_el_streaming(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('cliente-download-csv'), HTTP_X_PERFIL='cprofile'
+        )
+        self.assertIn('X-Perfil', response)
+        self.assertEqual(os.listdir(self.directorio), [])
+        b''.join(response.streaming_content)
+        ruta = os.path.join(self.directorio, os.listdir(self.directorio)[0])
+        # Los generadores del cuerpo corren bajo el perfilador.
+        funciones = {funcion[2] for funcion in pstats.Stats(ruta).stats}
+        self.assertIn('iter_csv', funciones)
+        self.assertIn('iter_filas', funciones)
+
+    def test_usuario_sin_staff_no_puede_perfilar(self):
+        for usuario in (None, self.usuario):
+            if usuario:
+                self.client.force_login(usuario)
+            response = self.client.get(reverse('cliente-list'), {'perfil': 'cprofile'})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Perfil', response)
+        self.assertEqual(os.listdir(self.directorio), [])
+
+        nombre = f'{"0" * 32}.prof'
+        open(os.path.join(self.directorio, nombre), 'w').close()
+        response = self.client.get(reverse('perfil-descarga', args=[nombre]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_nombre_invalido(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('perfil-descarga', args=['..%2Fdb.sqlite3']))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_modo_async_perfila_solo_vistas_sync(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('cliente-list'), {'perfil': 'cprofile'})
+        self.assertIn('X-Perfil', response)
+        response = await self.async_client.get(
+            reverse('cliente-list-async'), {'perfil': 'cprofile'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Perfil', response)
+
+
+class ImportacionClientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        cls.tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.existente = crear_cliente(1, cls.tipo_doc, cls.tipo_tel)
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def importar_csv(self, contenido, **extra):
+        self.client.force_login(self.staff)
+        return self.client.post(
+            reverse('cliente-import'), data=contenido.encode(),
+            content_type='text/csv', **extra
+        )
+
+    def test_csv_crea_actualiza_e_informa_errores(self):
+        contenido = (
+            'correo,nombre,apellido,tipo_documento,numero_documento,telefono,tipo_telefono\n'
+            'nuevo@example.com,Ana,Pérez,Cédula,1.234,3001112233,celular\n'
+            'cliente1@example.com,Nuevo,Nombre,%d,999,3009998877,\n'
+            'no-es-correo,Sin,Correo,,,,\n'
+            'otro@example.com,Otro,Tipo,Inexistente,55,,\n'
+        ) % self.tipo_doc.pk
+        response = self.importar_csv(contenido)
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(
+            (datos['procesadas'], datos['creados'], datos['actualizados'], datos['total_errores']),
+            (4, 1, 1, 2)
+        )
+        self.assertEqual([error['fila'] for error in datos['errores']], [4, 5])
+        self.assertIn('correo', datos['errores'][0]['errores'])
+        self.assertIn('tipo_documento', datos['errores'][1]['errores'])
+
+        nuevo = Cliente.objects.get(correo='nuevo@example.com')
+        documento = nuevo.documentos.get()
+        self.assertEqual((documento.numero_normalizado, documento.principal), ('1234', True))
+        self.assertEqual(nuevo.telefonos.get().phone_type, self.tipo_tel)
+
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.nombre, 'Nuevo')
+        self.assertTrue(self.existente.activo)
+        principales = self.existente.documentos.filter(principal=True)
+        self.assertEqual([doc.numero_documento for doc in principales], ['999'])
+        self.assertEqual(self.existente.telefonos.get(principal=True).numero, '3009998877')
+
+    def test_reimportar_documento_existente_no_lo_duplica(self):
+        contenido = (
+            'correo,nombre,apellido,activo,tipo_documento,numero_documento\n'
+            'cliente1@example.com,N,A,false,Cédula,SEC-1\n'
+        )
+        self.assertEqual(self.importar_csv(contenido).json()['actualizados'], 1)
+        self.existente.refresh_from_db()
+        self.assertFalse(self.existente.activo)
+        self.assertEqual(self.existente.documentos.count(), 2)
+        self.assertEqual(
+            self.existente.documentos.get(principal=True).numero_documento, 'SEC-1'
+        )
+
+    def test_comando_jsonl(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as archivo:
+            archivo.write('{"correo": "j1@example.com", "nombre": "J", "apellido": "L", "activo": true}\n')
+            archivo.write('no es json\n')
+            archivo.write('{"correo": "j2@example.com", "nombre": "K", "apellido": "M"}\n')
+        self.addCleanup(os.unlink, archivo.name)
+        salida = StringIO()
+        call_command('importar_clientes', archivo.name, batch_size=1, stdout=salida)
+        self.assertIn('3 rows processed: 2 created, 0 updated, 1 with errors', salida.getvalue())
+        self.assertEqual(Cliente.objects.filter(correo__startswith='j').count(), 2)
+
+    def test_solo_staff(self):
+        self.client.logout()
+        response = self.client.post(
+            reverse('cliente-import'), data=b'correo\n', content_type='text/csv'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class IngestaComprasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.cliente = crear_cliente(1, tipo_doc, tipo_tel)
+        cls.otro = crear_cliente(2, tipo_doc, tipo_tel)
+        Producto.objects.create(codigo='P-1', nombre='Uno', precio_base=Decimal('10.00'))
+        Producto.objects.create(codigo='P-2', nombre='Dos', precio_base=Decimal('2500000.00'))
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def enviar(self, compras):
+        return self.client.post(
+            reverse('compra-lote'), {'compras': compras}, content_type='application/json'
+        )
+
+    def test_lote_con_consultas_fijas_e_idempotente(self):
+        compras = [
+            {
+                'numero_factura': f'POS-{indice}', 'correo': 'cliente1@example.com',
+                'estado': 'PAG',
+                'detalles': [
+                    {'producto': 'P-1', 'cantidad': 2},
+                    {'producto': 'P-2', 'cantidad': '1', 'precio_unitario': '2500000.50'},
+                ],
+            }
+            for indice in range(20)
+        ]
+        # Las consultas no dependen del tamaño del lote.
+        with CaptureQueriesContext(connection) as una:
+            self.enviar([dict(compras[0], numero_factura='POS-X')])
+        with self.assertNumQueries(len(una.captured_queries)):
+            response = self.enviar(compras)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['creadas']), 20)
+        self.assertEqual(response.json()['creadas'][0]['total'], '2500020.50')
+        self.assertEqual(DetalleCompra.objects.count(), 42)
+
+        salida = StringIO()
+        call_command('recalcular_totales', verify_only=True, stdout=salida)
+        self.assertIn('0 orders with drift', salida.getvalue())
+        self.cliente.refresh_from_db()
+        self.assertTrue(self.cliente.aplica_fidelizacion)
+
+        response = self.enviar(compras[:5])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['existentes']), 5)
+        self.assertEqual(Compra.objects.count(), 21)
+
+    def test_errores_por_compra_sin_abortar_el_lote(self):
+        response = self.enviar([
+            {'numero_factura': 'A', 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-1'}]},
+            {'numero_factura': 'B', 'correo': 'nadie@example.com',
+             'detalles': [{'producto': 'X'}, {'producto': 'P-1', 'cantidad': '0'}]},
+            {'numero_factura': 'A', 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-1'}]},
+            {'numero_factura': 'C', 'correo': 'cliente2@example.com', 'estado': 'XXX',
+             'detalles': []},
+        ])
+        datos = response.json()
+        self.assertEqual([c['numero_factura'] for c in datos['creadas']], ['A'])
+        self.assertEqual([e['indice'] for e in datos['errores']], [1, 2, 3])
+        self.assertEqual(
+            set(datos['errores'][0]['errores']), {'correo', 'detalles[0]', 'detalles[1]'}
+        )
+        self.assertEqual(set(datos['errores'][2]['errores']), {'estado', 'detalles'})
+        self.assertEqual(
+            GastoDiario.objects.get(cliente=self.otro).total, Decimal('10.00')
+        )
+
+    def test_rechaza_montos_fuera_de_rango_y_estado_invalido(self):
+        response = self.enviar([
+            {'numero_factura': 'A', 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-1', 'precio_unitario': '1e20'}]},
+            {'numero_factura': 'B', 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-2', 'cantidad': '99999999'}]},
+            {'numero_factura': 'C', 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-1', 'precio_unitario': '9999999999999'}] * 2},
+            {'numero_factura': 'D', 'correo': 'cliente2@example.com', 'estado': ['PAG'],
+             'detalles': [{'producto': 'P-1'}]},
+        ])
+        self.assertEqual(response.status_code, 200)
+        errores = [e['errores'] for e in response.json()['errores']]
+        self.assertEqual(errores[0], {'detalles[0]': ['Precio unitario inválido.']})
+        self.assertEqual(
+            errores[1], {'detalles[0]': ['El total de la línea excede el máximo.']}
+        )
+        self.assertEqual(set(errores[2]), {'total'})
+        self.assertEqual(set(errores[3]), {'estado'})
+        self.assertFalse(Compra.objects.exists())
+
+    def test_rechaza_tipos_invalidos(self):
+        response = self.enviar([
+            {'numero_factura': ['A'], 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-1'}]},
+            {'numero_factura': {'n': 'B'}, 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-1'}]},
+            {'numero_factura': 'C', 'correo': 'cliente2@example.com', 'detalles': 5},
+            {'numero_factura': 7, 'correo': 'cliente2@example.com',
+             'detalles': [{'producto': 'P-1'}]},
+        ])
+        self.assertEqual(response.status_code, 201)
+        datos = response.json()
+        errores = [e['errores'] for e in datos['errores']]
+        self.assertEqual(set(errores[0]), {'numero_factura'})
+        self.assertEqual(set(errores[1]), {'numero_factura'})
+        self.assertEqual(errores[2], {'detalles': ['Debe tener al menos una línea.']})
+        self.assertEqual([c['numero_factura'] for c in datos['creadas']], ['7'])
+
+    def test_solo_staff(self):
+        self.client.logout()
+        response = self.client.post(
+            reverse('compra-lote'), {'compras': []}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class BusquedaClientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        cls.tipo_doc, cls.tipo_tel = tipo_doc, tipo_tel
+        cls.gomez = crear_cliente(1, tipo_doc, tipo_tel)
+        cls.gomez.nombre, cls.gomez.apellido = 'Ana', 'Gómez'
+        cls.gomez.save()
+        cls.pagomez = crear_cliente(2, tipo_doc, tipo_tel)
+        cls.pagomez.nombre, cls.pagomez.apellido = 'Luis', 'Pagómez'
+        cls.pagomez.save()
+        cls.inactivo = crear_cliente(3, tipo_doc, tipo_tel, activo=False)
+        cls.inactivo.apellido = 'Gómez'
+        cls.inactivo.save()
+
+    def buscar(self, **params):
+        return self.client.get(reverse('cliente-search'), params)
+
+    def test_prefijo_primero_y_solo_activos(self):
+        # 'gómez' es prefijo del apellido de Ana y subcadena del de Luis.
+        with self.assertNumQueries(5):
+            response = self.buscar(q='GÓM')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [cliente['correo'] for cliente in response.json()],
+            ['cliente1@example.com', 'cliente2@example.com']
+        )
+        self.assertEqual(response.json()[0]['numero_documento'], '00000001')
+
+    def test_varios_terminos_y_terminos_cortos(self):
+        response = self.buscar(q='gómez an')
+        self.assertEqual([c['nombre'] for c in response.json()], ['Ana'])
+        response = self.buscar(q='cliente2@')
+        self.assertEqual([c['nombre'] for c in response.json()], ['Luis'])
+        self.assertEqual(self.buscar(q='gómez', limit='0').status_code, 400)
+
+    def test_solo_terminos_cortos_buscan_por_prefijo(self):
+        response = self.buscar(q='gó')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['nombre'] for c in response.json()], ['Ana'])
+        response = self.buscar(q='lu pa')
+        self.assertEqual([c['nombre'] for c in response.json()], ['Luis'])
+        self.assertEqual(self.buscar(q='om').json(), [])
+
+    def test_consultas_usan_el_indice_sin_ordenar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            busqueda.buscar('gó')
+            busqueda.buscar('gómez')
+        with connection.cursor() as cursor:
+            for consulta in consultas.captured_queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + consulta['sql'])
+                plan = ' '.join(fila[-1] for fila in cursor.fetchall())
+                self.assertIn('VIRTUAL TABLE', plan)
+                # El LIMIT corta la lectura del índice: no hay ordenamiento.
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_triggers_mantienen_el_indice(self):
+        self.gomez.apellido = 'Ruiz'
+        self.gomez.save()
+        crear_cliente(4, self.tipo_doc, self.tipo_tel)
+        # Los upserts de la importación también pasan por los triggers.
+        Cliente.objects.bulk_create(
+            [Cliente(correo='cliente2@example.com', nombre='Luisa', apellido='Torres')],
+            update_conflicts=True, unique_fields=['correo'],
+            update_fields=['nombre', 'apellido'],
+        )
+        self.assertEqual(self.buscar(q='gómez').json(), [])
+        self.assertEqual([c['apellido'] for c in self.buscar(q='ruiz').json()], ['Ruiz'])
+        self.assertEqual([c['nombre'] for c in self.buscar(q='luisa').json()], ['Luisa'])
+        self.assertEqual(len(self.buscar(q='apellido4').json()), 1)
+        Cliente.objects.filter(pk=self.gomez.pk).delete()
+        self.assertEqual(self.buscar(q='ruiz').json(), [])
+
+    def test_comando_reconstruye_el_indice(self):
+        with connection.cursor() as cursor:
+            for tabla in (busqueda.TABLA, busqueda.TABLA_PREFIJOS):
+                cursor.execute(f"INSERT INTO {tabla}({tabla}) VALUES ('delete-all')")
+        self.assertEqual(self.buscar(q='gómez').json(), [])
+        self.assertEqual(self.buscar(q='gó').json(), [])
+        salida = StringIO()
+        call_command('rebuild_busqueda', stdout=salida)
+        self.assertIn('trigram', salida.getvalue())
+        self.assertEqual(len(self.buscar(q='gómez').json()), 2)
+        self.assertEqual(len(self.buscar(q='gó').json()), 1)
+
+
+class LecturaRapidaTests(TestCase):
+    """La lectura rápida debe producir exactamente la salida de los serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        crear_cliente(1, tipo_doc, tipo_tel, monto_ultimo_mes=Decimal('1234.5'))
+        Cliente.objects.create(nombre='Sin', apellido='Datos', correo='sin@example.com')
+        # Sin documento principal: se toma el de menor id.
+        cliente = Cliente.objects.create(nombre='Sec', apellido='Undario', correo='sec@example.com')
+        for numero in ('B-2', 'A-1'):
+            Documento.objects.create(
+                cliente=cliente, tipo_documento=tipo_doc, numero_documento=numero, principal=False
+            )
+        Telefono.objects.create(cliente=cliente, phone_type=tipo_tel, numero='301', principal=False)
+
+    def comparar(self, serializer_class, campos=None):
+        esperado = serializer_class(
+            clientes_activos(campos).order_by('id'), many=True, campos=campos
+        ).data
+        campos = campos or serializer_class.Meta.fields
+        obtenido = lectura.serializar(
+            lectura.valores(Cliente.objects.filter(activo=True).order_by('id'), campos), campos
+        )
+        self.assertEqual(json.dumps(obtenido), json.dumps(esperado))
+
+    def test_misma_salida_que_los_serializers(self):
+        self.comparar(ClienteListSerializer)
+        self.comparar(ClienteReporteFidelizacionSerializer)
+        self.comparar(ClienteReporteFidelizacionSerializer, ['numero_documento', 'monto_ultimo_mes'])
+        self.comparar(ClienteListSerializer, ['correo', 'telefono'])
+
+    def test_filas_del_reporte(self):
+        queryset = Cliente.objects.filter(activo=True).order_by('id')
+        self.assertEqual(
+            list(lectura.iter_filas(queryset, REPORTE_COLUMNAS)),
+            [
+                [cliente[columna] for columna in REPORTE_COLUMNAS]
+                for cliente in ClienteReporteFidelizacionSerializer(
+                    clientes_activos().order_by('id'), many=True
+                ).data
+            ]
+        )
+
+    def test_comando_de_benchmark(self):
+        salida = StringIO()
+        call_command('benchmark_serializacion', repeat=1, min_speedup=0, stdout=salida)
+        self.assertIn('speedup', salida.getvalue())
+
+
+class RenderersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        crear_cliente(1, tipo_doc, tipo_tel, monto_ultimo_mes=Decimal('1234.5'))
+
+    def datos(self):
+        return {
+            'texto': 'Ñandú \u2028 línea',
+            'decimal': Decimal('10.25'),
+            'fecha_hora': timezone.now(),
+            'fecha': timezone.now().date(),
+            'lazy': gettext_lazy('Cliente'),
+            'lista': [1, None, True, 2.5],
+            1: 'clave numérica',
+        }
+
+    def test_orjson_igual_a_json_renderer(self):
+        # orjson está en requirements.txt: sin él el test no probaría nada.
+        self.assertIsNotNone(renderers.orjson)
+        datos = self.datos()
+        self.assertEqual(
+            renderers.OrjsonRenderer().render(datos),
+            JSONRenderer().render(datos)
+        )
+        indentado = 'application/json; indent=2'
+        self.assertEqual(
+            renderers.OrjsonRenderer().render(datos, indentado),
+            JSONRenderer().render(datos, indentado)
+        )
+
+    def test_msgpack_mismos_valores_que_json(self):
+        url = reverse('cliente-list')
+        esperado = self.client.get(url).json()
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content), esperado)
+
+        datos = self.datos()
+        del datos[1]
+        self.assertEqual(
+            renderers.msgpack.unpackb(renderers.MessagePackRenderer().render(datos)),
+            json.loads(JSONRenderer().render(datos))
+        )
+
+    def test_comando_de_benchmark(self):
+        salida = StringIO()
+        call_command('benchmark_renderers', repeat=1, stdout=salida)
+        self.assertIn('drf json', salida.getvalue())
+
+
+async def contenido(response):
+    """Cuerpo completo de una respuesta async, en streaming o no."""
+    if not response.streaming:
+        return response.content
+    if not response.is_async:
+        # Como ASGIHandler: el iterador sync consulta la base en un hilo.
+        return await sync_to_async(b''.join)(response.streaming_content)
+    return b''.join([parte async for parte in response.streaming_content])
+
+
+class VistasAsyncTests(CatalogosLimpiosMixin, DirectorioReportesMixin, TestCase):
+    """Las vistas async responden lo mismo que sus variantes DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_doc = TipoDocumento.objects.create(nombre='Cédula')
+        tipo_tel = TipoTelefono.objects.create(nombre='Celular')
+        for indice in range(3):
+            crear_cliente(indice, tipo_doc, tipo_tel, monto_ultimo_mes=Decimal('10.5'))
+
+    async def comparar(self, nombre_sync, nombre_async, params=None, **headers):
+        esperado = await self.async_client.get(reverse(nombre_sync), params, headers=headers)
+        obtenido = await self.async_client.get(reverse(nombre_async), params, headers=headers)
+        self.assertEqual(obtenido.status_code, esperado.status_code)
+        self.assertEqual(obtenido['Content-Type'], esperado['Content-Type'])
+        # Los enlaces de paginación apuntan a cada vista.
+        self.assertEqual(
+            (await contenido(obtenido)).replace(b'/api/async/', b'/api/'),
+            await contenido(esperado)
+        )
+        return obtenido
+
+    async def test_listado(self):
+        await self.comparar('cliente-list', 'cliente-list-async')
+        await self.comparar('cliente-list', 'cliente-list-async', {'fields': 'correo,nombre'})
+        await self.comparar('cliente-list', 'cliente-list-async', {'page_size': 2})
+        await self.comparar('cliente-list', 'cliente-list-async', {'fields': 'clave'})
+        await self.comparar(
+            'cliente-list', 'cliente-list-async', accept='application/msgpack'
+        )
+
+    async def test_listado_304(self):
+        url = reverse('cliente-list-async')
+        etag = (await self.async_client.get(url))['ETag']
+        response = await self.async_client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_catalogo(self):
+        response = await self.comparar('tipo-documento-list', 'tipo-documento-list-async')
+        self.assertIn('ETag', response)
+
+    async def test_descargas(self):
+        for formato in ('csv', 'txt'):
+            response = await self.comparar(
+                'cliente-download-csv', 'cliente-download-async', {'formato': formato}
+            )
+            self.assertTrue(response.is_async)
+        csv_sync = await contenido(await self.async_client.get(reverse('cliente-download-csv')))
+        # Sin caché: el CSV se genera con aiterator().
+        cache_reportes.podar(max_bytes=0)
+        response = await self.async_client.get(reverse('cliente-download-async'))
+        self.assertEqual(await contenido(response), csv_sync)
+        self.assertEqual(len(csv_sync.splitlines()), 4)
+        response = await self.async_client.get(
+            reverse('cliente-download-async'), {'formato': 'xlsx'}
+        )
+        libro = load_workbook(BytesIO(await contenido(response)))
+        self.assertEqual(libro.active.max_row, 4)
+
+    async def test_instrumentacion_mide_el_orm_async(self):
+        with self.assertLogs('customers.instrumentacion', 'INFO') as logs:
+            response = await self.async_client.get(reverse('cliente-download-async'))
+            await contenido(response)
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertIn('serializacion', registro['fases'])
+        self.assertIn('streaming', registro['fases'])
+        self.assertGreater(registro['consultas'], 0)
+
+
+class PerfilSqliteTests(TestCase):
+
+    def pragmas_de_conexion_nueva(self):
+        nueva = connections.create_connection('default')
+        # Registra las consultas aunque DEBUG sea False.
+        nueva.force_debug_cursor = True
+        try:
+            nueva.ensure_connection()
+            self.assertEqual(len(nueva.queries_log), 0)
+            return {
+                nombre: nueva.connection.execute(f'PRAGMA {nombre}').fetchone()[0]
+                for nombre in ('synchronous', 'cache_size', 'busy_timeout')
+            }
+        finally:
+            nueva.close()
+
+    def test_perfil_se_aplica_a_cada_conexion(self):
+        with override_settings(SQLITE_PERFIL='rendimiento'):
+            rendimiento = self.pragmas_de_conexion_nueva()
+        with override_settings(SQLITE_PERFIL='predeterminado'):
+            predeterminado = self.pragmas_de_conexion_nueva()
+        self.assertEqual(rendimiento['synchronous'], 1)
+        self.assertEqual(rendimiento['cache_size'], -64 * 1024)
+        self.assertEqual(rendimiento['busy_timeout'], 5000)
+        self.assertEqual(predeterminado['synchronous'], 2)
+        self.assertEqual(predeterminado['cache_size'], -2000)
+
+    def test_sin_perfil_no_cambia_la_conexion(self):
+        with override_settings(SQLITE_PERFIL=None):
+            self.assertEqual(self.pragmas_de_conexion_nueva()['synchronous'], 2)
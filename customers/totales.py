@@ -0,0 +1,97 @@
+"""
+Cálculo del total de las compras a partir de sus detalles
+(suma de cantidad * precio_unitario).
+
+recalcular_totales() reconcilia las compras por bloques con una consulta
+agregada y bulk_update por bloque. recalcular_compra() la usan los
+signals de DetalleCompra para mantener el total al día.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from . import rollups
+from .models import Compra, DetalleCompra
+
+BATCH_SIZE = 5000
+
+CENTAVOS = Decimal('0.01')
+
+
+def importe_linea():
+    """Expresión cantidad * precio_unitario de un DetalleCompra."""
+    return ExpressionWrapper(
+        F('cantidad') * F('precio_unitario'),
+        output_field=DecimalField(max_digits=25, decimal_places=4)
+    )
+
+
+def calcular_totales(compras):
+    """
+    Total por compra de las compras del queryset o lista de ids,
+    con una sola consulta agrupada. Las compras sin detalles no aparecen.
+    """
+    return {
+        compra_id: (suma or Decimal('0')).quantize(CENTAVOS)
+        for compra_id, suma in (
+            DetalleCompra.objects.filter(compra_id__in=compras)
+            .values('compra_id')
+            .annotate(suma=Sum(importe_linea()))
+            .order_by()
+            .values_list('compra_id', 'suma')
+        )
+    }
+
+
+def recalcular_compra(compra_id):
+    """
+    Recalcula y guarda el total de una compra si cambió. Usa save() para
+    que el acumulado diario y la fidelización se actualicen.
+    """
+    total = calcular_totales([compra_id]).get(compra_id, Decimal('0.00'))
+    compra = Compra.objects.filter(pk=compra_id).first()
+    if compra is None or compra.total == total:
+        return
+    compra.total = total
+    compra.save(update_fields=['total', 'fecha_actualizacion'])
+
+
+def recalcular_totales(desde_id=0, batch_size=BATCH_SIZE, solo_verificar=False):
+    """
+    Recorre las compras por rangos de id comparando el total guardado con
+    el calculado desde los detalles. Si no es 'solo_verificar', corrige
+    las diferencias con bulk_update y refresca el acumulado diario de los
+    clientes afectados.
+
+    Genera por bloque (último id, [(compra_id, guardado, calculado), ...]).
+    """
+    ultimo_id = desde_id
+    while True:
+        compras = list(
+            Compra.objects.filter(id__gt=ultimo_id)
+            .order_by('id')
+            .only('id', 'cliente_id', 'total')[:batch_size]
+        )
+        if not compras:
+            break
+        ultimo_id = compras[-1].id
+
+        calculados = calcular_totales([compra.id for compra in compras])
+        diferencias = []
+        for compra in compras:
+            calculado = calculados.get(compra.id, Decimal('0.00'))
+            if compra.total != calculado:
+                diferencias.append((compra.id, compra.total, calculado))
+                compra.total = calculado
+
+        if diferencias and not solo_verificar:
+            ids = {compra_id for compra_id, _, _ in diferencias}
+            corregidas = [compra for compra in compras if compra.id in ids]
+            with transaction.atomic():
+                Compra.objects.bulk_update(corregidas, ['total'])
+                rollups.refrescar_clientes(
+                    {compra.cliente_id for compra in corregidas}
+                )
+
+        yield ultimo_id, diferencias
@@ -1,11 +1,29 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
 
     # API para listar todos los clientes
     path('clientes/', views.ClienteListView.as_view(), name='cliente-list'),
+    path('clientes/search/', views.ClienteSearchView.as_view(), name='cliente-search'),
+    path('clientes/importar/', views.ClienteImportView.as_view(), name='cliente-import'),
     path('download/', views.ClienteDownloadReportView.as_view(), name='cliente-download-csv'),
     path('tipos-documento/', views.TipoDocumentoListView.as_view(), name='tipo-documento-list'),
+
+    # Variantes async para el despliegue ASGI
+    path('async/clientes/', async_views.ClienteListAsyncView.as_view(), name='cliente-list-async'),
+    path('async/download/', async_views.ClienteDownloadReportAsyncView.as_view(), name='cliente-download-async'),
+    path('async/tipos-documento/', async_views.TipoDocumentoListAsyncView.as_view(), name='tipo-documento-list-async'),
+
+    # Ingesta de compras del punto de venta
+    path('compras/lote/', views.CompraLoteView.as_view(), name='compra-lote'),
+
+    # Reportes generados en segundo plano
+    path('reportes/', views.ReporteJobCreateView.as_view(), name='reporte-job-create'),
+    path('reportes/<uuid:pk>/', views.ReporteJobDetailView.as_view(), name='reporte-job-detail'),
+    path('reportes/<uuid:pk>/descarga/', views.ReporteJobDownloadView.as_view(), name='reporte-job-download'),
+
+    # Perfiles de requests (solo staff)
+    path('perfiles/<str:nombre>/', views.PerfilDownloadView.as_view(), name='perfil-descarga'),
     
 ]
\ No newline at end of file
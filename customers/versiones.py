@@ -0,0 +1,58 @@
+"""
+Versiones de grupos de datos guardadas en VersionDatos.
+
+La versión vive en la base de datos para que todos los workers vean el
+mismo valor y para que el incremento sea parte de la misma transacción
+que la escritura que lo provoca.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import VersionDatos
+
+CATALOGOS = 'catalogos'
+# Cambia con cada escritura de los datos del reporte de fidelización.
+REPORTE = 'reporte'
+
+
+def obtener(nombre):
+    """Retorna (version, fecha_actualizacion) del grupo; (0, None) si no existe."""
+    fila = VersionDatos.objects.filter(nombre=nombre).values_list(
+        'version', 'fecha_actualizacion'
+    ).first()
+    return fila or (0, None)
+
+
+async def aobtener(nombre):
+    """obtener() para las vistas async."""
+    fila = await VersionDatos.objects.filter(nombre=nombre).values_list(
+        'version', 'fecha_actualizacion'
+    ).afirst()
+    return fila or (0, None)
+
+
+def obtener_varias(nombres):
+    """{nombre: (version, fecha_actualizacion)} de los grupos, en una consulta."""
+    filas = VersionDatos.objects.filter(nombre__in=nombres).values_list(
+        'nombre', 'version', 'fecha_actualizacion'
+    )
+    encontradas = {nombre: (version, fecha) for nombre, version, fecha in filas}
+    return {nombre: encontradas.get(nombre, (0, None)) for nombre in nombres}
+
+
+async def aobtener_varias(nombres):
+    """obtener_varias() para las vistas async."""
+    filas = VersionDatos.objects.filter(nombre__in=nombres).values_list(
+        'nombre', 'version', 'fecha_actualizacion'
+    )
+    encontradas = {nombre: (version, fecha) async for nombre, version, fecha in filas}
+    return {nombre: encontradas.get(nombre, (0, None)) for nombre in nombres}
+
+
+def incrementar(nombre):
+    """Incrementa la versión del grupo, creándolo si no existe."""
+    actualizadas = VersionDatos.objects.filter(nombre=nombre).update(
+        version=F('version') + 1, fecha_actualizacion=timezone.now()
+    )
+    if not actualizadas:
+        VersionDatos.objects.get_or_create(nombre=nombre, defaults={'version': 1})
@@ -1,52 +1,189 @@
-from rest_framework import generics
+import csv
+from pathlib import Path
+
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Cliente,TipoDocumento
+from .models import Cliente, ReporteJob
 from .serializers import (
     ClienteListSerializer,
     TipoDocumentoSerializer,
-    ClienteReporteFidelizacionSerializer 
+    ClienteReporteFidelizacionSerializer,
+    ReporteJobCreateSerializer,
+    ReporteJobSerializer,
+    campos_solicitados
 )
-from django.http import HttpResponse
-import pandas as pd
-from decimal import Decimal
-from io import BytesIO
-
-# --- Imports para cálculos de DB ---
-from django.utils import timezone
-from datetime import timedelta
-from django.db.models import (
-    Sum, Q, Value, Case, When, BooleanField, DecimalField
+from . import (
+    busqueda, cache_reportes, catalogos, importacion, ingesta, lectura, perfiles,
+    reportes, versiones
+)
+from .instrumentacion import fase, medir_iteracion
+from .conditional import ConditionalGetMixin
+from .pagination import ClienteCursorPagination
+from .querysets import (
+    clientes_activos, filtrar_por_documento, filtrar_por_fidelizacion
 )
-from django.db.models.functions import Coalesce
-class ClienteListView(generics.ListAPIView):
+from .exports import (
+    CONTENT_TYPES, REPORTE_COLUMNAS, iter_csv, escribir_xlsx, escribir_txt
+)
+from django.http import StreamingHttpResponse, FileResponse, Http404
+from django.utils import timezone
+
+
+class ClienteListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API para listar todos los clientes activos con su
     información básica (documento y tel principal).
+
+    Filtros: '?tipo_documento=', '?numero_documento=' y
+    '?aplica_fidelizacion=true|false'. '?fields=nombre,correo' limita
+    los campos serializados y, con ellos, las columnas y subconsultas
+    de la lectura.
+    Admite paginación por cursor opcional con '?page_size=' y '?cursor='.
+    Responde 304 si el ETag / Last-Modified del cliente sigue vigente.
+
+    Las filas se arman con la lectura rápida de customers.lectura (la
+    misma salida que serializer_class, sin instancias de modelo).
     """
     serializer_class = ClienteListSerializer
-    
+    pagination_class = ClienteCursorPagination
+
+    # Grupos de versiones.py de los que depende el listado: REPORTE cambia
+    # con cada escritura o borrado de clientes, documentos, teléfonos y
+    # compras (también en las cargas por lotes, que no disparan signals).
+    VERSIONES_VALIDADORES = (versiones.REPORTE, versiones.CATALOGOS)
+
+    def get_validadores(self):
+        """
+        Versiones de los datos de clientes y de los catálogos (una
+        consulta de dos filas). Last-Modified es la fecha del último
+        incremento: al eliminar un cliente o sacarlo del filtro cambia la
+        versión, aunque la fecha de los clientes restantes no cambie.
+
+        Las páginas por cursor no usan validadores.
+        """
+        if self.paginator and self.paginator.solicitada(self.request):
+            return None
+        return self.validadores_de(versiones.obtener_varias(self.VERSIONES_VALIDADORES))
+
+    @staticmethod
+    def validadores_de(por_grupo):
+        """Validadores a partir de versiones.obtener_varias(VERSIONES_VALIDADORES)."""
+        base = '|'.join(str(version) for version, _ in por_grupo.values())
+        fechas = [fecha for _, fecha in por_grupo.values() if fecha]
+        return base, max(fechas, default=None)
+
+    def get_campos(self):
+        """Campos pedidos con '?fields=' (None = todos)."""
+        if not hasattr(self, '_campos'):
+            self._campos = campos_solicitados(
+                self.request.query_params.get('fields'),
+                self.get_serializer_class().Meta.fields
+            )
+        return self._campos
+
     def get_queryset(self):
-        queryset = Cliente.objects.filter(activo=True).prefetch_related(
-            'documentos__tipo_documento', 
-            'telefonos'
-        )
+        queryset = Cliente.objects.filter(activo=True)
         
         tipo_documento = self.request.query_params.get('tipo_documento', None)
         numero_documento = self.request.query_params.get('numero_documento', None)
         
+        queryset = filtrar_por_documento(queryset, tipo_documento, numero_documento)
+        return filtrar_por_fidelizacion(
+            queryset, self.request.query_params.get('aplica_fidelizacion')
+        )
 
-        if tipo_documento:
-            queryset = queryset.filter(
-                documentos__tipo_documento__id=tipo_documento
-            )
-            
-        if numero_documento:
-            queryset = queryset.filter(
-                documentos__numero_documento__iexact=numero_documento
+    def list(self, request, *args, **kwargs):
+        campos = self.get_campos() or self.get_serializer_class().Meta.fields
+        queryset = lectura.valores(self.get_queryset(), campos)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(lectura.serializar(page, campos))
+        return Response(lectura.serializar(queryset, campos))
+
+class ClienteSearchView(generics.ListAPIView):
+    """
+    Búsqueda de clientes activos por nombre, apellido o correo con
+    '?q=' (ver customers.busqueda). Retorna hasta '?limit=' clientes
+    (20 por defecto, máximo 100), primero aquellos en que cada término
+    es prefijo de algún campo.
+    """
+    serializer_class = ClienteListSerializer
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        try:
+            limite = int(request.query_params.get('limit', busqueda.LIMITE))
+        except ValueError:
+            limite = 0
+        if not 1 <= limite <= busqueda.MAX_LIMITE:
+            return Response(
+                {'limit': [f'Use un entero entre 1 y {busqueda.MAX_LIMITE}.']},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            ids = busqueda.buscar(request.query_params.get('q', ''), limite)
+        except ValueError as error:
+            return Response({'q': [str(error)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        clientes = clientes_activos().in_bulk(ids)
+        serializer = self.get_serializer(
+            [clientes[id_] for id_ in ids if id_ in clientes], many=True
+        )
+        return Response(serializer.data)
+
+
+class ClienteImportView(APIView):
+    """
+    Importa clientes con su documento y teléfono principal desde CSV o
+    JSONL (ver customers.importacion). Solo para usuarios staff.
+
+    El archivo puede venir en el campo 'archivo' de un multipart o como
+    cuerpo del request. El formato se toma de '?formato=csv|jsonl', de
+    la extensión del archivo o del Content-Type (CSV por defecto).
+    Responde con los contadores y los errores por fila.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    TIPOS_JSONL = ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+    def post(self, request, *args, **kwargs):
+        if request.content_type.startswith('multipart/form-data'):
+            archivo = request.FILES.get('archivo')
+            if archivo is None:
+                return Response(
+                    {'archivo': ['Este campo es requerido.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            nombre = archivo.name.lower()
+            lineas = archivo
+        else:
+            # Cuerpo crudo: se itera por líneas sin cargarlo en memoria.
+            nombre = ''
+            lineas = request.stream or []
 
+        formato = request.query_params.get('formato', '').lower()
+        if not formato:
+            es_jsonl = (
+                nombre.endswith(('.jsonl', '.ndjson'))
+                or request.content_type.startswith(self.TIPOS_JSONL)
+            )
+            formato = 'jsonl' if es_jsonl else 'csv'
+        if formato not in importacion.FORMATOS:
+            return Response(
+                {'formato': [f'Use uno de: {", ".join(importacion.FORMATOS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return queryset.distinct()
+        filas = importacion.LECTORES[formato](importacion.decodificar(lineas))
+        try:
+            resultado = importacion.importar(filas)
+        except (UnicodeDecodeError, csv.Error) as error:
+            return Response(
+                {'archivo': [f'No se pudo leer el archivo: {error}']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(resultado.como_dict())
 
 class ClienteDownloadReportView(ClienteListView):
     """
@@ -54,93 +191,214 @@ class ClienteDownloadReportView(ClienteListView):
     de fidelización.
     
     Soporta múltiples formatos (csv, xlsx, txt) usando el 
-    query param '?format='
+    query param '?formato='. El CSV se genera en streaming y el
+    XLSX con un libro write-only de openpyxl. '?fields=' elige las
+    columnas (en el orden estándar del reporte). Los archivos generados
+    se guardan en un caché en disco y se reutilizan mientras los datos
+    no cambien.
     """
     serializer_class = ClienteReporteFidelizacionSerializer
+    pagination_class = None
 
-    def get_queryset(self):
+    def get_formato(self):
+        """(formato, nombre del archivo, content type) pedidos con '?formato='."""
+        export_format = self.request.query_params.get('formato', 'csv').lower()
+        if export_format not in CONTENT_TYPES:
+            export_format = 'csv'
+        filename = f"reporte_fidelizacion_clientes_{timezone.now().strftime('%Y%m%d')}.{export_format}"
+        return export_format, filename, CONTENT_TYPES[export_format]
 
-        queryset = super().get_queryset()
-        today = timezone.now()
-        one_month_ago = today - timedelta(days=30)
-        monto_mes_q = Sum(
-            'compras__total',
-            filter=Q(compras__fecha_compra__gte=one_month_ago) & 
-                   Q(compras__estado='PAG')
-        )
-        queryset = queryset.annotate(
-            monto_ultimo_mes=Coalesce(
-                monto_mes_q, 
-                Decimal('0.0'), 
-                output_field=DecimalField()
-            ),
-            aplica_fidelizacion=Case(
-                When(monto_ultimo_mes__gt=5_000_000, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField()
-            )
-        )
-        return queryset
+    def get_filtros(self):
+        """Filtros del request que forman parte de la llave del caché."""
+        return {
+            filtro: self.request.query_params[filtro]
+            for filtro in reportes.FILTROS_REPORTE
+            if self.request.query_params.get(filtro)
+        }
 
     def get(self, request, *args, **kwargs):
-        
-        queryset = self.get_queryset() 
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        df = pd.DataFrame(data)
-        
-        column_order = [
-            'tipo_documento', 'numero_documento', 'nombre', 'apellido',
-            'correo', 'telefono', 'monto_ultimo_mes', 'aplica_fidelizacion'
-        ]
-        df = df.reindex(columns=[col for col in column_order if col in df.columns])
-
-        export_format = request.query_params.get('formato', 'csv').lower()
-        print(export_format)
-        
-        filename = f"reporte_fidelizacion_clientes_{timezone.now().strftime('%Y%m%d')}"
-        print(filename)
+        export_format, filename, content_type = self.get_formato()
 
-        
-        if export_format == 'xlsx':
-            print('excel')
-            output = BytesIO()
-            df.to_excel(output, index=False, engine='openpyxl')
-            output.seek(0)
-            
-            response = HttpResponse(
-                output.read(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+        # Si el mismo reporte ya se generó con los datos actuales se
+        # entrega el archivo guardado sin consultar ni serializar.
+        filtros = self.get_filtros()
+        columnas = self.get_campos() or REPORTE_COLUMNAS
+        with fase('cache'):
+            clave = cache_reportes.calcular_clave(export_format, filtros, columnas)
+            archivo = cache_reportes.buscar(clave, export_format)
+        if archivo:
+            try:
+                return FileResponse(
+                    open(archivo, 'rb'), as_attachment=True,
+                    filename=filename, content_type=content_type
+                )
+            except FileNotFoundError:
+                pass
 
-            response['Content-Disposition'] = f'attachment; filename="{filename+'1'}.xlsx"'
-            print(response)
-            return response
+        # La fase 'serializacion' incluye las consultas por bloque del
+        # queryset; la de escritura ('xlsx', 'txt' o 'streaming') incluye
+        # a su vez el tiempo de serializar las filas que consume.
+        filas = medir_iteracion(
+            'serializacion',
+            lectura.iter_filas(self.get_queryset(), columnas)
+        )
 
-        elif export_format == 'txt':
-            txt_data = df.to_string(index=False)
-            
-            response = HttpResponse(txt_data, content_type='text/plain; charset=utf-8')
-            response['Content-Disposition'] = f'attachment; filename="{filename}.txt"'
-            return response
-            
-        else:
-            csv_data = df.to_csv(index=False, encoding='utf-8-sig')
-            
-            response = HttpResponse(csv_data, content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        if export_format == 'csv':
+            # CSV: se transmite fila por fila sin armar el archivo en memoria,
+            # guardando una copia en el caché mientras se envía.
+            response = StreamingHttpResponse(
+                cache_reportes.iter_guardando(iter_csv(filas, columnas), clave, 'csv'),
+                content_type=content_type
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
             return response
 
-class TipoDocumentoListView(generics.ListAPIView):
+        return FileResponse(
+            self.generar_archivo(filas, export_format, columnas, clave),
+            as_attachment=True, filename=filename, content_type=content_type
+        )
+
+    def generar_archivo(self, filas, export_format, columnas, clave):
+        """
+        Escribe el XLSX o TXT, lo publica en el caché y retorna el archivo
+        abierto para enviarlo.
+        """
+        temporal = cache_reportes.archivo_temporal()
+        with fase(export_format):
+            if export_format == 'xlsx':
+                escribir_xlsx(filas, columnas, destino=temporal)
+            else:
+                temporal.write_text(escribir_txt(filas, columnas), encoding='utf-8')
+        # Se abre antes de publicar para que la poda no lo borre antes de servirlo.
+        contenido = open(temporal, 'rb')
+        with fase('publicacion'):
+            cache_reportes.publicar(temporal, clave, export_format)
+        return contenido
+
+class TipoDocumentoListView(ConditionalGetMixin, generics.ListAPIView):
     """
     API para listar todos los tipos de documento activos.
     Se usa para poblar los menús desplegables en el frontend.
+    Responde 304 mientras la versión de los catálogos no cambie.
+    Los datos salen del caché de catálogos en memoria, sin consultas.
     """
     serializer_class = TipoDocumentoSerializer
+
+    def get_validadores(self):
+        return str(catalogos.version_actual()), None
     
     def get_queryset(self):
         """
         Retorna solo los tipos de documento que están activos,
         ordenados alfabéticamente por nombre.
         """
-        return TipoDocumento.objects.filter(activo=True).order_by('nombre')
\ No newline at end of file
+        return catalogos.tipos_documento_activos()
+
+
+class CompraLoteView(APIView):
+    """
+    Registra un lote de compras del punto de venta (ver customers.ingesta).
+    Solo para usuarios staff.
+
+    Recibe {"compras": [...]} (o la lista directamente); cada compra con
+    'numero_factura', 'correo' del cliente, 'estado' opcional y
+    'detalles' [{'producto': codigo, 'cantidad', 'precio_unitario'
+    opcional}]. Las facturas ya registradas se informan en 'existentes'
+    sin duplicarse; las inválidas, en 'errores' por índice.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        compras = request.data
+        if isinstance(compras, dict):
+            compras = compras.get('compras')
+        if not isinstance(compras, list) or not compras:
+            return Response(
+                {'compras': ['Envíe una lista de compras.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(compras) > ingesta.MAX_COMPRAS:
+            return Response(
+                {'compras': [f'Máximo {ingesta.MAX_COMPRAS} compras por lote.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultado = ingesta.registrar_compras(compras)
+        return Response(
+            resultado,
+            status=status.HTTP_201_CREATED if resultado['creadas'] else status.HTTP_200_OK
+        )
+
+
+class ReporteJobCreateView(APIView):
+    """
+    Solicita la generación del reporte de fidelización en segundo plano.
+
+    Recibe 'formato', 'tipo_documento' y 'numero_documento'. Si ya hay
+    un job activo con los mismos parámetros se retorna ese job (200);
+    si no, se crea uno nuevo (202).
+    """
+
+    def post(self, request, *args, **kwargs):
+        params = ReporteJobCreateSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        datos = dict(params.validated_data)
+        formato = datos.pop('formato')
+
+        reportes.limpiar_expirados()
+        job, creado = reportes.crear_job(formato, datos)
+
+        serializer = ReporteJobSerializer(job, context={'request': request})
+        return Response(
+            serializer.data,
+            status=status.HTTP_202_ACCEPTED if creado else status.HTTP_200_OK
+        )
+
+
+class ReporteJobDetailView(generics.RetrieveAPIView):
+    """
+    Consulta el estado y progreso de un job de reporte.
+    """
+    serializer_class = ReporteJobSerializer
+    queryset = ReporteJob.objects.all()
+
+
+class ReporteJobDownloadView(APIView):
+    """
+    Descarga el archivo de un job de reporte terminado.
+    Retorna 409 mientras el job no esté listo.
+    """
+
+    def get(self, request, pk, *args, **kwargs):
+        job = ReporteJob.objects.filter(pk=pk).first()
+        if job is None:
+            raise Http404
+
+        if job.estado != 'LIS':
+            serializer = ReporteJobSerializer(job, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_409_CONFLICT)
+
+        ruta = Path(job.archivo)
+        if not ruta.exists():
+            raise Http404
+
+        fecha = job.fecha_creacion.strftime('%Y%m%d')
+        return FileResponse(
+            open(ruta, 'rb'),
+            as_attachment=True,
+            filename=f'reporte_fidelizacion_clientes_{fecha}.{job.formato}'
+        )
+
+
+class PerfilDownloadView(APIView):
+    """
+    Descarga un perfil generado con '?perfil=' (ver customers.perfiles).
+    Solo para usuarios staff.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, nombre, *args, **kwargs):
+        ruta = perfiles.ruta(nombre)
+        if ruta is None or not ruta.exists():
+            raise Http404
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=nombre)